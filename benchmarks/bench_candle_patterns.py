@@ -0,0 +1,92 @@
+"""Tail-window candlestick scan vs. full-history talib CDL* calls.
+
+Checks that CandlePatternScanner reports the same patterns as running every
+talib CDL function over the whole history, at many positions of the series
+(raising on any difference), and times both approaches.
+
+    python -m benchmarks.bench_candle_patterns --candles 1000
+    python -m benchmarks.bench_candle_patterns --csv BTCUSDT_1h.csv
+
+A CSV needs a header with open, high, low and close columns.
+"""
+import argparse
+import time
+
+import numpy as np
+import talib
+
+from benchmarks.bench_indicators import random_ohlc
+from core.pattern_detector import ALL_CANDLE_PATTERNS, CandlePatternScanner
+
+
+def load_csv(path: str):
+    data = np.genfromtxt(path, delimiter=',', names=True, dtype=np.float64)
+    return {k: np.ascontiguousarray(data[k]) for k in ('open', 'high', 'low', 'close')}
+
+
+def full_scan(ohlc):
+    bullish = bearish = 0
+    for bit, name in enumerate(ALL_CANDLE_PATTERNS):
+        value = getattr(talib, name)(ohlc['open'], ohlc['high'], ohlc['low'], ohlc['close'])[-1]
+        if value > 0:
+            bullish |= 1 << bit
+        elif value < 0:
+            bearish |= 1 << bit
+    return bullish, bearish
+
+
+def parity(ohlc, positions: int = 300) -> int:
+    """Number of pattern hits compared; raises if the tail scan differs anywhere."""
+    scanner = CandlePatternScanner()
+    n = len(ohlc['close'])
+    mismatches = 0
+    fired = 0
+    for end in np.linspace(20, n, min(positions, n - 20), dtype=int):
+        window = {k: v[:end] for k, v in ohlc.items()}
+        expected = full_scan(window)
+        actual = scanner.scan(window)
+        fired += bin(expected[0] | expected[1]).count('1')
+        if actual != expected:
+            mismatches += 1
+            diff = (actual[0] | actual[1]) ^ (expected[0] | expected[1])
+            print(f"  mismatch at {end}: {scanner.decode(diff)}")
+    if mismatches:
+        raise AssertionError(f"tail scan differs from talib at {mismatches} positions")
+    print(f"parity: {fired} pattern hits compared")
+    return fired
+
+
+def bench(ohlc, repeats: int = 50):
+    scanner = CandlePatternScanner()
+    started = time.perf_counter()
+    for _ in range(repeats):
+        full_scan(ohlc)
+    full = (time.perf_counter() - started) / repeats
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        scanner.scan(ohlc)
+    tail = (time.perf_counter() - started) / repeats
+    print(f"{len(ohlc['close']):>7} candles: full {full * 1e6:9.1f} us/symbol  "
+          f"tail {tail * 1e6:7.1f} us/symbol  speedup {full / tail:6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', help='OHLC history to check parity on')
+    parser.add_argument('--candles', type=int, nargs='+', default=[1000, 10000])
+    args = parser.parse_args()
+
+    if args.csv:
+        ohlc = load_csv(args.csv)
+        parity(ohlc)
+        bench(ohlc)
+        return
+    for n in args.candles:
+        ohlc = random_ohlc(n)
+        parity(ohlc)
+        bench(ohlc)
+
+
+if __name__ == '__main__':
+    main()
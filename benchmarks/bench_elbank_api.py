@@ -0,0 +1,155 @@
+"""ElbankClient retry, rate limit and pooling behaviour against the local stand-in.
+
+Injects 429/5xx answers into FakeElbank and checks, raising on any
+failure, that the client retries the expected number of times, waits the
+`Retry-After` the server asked for, blocks every caller after a 429, does
+not hold a connection or in-flight slot while backing off, charges the
+endpoint weight on every attempt and keeps reusing one pooled connection.
+Then reports sequential and concurrent request throughput.
+
+    python -m benchmarks.bench_elbank_api --requests 500
+"""
+import argparse
+import asyncio
+import socket
+import time
+
+import aiohttp
+
+from benchmarks.fixtures import FakeElbank, SyntheticMarket
+from config import settings
+from integrations.elbank_api import ElbankClient
+
+WEIGHT_LIMIT = 600  # 10 weight per second, 600 burst
+
+
+def gap(server: FakeElbank, endpoint: str, a: int = -2, b: int = -1) -> float:
+    calls = server.calls[endpoint]
+    return calls[b][0] - calls[a][0]
+
+
+async def until(condition, timeout: float = 10.0, what: str = ''):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError(f"timed out waiting for {what}")
+        await asyncio.sleep(0.005)
+
+
+async def scenarios(args):
+    market = SyntheticMarket(5, candles=300, extra=0)
+    server = FakeElbank(market)
+    await server.start()
+    client = ElbankClient('key', 'secret', base_url=server.base_url, pool_size=1,
+                          weight_limit=WEIGHT_LIMIT, max_retries=3)
+    symbol = market.symbols[0]
+    try:
+        # Retry-After on 5xx is honoured, and the retry gets the data
+        server.fail('market/ohlc', 503, 502, headers={'Retry-After': '0.2'})
+        data = await client.get_ohlc(symbol)
+        stats = client.latency['market/ohlc']
+        assert len(data['candles']) == 300, "retried request returned the wrong payload"
+        assert stats.retries == 2 and server.requests['market/ohlc'] == 3, \
+            f"{stats.retries} retries for 2 injected errors"
+        assert gap(server, 'market/ohlc', 0, 1) >= 0.2 and gap(server, 'market/ohlc', 1, 2) >= 0.2, \
+            "Retry-After not honoured"
+        print(f"ok  5xx retried twice, {gap(server, 'market/ohlc', 0, 1):.2f}s apart")
+
+        # the backoff holds neither the (single) pooled connection nor an in-flight slot
+        server.fail('market/ohlc', 503, headers={'Retry-After': '0.5'})
+        retried = asyncio.create_task(client.get_ohlc(symbol))
+        await until(lambda: stats.retries == 3, what='first 503')
+        assert client.in_flight == 0, f"{client.in_flight} requests in flight during backoff"
+        await client.get_all_symbols()
+        await retried
+        symbols_at = server.calls['market/symbols'][-1][0]
+        assert symbols_at < server.calls['market/ohlc'][-1][0], "request waited for another one's backoff"
+        print("ok  backoff releases the connection and in-flight slot")
+
+        # a 429 blocks every caller for Retry-After, not only the one that got it
+        server.fail('market/ohlc', 429, headers={'Retry-After': '0.4'})
+        limited = asyncio.create_task(client.get_ohlc(symbol))
+        await until(lambda: stats.retries == 4, what='429')
+        limited_at = server.calls['market/ohlc'][-1][0]
+        await client.get_all_symbols()
+        await limited
+        waited = server.calls['market/symbols'][-1][0] - limited_at
+        assert waited >= 0.35, f"other endpoint called {waited:.2f}s after a 429 with Retry-After 0.4"
+        print(f"ok  429 penalizes the limiter for every endpoint ({waited:.2f}s)")
+
+        # giving up after max_retries
+        server.fail('market/ohlc', *[500] * 4, headers={'Retry-After': '0.01'})
+        try:
+            await client.get_ohlc(symbol)
+        except aiohttp.ClientResponseError as e:
+            assert e.status == 500
+        else:
+            raise AssertionError("request succeeded after max_retries errors")
+        assert stats.errors == 1 and stats.retries == 7, f"{stats.errors} errors, {stats.retries} retries"
+        print("ok  gives up after max_retries")
+
+        # error answers did not cost the pooled connection
+        peers = {peer for calls in server.calls.values() for _, peer in calls}
+        assert client.connections_created == 1 and len(peers) == 1, \
+            f"{client.connections_created} connections created, {len(peers)} seen by the server"
+        print(f"ok  one pooled connection, reused {client.connections_reused} times")
+
+        # every attempt, retries included, is charged its endpoint weight
+        async with ElbankClient('key', 'secret', base_url=server.base_url, weight_limit=WEIGHT_LIMIT) as fresh:
+            before = server.requests['market/symbols']
+            server.fail('market/symbols', 503, headers={'Retry-After': '0'})
+            calls = WEIGHT_LIMIT // settings.ELBANK_ENDPOINT_WEIGHTS['market/symbols']
+            started = time.monotonic()
+            for _ in range(calls - 1):
+                await fresh.get_all_symbols()
+            burst = time.monotonic() - started
+            await fresh.get_all_symbols()
+            throttled = time.monotonic() - started - burst
+        assert server.requests['market/symbols'] - before == calls + 1
+        assert burst < 0.5 and throttled >= 0.5, \
+            f"burst of {calls} weight-10 calls took {burst:.2f}s, the next one {throttled:.2f}s"
+        print(f"ok  {calls} attempts of weight 10 use up the {WEIGHT_LIMIT} budget, the next waits {throttled:.2f}s")
+
+        # network errors are retried too
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        async with ElbankClient('key', 'secret', base_url=f"http://127.0.0.1:{port}", max_retries=1) as dead:
+            try:
+                await dead.get_all_symbols()
+            except aiohttp.ClientConnectionError:
+                pass
+            else:
+                raise AssertionError("request to a closed port succeeded")
+            assert dead.latency['market/symbols'].retries == 1
+        print("ok  connection errors retried")
+
+        # throughput, weight limit out of the way
+        fast = ElbankClient('key', 'secret', base_url=server.base_url, weight_limit=10 ** 9)
+        try:
+            started = time.perf_counter()
+            for i in range(args.requests):
+                await fast.get_ohlc(market.symbols[i % len(market.symbols)], limit=50)
+            sequential = time.perf_counter() - started
+            started = time.perf_counter()
+            await asyncio.gather(*[fast.get_ohlc(market.symbols[i % len(market.symbols)], limit=50)
+                                   for i in range(args.requests)])
+            concurrent = time.perf_counter() - started
+        finally:
+            await fast.close()
+        print(f"    {args.requests} requests: sequential {args.requests / sequential:.0f}/s, "
+              f"concurrent {args.requests / concurrent:.0f}/s")
+    finally:
+        await client.close()
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(scenarios(args))
+
+
+if __name__ == '__main__':
+    main()
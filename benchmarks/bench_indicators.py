@@ -0,0 +1,143 @@
+"""Streaming indicator engine vs. full TA-Lib recomputation.
+
+Checks that IndicatorEngine matches TA-Lib after every incremental update
+(live ticks, closes, flat runs, missing candles, restarts) and reports
+the per-symbol cost of one cycle (one closed candle + one live tick) for
+both approaches.
+
+    python -m benchmarks.bench_indicators --sizes 5000 50000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from core.indicators import IndicatorEngine
+from core.pattern_detector import PatternDetector
+
+
+def random_ohlc(n: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    high = close * (1 + rng.uniform(0, 0.01, n))
+    low = close * (1 - rng.uniform(0, 0.01, n))
+    return {
+        'timestamp': np.arange(n, dtype=np.int64) * 3600_000,
+        'open': np.r_[close[0], close[:-1]],
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': rng.uniform(1, 100, n)
+    }
+
+
+def flat_ohlc(n: int, seed: int = 11):
+    """Random walk with runs of identical candles, where TA-Lib's zero checks kick in."""
+    ohlc = random_ohlc(n, seed)
+    for start in range(n // 5, n, n // 3):
+        run = slice(start, start + 40)
+        price = ohlc['close'][start - 1]
+        for column in ('open', 'high', 'low', 'close'):
+            ohlc[column][run] = price
+    return ohlc
+
+
+def gapped_ohlc(n: int, seed: int = 13):
+    """Random walk with a few hours missing, as after an exchange outage."""
+    ohlc = random_ohlc(n, seed)
+    for at in (n // 4, n // 2):
+        ohlc['timestamp'][at:] += 5 * 3600_000
+    return ohlc
+
+
+def check(actual, expected, tolerance: float, what: str) -> float:
+    worst = 0.0
+    for k, value in expected.items():
+        if np.isnan(value) or np.isnan(actual[k]):
+            if not (np.isnan(value) and np.isnan(actual[k])):
+                raise AssertionError(f"{what}: {k} is {actual[k]}, TA-Lib gives {value}")
+            continue
+        worst = max(worst, abs(actual[k] - value))
+        if not abs(actual[k] - value) <= tolerance:
+            raise AssertionError(f"{what}: {k} is {actual[k]}, TA-Lib gives {value}")
+    return worst
+
+
+def parity(ohlc, start: int = 30, tolerance: float = 1e-8) -> float:
+    """Max abs difference between streaming and TA-Lib values over incremental updates.
+
+    Feeds the history from `start` candles on, one to three candles at a
+    time, the way a live buffer grows. Each step is checked with the last
+    candle forming (also after it ticks), then closed; a window that jumps
+    past the stored state and one without timestamps must start over.
+    """
+    detector = PatternDetector()
+    engine = IndicatorEngine()
+    rng = np.random.default_rng(len(ohlc['close']))
+    worst = 0.0
+    end = start
+    while end < len(ohlc['close']):
+        window = {k: v[:end] for k, v in ohlc.items()}
+        expected = detector.calculate_indicators(window)
+        worst = max(worst, check(engine.update('parity', window), expected, tolerance, f"live at {end}"))
+
+        # the forming candle ticks before it closes
+        ticked = {k: v.copy() for k, v in window.items()}
+        ticked['close'][-1] = (ticked['high'][-1] + ticked['low'][-1]) / 2
+        worst = max(worst, check(engine.update('parity', ticked), detector.calculate_indicators(ticked),
+                                 tolerance, f"tick at {end}"))
+
+        worst = max(worst, check(engine.update('parity', window, live=False), expected,
+                                 tolerance, f"closed at {end}"))
+        end += int(rng.integers(1, 4))
+
+    # a buffer that lost candles since the last update is recomputed from its own history
+    window = {k: v[end // 2:] for k, v in ohlc.items()}
+    engine.update('stale', {k: v[:end // 3] for k, v in ohlc.items()}, live=False)
+    worst = max(worst, check(engine.update('stale', window), detector.calculate_indicators(window),
+                             tolerance, "after a gap"))
+    # without timestamps nothing tells which candles are new
+    untimed = {k: v for k, v in ohlc.items() if k != 'timestamp'}
+    worst = max(worst, check(engine.update('parity', untimed), detector.calculate_indicators(untimed),
+                             tolerance, "without timestamps"))
+    return worst
+
+
+def bench(n: int, cycles: int = 200):
+    ohlc = random_ohlc(n + cycles)
+    detector = PatternDetector()
+
+    started = time.perf_counter()
+    for i in range(cycles):
+        window = {k: v[:n + i] for k, v in ohlc.items()}
+        detector.calculate_indicators(window)
+    full = (time.perf_counter() - started) / cycles
+
+    engine = IndicatorEngine()
+    engine.update('bench', {k: v[:n] for k, v in ohlc.items()})
+    started = time.perf_counter()
+    for i in range(cycles):
+        window = {k: v[:n + i + 1] for k, v in ohlc.items()}
+        engine.update('bench', window)
+    streaming = (time.perf_counter() - started) / cycles
+
+    print(f"{n:>7} candles: talib {full * 1e6:9.1f} us/symbol  "
+          f"streaming {streaming * 1e6:7.1f} us/symbol  "
+          f"speedup {full / streaming:6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 50000])
+    parser.add_argument('--cycles', type=int, default=200)
+    parser.add_argument('--parity-size', type=int, default=600)
+    args = parser.parse_args()
+    size = args.parity_size
+    for name, ohlc in (('random', random_ohlc(size)), ('flat', flat_ohlc(size)), ('gaps', gapped_ohlc(size))):
+        print(f"parity {name:<8} {size} candles, max diff {parity(ohlc):.2e}")
+    for n in args.sizes:
+        bench(n, args.cycles)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Event loop latency while analyzing many symbols, inline vs. process pool.
+
+A probe task sleeps 1 ms in a loop and records how late it wakes up, while
+the scanner runs the full analysis (indicators, harmonics, price action,
+smart money, higher timeframes) for every symbol. Late wake-ups are time
+the loop could not serve network I/O. Two cycles are run per mode: the
+first builds the incremental state, the second is a steady-state cycle
+with one new candle per symbol.
+
+    python -m benchmarks.bench_loop_latency --symbols 500 --workers 4
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from benchmarks.bench_indicators import random_ohlc
+from core.executor import AnalysisExecutor
+from core.pattern_detector import PatternDetector
+from core.risk_engine import RiskEngine
+from core.scanner import SymbolScanner
+from core.signal_engine import SignalEngine
+from core.timeframes import TimeframeConfluence
+
+
+async def probe(lags, stop: asyncio.Event, interval: float = 0.001):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def run_mode(data, inline: bool, workers: int, chunk_size: int, concurrency: int):
+    signals = SignalEngine(PatternDetector(), RiskEngine())
+    executor = AnalysisExecutor(signals, TimeframeConfluence(signals), workers=workers,
+                                chunk_size=chunk_size, inline=inline)
+    scanner = SymbolScanner(concurrency=concurrency, timeout=None)
+    name = 'inline' if inline else f'process x{workers}'
+    try:
+        for cycle, extra in (('warm-up', 0), ('steady', 1)):
+            async def handler(symbol):
+                ohlc = data[symbol]
+                n = len(ohlc['close']) - 1 + extra
+                return await executor.analyze(symbol, {k: v[:n] for k, v in ohlc.items()})
+
+            lags = []
+            stop = asyncio.Event()
+            task = asyncio.create_task(probe(lags, stop))
+            report = await scanner.scan(list(data), handler)
+            stop.set()
+            await task
+            lags = np.array(lags) * 1000 if lags else np.zeros(1)
+            print(f"{name:<12}{cycle:<9} {report.wall_time:6.2f}s  "
+                  f"{report.throughput:7.1f} sym/s  failed={report.failed:<3} "
+                  f"loop lag p50 {np.percentile(lags, 50):6.2f} ms  "
+                  f"p99 {np.percentile(lags, 99):7.2f} ms  max {lags.max():7.2f} ms")
+    finally:
+        await executor.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--candles', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=64)
+    args = parser.parse_args()
+
+    data = {f"SYM{i}": random_ohlc(args.candles + 1, seed=i) for i in range(args.symbols)}
+    asyncio.run(run_mode(data, True, 0, args.chunk_size, args.concurrency))
+    asyncio.run(run_mode(data, False, args.workers, args.chunk_size, args.concurrency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Cold start and analysis worker spawn time.
+
+Imports each entry point in a fresh interpreter (median of `--repeats`
+runs, interpreter start-up excluded) and starts analysis workers the way
+AnalysisExecutor does (`process_context`), under each multiprocessing
+start method, timing until the first task returns.
+
+    python -m benchmarks.bench_startup --repeats 5
+
+Only the standard library is imported at module level: under the spawn and
+forkserver start methods workers re-import this module.
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ENTRY_POINTS = ('main', 'core.executor', 'core.backtester', 'core.optimizer')
+
+PROBE = "import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+
+
+def import_time(module: str, repeats: int) -> float:
+    samples = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(module=module)], capture_output=True,
+                             text=True, check=True, cwd=os.getcwd())
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def worker_spawn(method: str, workers: int) -> float:
+    from config import settings
+    from core.executor import _init_worker, process_context
+    from core.pattern_detector import candle_pattern_registry
+
+    candle_pattern_registry()  # built by the bot's own PatternDetector before any worker starts
+    settings.ANALYSIS_START_METHOD = method
+    started = time.perf_counter()
+    pools = [ProcessPoolExecutor(max_workers=1, mp_context=process_context('core.executor'),
+                                 initializer=_init_worker, initargs=(list(settings.TIMEFRAMES),))
+             for _ in range(workers)]
+    try:
+        for future in [pool.submit(os.getpid) for pool in pools]:
+            future.result()
+        return time.perf_counter() - started
+    finally:
+        for pool in pools:
+            pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    for module in ENTRY_POINTS:
+        print(f"import {module:<18} {import_time(module, args.repeats) * 1000:8.1f} ms")
+    for method in multiprocessing.get_all_start_methods():
+        seconds = worker_spawn(method, args.workers)
+        print(f"spawn {args.workers} workers ({method:<10}) {seconds * 1000:8.1f} ms")
+    # main configures a log file on import
+    if os.path.exists('trading_bot.log') and not os.path.getsize('trading_bot.log'):
+        os.remove('trading_bot.log')
+
+
+if __name__ == '__main__':
+    main()
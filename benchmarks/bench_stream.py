@@ -0,0 +1,139 @@
+"""ElbankStream against the local websocket and REST stand-ins.
+
+Checks subscription, heartbeat, reconnect and gap backfill, and raises on
+any failure: after every scenario each symbol's stored candles must be
+contiguous and match the market. Then pushes klines as fast as the
+server can send them and reports how many events per second come out.
+
+    python -m benchmarks.bench_stream --symbols 20 --messages 5000
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from benchmarks.fixtures import FakeElbank, FakeElbankStream, SyntheticMarket
+from config import settings
+from core.candle_store import TIMEFRAME_MS, CandleStore
+from integrations.elbank_api import ElbankClient
+from integrations.elbank_ws import ElbankStream
+
+
+async def until(condition, timeout: float = 10.0, what: str = ''):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError(f"timed out waiting for {what}")
+        await asyncio.sleep(0.01)
+
+
+def check_buffers(candles: CandleStore, market: SyntheticMarket, stage: str):
+    """Every buffer holds contiguous candles equal to the market's."""
+    for symbol in market.symbols:
+        ohlc = candles.get(symbol, market.timeframe)
+        times = ohlc['timestamp']
+        if np.any(np.diff(times) != TIMEFRAME_MS[market.timeframe]):
+            holes = times[1:][np.diff(times) != TIMEFRAME_MS[market.timeframe]]
+            raise AssertionError(f"{stage}: {symbol} has gaps before {holes.tolist()}")
+        expected = market.ohlc(symbol)
+        n = len(times)
+        if times[-1] != expected['timestamp'][-1] or not np.allclose(ohlc['close'], expected['close'][-n:]):
+            raise AssertionError(f"{stage}: {symbol} differs from the market")
+    print(f"ok  {stage}")
+
+
+async def drain(stream: ElbankStream):
+    events = []
+    while not stream.events.empty():
+        events.append(await stream.next_event())
+    return events
+
+
+async def scenarios(args):
+    market = SyntheticMarket(args.symbols, candles=300, extra=args.messages + 20)
+    rest = FakeElbank(market)
+    ws = FakeElbankStream(market)
+    await rest.start()
+    await ws.start()
+    settings.ELBANK_WS_HEARTBEAT = 0.2
+    exchange = ElbankClient('key', 'secret', base_url=rest.base_url, weight_limit=10 ** 9)
+    candles = CandleStore(exchange)
+    for symbol in market.symbols:
+        await candles.sync(symbol, market.timeframe)
+    per_connection = max(1, args.symbols // 3)
+    stream = ElbankStream(exchange, candles, market.symbols, timeframe=market.timeframe,
+                          url=ws.url, streams_per_connection=per_connection)
+    try:
+        await stream.start()
+        groups = -(-args.symbols // per_connection)
+        await until(lambda: len(ws.subscribed()) == args.symbols, what='subscriptions')
+        assert ws.connections == groups, f"{ws.connections} connections for {groups} groups"
+        print(f"ok  subscribed {args.symbols} symbols on {groups} connections")
+
+        await until(lambda: ws.pings > 0, what='heartbeat ping')
+        print(f"ok  heartbeat ({ws.pings} pings)")
+
+        # next candle forming, then closed
+        market.advance()
+        symbol = market.symbols[0]
+        await ws.push(symbol, market.visible - 1, closed=False)
+        await ws.push(symbol, market.visible - 1, closed=True)
+        await until(lambda: stream.events.qsize() >= 2, what='live klines')
+        assert [e.closed for e in await drain(stream)] == [False, True]
+        for other in market.symbols[1:]:
+            await ws.push(other, market.visible - 1)
+        await until(lambda: stream.events.qsize() >= args.symbols - 1, what='closed klines')
+        await drain(stream)
+        check_buffers(candles, market, 'live klines')
+
+        # three candles missed, then a forming kline and a closed one
+        market.advance(4)
+        await ws.push(symbol, market.visible - 1, closed=False)
+        await ws.push(symbol, market.visible - 1, closed=True)
+        for other in market.symbols[1:]:
+            await ws.push(other, market.visible - 1)
+        await until(lambda: stream.events.qsize() >= args.symbols + 1, what='klines after a gap')
+        events = await drain(stream)
+        assert all(e.timestamp == market.data[e.symbol]['timestamp'][market.visible - 1] for e in events)
+        check_buffers(candles, market, 'gap backfill')
+
+        # connection cut while two candles close
+        backfills = stream.backfills
+        await ws.drop()
+        market.advance(2)
+        await until(lambda: stream.reconnects >= groups and stream.backfills >= backfills + args.symbols,
+                    timeout=30, what='reconnect and backfill')
+        await until(lambda: len(ws.subscribed()) == args.symbols, what='resubscription')
+        check_buffers(candles, market, f'reconnect ({stream.reconnects} reconnects)')
+
+        # throughput: closed klines round-robin over the symbols
+        received = 0
+        start = market.visible
+        started = time.perf_counter()
+        for i in range(args.messages):
+            index = start + i // args.symbols
+            await ws.push(market.symbols[i % args.symbols], index)
+            received += len(await drain(stream))
+        market.advance(-(-args.messages // args.symbols))
+        await until(lambda: received + stream.events.qsize() >= args.messages, what='all pushed klines')
+        elapsed = time.perf_counter() - started
+        print(f"    {args.messages} klines in {elapsed:.2f}s ({args.messages / elapsed:.0f}/s), "
+              f"backfills {stream.backfills}, messages {stream.messages}")
+    finally:
+        await stream.close()
+        await exchange.close()
+        await ws.close()
+        await rest.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=20)
+    parser.add_argument('--messages', type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(scenarios(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""Offline benchmark suite on synthetic market data.
+
+Times the analysis stages one symbol at a time and then whole scan cycles
+of the bot against local fake Elbank and Telegram servers:
+
+- indicators: `PatternDetector.calculate_indicators`, full TA-Lib pass
+- indicators_incremental: the same with a key, one new candle per call
+- harmonics: `HarmonicPatterns.detect_all` on the full history
+- analyze_cold / analyze: `analyze_symbol`'s CPU part (all modules plus
+  higher timeframes), first call and steady state with one new candle
+- cycle: `TradingBot.run_cycle` end to end, one new candle per cycle,
+  signals sized and delivered to the fake Telegram
+
+Every stage reports throughput, latency percentiles and the peak memory
+traced while running it on a sample of symbols. Results are written as
+JSON; `--compare` checks one run against another and exits non-zero when
+a stage got slower than `--threshold`.
+
+    python -m benchmarks.bench_suite --symbols 200 --candles 1000 --output base.json
+    python -m benchmarks.bench_suite --compare base.json new.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from benchmarks.fixtures import FakeElbank, FakeTelegram, SyntheticMarket
+from config import settings
+from core.pattern_detector import PatternDetector
+from core.risk_engine import RiskEngine
+from core.signal_engine import SignalEngine
+from core.timeframes import TimeframeConfluence
+from strategies.harmonic import HarmonicPatterns
+
+# stage fields compared between runs, and whether higher is better
+COMPARED = (('throughput', True), ('p50', False), ('p95', False), ('peak_memory', False))
+
+
+def latency_stats(samples: List[float]) -> Dict[str, float]:
+    samples = np.asarray(samples, dtype=np.float64)
+    if not len(samples):
+        return {'count': 0}
+    total = float(samples.sum())
+    return {
+        'count': int(len(samples)),
+        'seconds': total,
+        'throughput': len(samples) / total if total > 0 else 0.0,
+        'mean': float(samples.mean()),
+        'p50': float(np.percentile(samples, 50)),
+        'p95': float(np.percentile(samples, 95)),
+        'p99': float(np.percentile(samples, 99)),
+        'max': float(samples.max())
+    }
+
+
+def peak_memory(call: Callable[[], Any]) -> int:
+    """Peak bytes allocated by Python and NumPy while `call` runs."""
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_stage(name: str, call: Callable[[str], Any], symbols: List[str], memory_sample: int) -> Dict[str, Any]:
+    samples = []
+    for symbol in symbols:
+        started = time.perf_counter()
+        call(symbol)
+        samples.append(time.perf_counter() - started)
+    stats = latency_stats(samples)
+    # traced separately, tracemalloc slows allocation-heavy code down
+    sample = symbols[:memory_sample]
+    stats['peak_memory'] = peak_memory(lambda: [call(s) for s in sample])
+    print(f"{name:<24}{stats['throughput']:9.1f}/s  p50 {stats['p50'] * 1000:8.2f} ms  "
+          f"p95 {stats['p95'] * 1000:8.2f} ms  p99 {stats['p99'] * 1000:8.2f} ms  "
+          f"peak {stats['peak_memory'] / 1024:8.0f} KB")
+    return stats
+
+
+def bench_stages(market: SyntheticMarket, memory_sample: int) -> Dict[str, Dict[str, Any]]:
+    symbols = market.symbols
+    end = market.visible
+    detector = PatternDetector()
+    stages = {
+        'indicators': run_stage('indicators', lambda s: detector.calculate_indicators(market.ohlc(s, end)),
+                                symbols, memory_sample)
+    }
+    for symbol in symbols:
+        detector.calculate_indicators(market.ohlc(symbol, end - 1), key=(symbol, '1h'))
+    # the memory pass repeats the same candle, which is what a live tick does
+    stages['indicators_incremental'] = run_stage(
+        'indicators_incremental',
+        lambda s: detector.calculate_indicators(market.ohlc(s, end), key=(s, '1h')),
+        symbols, memory_sample)
+    stages['harmonics'] = run_stage('harmonics', lambda s: HarmonicPatterns.detect_all(market.ohlc(s, end)),
+                                    symbols, memory_sample)
+
+    signals = SignalEngine(PatternDetector(), RiskEngine())
+    timeframes = TimeframeConfluence(signals)
+
+    def analyze(offset: int):
+        # what AnalysisExecutor runs for a symbol, minus the hand-off to a worker
+        def call(symbol: str):
+            ohlc = market.ohlc(symbol, end - 1 + offset)
+            analysis = signals.analyze(symbol, ohlc, timeframe=timeframes.base)
+            analysis.mtf = timeframes.analyze(symbol, ohlc)
+            return analysis
+        return call
+
+    stages['analyze_cold'] = run_stage('analyze_cold', analyze(0), symbols, 0)
+    stages['analyze'] = run_stage('analyze', analyze(1), symbols, memory_sample)
+    return stages
+
+
+async def bench_cycles(market: SyntheticMarket, cycles: int, latency: float,
+                       workers: int, prefilter: bool) -> Dict[str, Any]:
+    # imported here: main configures logging to a file on import
+    from main import TradingBot
+
+    elbank = FakeElbank(market, latency=latency)
+    telegram = FakeTelegram(latency=latency)
+    await elbank.start()
+    await telegram.start()
+    overrides = {
+        'ELBANK_BASE_URL': elbank.base_url,
+        'ELBANK_WEIGHT_LIMIT': 10 ** 9,
+        'TELEGRAM_BASE_URL': telegram.base_url,
+        'TELEGRAM_RETRY_PATH': '',
+        'TELEGRAM_DIGEST_WINDOW': 0.1,
+        'STATE_PATH': '',
+        'CANDLE_ARCHIVE': False,
+        'PROFILE_CYCLE_PATH': '',
+        'ANALYSIS_INLINE': workers == 0,
+        'ANALYSIS_WORKERS': workers,
+        'PREFILTER': prefilter
+    }
+    saved = {k: getattr(settings, k) for k in overrides}
+    for k, v in overrides.items():
+        setattr(settings, k, v)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    bot = TradingBot()
+    samples: List[float] = []
+    process_symbol = bot.process_symbol
+
+    async def timed(symbol: str, refresh: bool = True):
+        started = time.perf_counter()
+        try:
+            return await process_symbol(symbol, refresh=refresh)
+        finally:
+            samples.append(time.perf_counter() - started)
+
+    bot.process_symbol = timed
+    results = []
+    try:
+        for cycle in range(cycles):
+            if cycle:
+                market.advance()
+            before = len(samples)
+            started = time.perf_counter()
+            report = await bot.run_cycle()
+            wall = time.perf_counter() - started
+            stages = {s.name: s.seconds for s in getattr(report, 'stages', [])}
+            tiers = {name: tier['scanned'] for name, tier in bot.universe.report().items()}
+            results.append({
+                'cycle': cycle,
+                'seconds': wall,
+                'analyzed': len(samples) - before,
+                'signals': getattr(report, 'signals', 0),
+                'stages': stages,
+                'tiers': tiers,
+                'analysis': latency_stats(samples[before:])
+            })
+            print(f"cycle {cycle:<3} {wall:7.2f}s  analyzed {len(samples) - before:<5} "
+                  f"signals {results[-1]['signals']:<4} "
+                  + ' '.join(f"{k} {v:.2f}s" for k, v in stages.items()))
+
+        started = time.perf_counter()
+        try:
+            await bot.notifier.flush(timeout=60)
+        except asyncio.TimeoutError:
+            pass
+        flush = time.perf_counter() - started
+        exchange = bot.exchange.metrics()
+        notifier = bot.notifier.metrics()
+    finally:
+        await bot.close()
+        await elbank.close()
+        await telegram.close()
+        for k, v in saved.items():
+            setattr(settings, k, v)
+
+    # the first cycle fetches full histories and builds all incremental state
+    steady = results[1:] or results
+    seconds = [r['seconds'] for r in steady]
+    return {
+        'cycles': results,
+        'cold_seconds': results[0]['seconds'],
+        'steady': latency_stats(seconds),
+        'analysis': latency_stats(samples),
+        'requests': dict(elbank.requests),
+        'elbank': exchange['endpoints'],
+        'telegram': {
+            'messages': len(telegram.messages),
+            'signals': notifier['sent_signals'],
+            'flush_seconds': flush
+        }
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def compare(base_path: str, new_path: str, threshold: float) -> int:
+    """Print per-stage changes from `base_path` to `new_path`; returns the number of regressions."""
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    if base['config'] != new['config']:
+        print(f"warning: runs use different settings: {base['config']} vs {new['config']}")
+
+    stages = dict(new['stages'])
+    if 'end_to_end' in new and 'end_to_end' in base:
+        stages['cycle'] = new['end_to_end']['steady']
+    regressions = 0
+    print(f"{'stage':<24}{'metric':<14}{'base':>12}{'new':>12}{'change':>9}")
+    for name, stats in stages.items():
+        before = base['end_to_end']['steady'] if name == 'cycle' else base['stages'].get(name)
+        if not before:
+            continue
+        for field, higher_is_better in COMPARED:
+            if field not in stats or not before.get(field):
+                continue
+            change = stats[field] / before[field] - 1
+            worse = -change if higher_is_better else change
+            flag = '  <-- regression' if worse > threshold else ''
+            regressions += bool(flag)
+            print(f"{name:<24}{field:<14}{before[field]:12.4g}{stats[field]:12.4g}{change:+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=100)
+    parser.add_argument('--candles', type=int, default=1000)
+    parser.add_argument('--cycles', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=0, help="analysis processes, 0 runs inline")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every fake API call")
+    parser.add_argument('--no-prefilter', action='store_true', help="analyze every due symbol in full")
+    parser.add_argument('--memory-sample', type=int, default=20, help="symbols traced for peak memory")
+    parser.add_argument('--skip-stages', action='store_true')
+    parser.add_argument('--skip-cycles', action='store_true')
+    parser.add_argument('--output', default='', help="write results to this JSON file")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'))
+    parser.add_argument('--threshold', type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    started = time.perf_counter()
+    market = SyntheticMarket(args.symbols, args.candles, extra=args.cycles + 1, seed=args.seed)
+    print(f"generated {args.symbols} x {market.capacity} candles in {time.perf_counter() - started:.2f}s")
+
+    result: Dict[str, Any] = {
+        'meta': {
+            'time': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count()
+        },
+        'config': {k: v for k, v in vars(args).items()
+                   if k in ('symbols', 'candles', 'cycles', 'seed', 'workers', 'latency', 'no_prefilter')},
+        'stages': {}
+    }
+    if not args.skip_stages:
+        result['stages'] = bench_stages(market, args.memory_sample)
+    if not args.skip_cycles:
+        result['end_to_end'] = asyncio.run(
+            bench_cycles(market, args.cycles, args.latency, args.workers, not args.no_prefilter))
+    result['meta']['peak_rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""TelegramNotifier delivery against the local Bot API stand-in.
+
+Checks, raising on any failure: digests for bursts (split at Telegram's
+4096 character limit, every signal exactly once), per-chat 429 penalties
+that leave other chats alone, the plain-text fallback for Markdown
+errors, dropping of permanently rejected messages, retries of 5xx, and
+that messages pending at shutdown are delivered exactly once after a
+restart. Then reports how fast signals are queued.
+
+    python -m benchmarks.bench_telegram --signals 5000
+"""
+import argparse
+import asyncio
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.fixtures import FakeTelegram
+from integrations.telegram_bot import MAX_MESSAGE_LENGTH, TelegramNotifier
+
+SYMBOL = re.compile(r'\b(T\d+USDT)\b')
+
+
+def signal(i: int, chat_id: str):
+    return {
+        'chat_id': chat_id, 'symbol': f"T{i}USDT", 'position_type': 'BUY', 'entry': 1.0 + i,
+        'target1': 2.0 + i, 'target2': 3.0 + i, 'stop_loss': 0.5 + i, 'leverage': 3,
+        'pattern': 'Hammer_Pattern', 'strength': 1 + i % 5, 'rr_ratio': 3
+    }
+
+
+def delivered(server: FakeTelegram, chat_id: str) -> Counter:
+    """How often each signal's symbol reached `chat_id`."""
+    return Counter(symbol for m in server.messages if m['chat_id'] == chat_id
+                   for symbol in SYMBOL.findall(m['text']))
+
+
+def sent_at(server: FakeTelegram, chat_id: str) -> list:
+    return [t for t, payload in server.attempts if payload['chat_id'] == chat_id]
+
+
+async def send(notifier: TelegramNotifier, chat_id: str, ids) -> set:
+    for i in ids:
+        await notifier.send_signal(signal(i, chat_id))
+    return {f"T{i}USDT" for i in ids}
+
+
+def exactly_once(server: FakeTelegram, chat_id: str, expected: set, what: str):
+    counts = delivered(server, chat_id)
+    missing = expected - set(counts)
+    twice = [s for s, n in counts.items() if n > 1]
+    if missing or twice or set(counts) - expected:
+        raise AssertionError(f"{what}: {len(missing)} lost, {len(twice)} duplicated")
+
+
+async def scenarios(args):
+    server = FakeTelegram()
+    await server.start()
+    folder = tempfile.mkdtemp()
+    retry_path = os.path.join(folder, 'pending.json')
+    notifier = TelegramNotifier('token', base_url=server.base_url, retry_path=retry_path,
+                                digest_threshold=3, digest_window=0.2)
+    try:
+        # a burst becomes digests that respect the length limit
+        expected = await send(notifier, '@digest', range(0, 120))
+        await notifier.flush(timeout=30)
+        texts = [m['text'] for m in server.messages if m['chat_id'] == '@digest']
+        assert len(texts) > 1 and all(len(t) <= MAX_MESSAGE_LENGTH for t in texts), \
+            f"{len(texts)} digest messages, longest {max(map(len, texts))} characters"
+        exactly_once(server, '@digest', expected, 'digest')
+        print(f"ok  120 signals in {len(texts)} digest messages of at most {MAX_MESSAGE_LENGTH} characters")
+
+        # a 429 for one chat delays that chat only
+        server.fail('@limited', 429, body=FakeTelegram.error(429, 'Too Many Requests: retry after 2', 2))
+        started = time.monotonic()
+        limited = await send(notifier, '@limited', [200])
+        other = await send(notifier, '@other', [201])
+        await notifier.flush(timeout=30)
+        exactly_once(server, '@limited', limited, '429')
+        exactly_once(server, '@other', other, '429 other chat')
+        retried_after = sent_at(server, '@limited')[-1] - sent_at(server, '@limited')[0]
+        other_after = sent_at(server, '@other')[0] - started
+        assert retried_after >= 2 and other_after < 1, \
+            f"limited chat retried after {retried_after:.2f}s, other chat waited {other_after:.2f}s"
+        print(f"ok  429 retried after {retried_after:.2f}s, other chat sent after {other_after:.2f}s")
+
+        # Markdown errors are resent as plain text
+        server.fail('@markdown', 400, body=FakeTelegram.error(400, "Bad Request: can't parse entities: x"))
+        expected = await send(notifier, '@markdown', [300])
+        await notifier.flush(timeout=30)
+        calls = [p for _, p in server.attempts if p['chat_id'] == '@markdown']
+        assert len(calls) == 2 and 'parse_mode' in calls[0] and 'parse_mode' not in calls[1], \
+            "no plain text fallback"
+        exactly_once(server, '@markdown', expected, 'markdown fallback')
+        print("ok  Markdown error resent as plain text")
+
+        # permanent errors drop the message, 5xx are retried
+        server.fail('@blocked', 403, body=FakeTelegram.error(403, 'Forbidden: bot was blocked by the user'))
+        server.fail('@gone', 400, body=FakeTelegram.error(400, 'Bad Request: chat not found'))
+        server.fail('@flaky', 502, 503, body=FakeTelegram.error(502, 'Bad Gateway'))
+        rejected = notifier.rejected
+        await send(notifier, '@blocked', [400])
+        await send(notifier, '@gone', [401])
+        expected = await send(notifier, '@flaky', [402])
+        await notifier.flush(timeout=30)
+        for chat in ('@blocked', '@gone'):
+            calls = [p for _, p in server.attempts if p['chat_id'] == chat]
+            assert len(calls) == 1 and not delivered(server, chat), f"{chat} retried {len(calls) - 1} times"
+        assert notifier.rejected - rejected == 2 and not notifier.metrics()['pending']
+        exactly_once(server, '@flaky', expected, '5xx retry')
+        print("ok  403 and chat not found dropped, 5xx retried until delivered")
+
+        # messages pending at shutdown survive a restart, delivered ones are not resent
+        server.fail('@restart', *[502] * 50, body=FakeTelegram.error(502, 'Bad Gateway'))
+        pending = await send(notifier, '@restart', range(500, 510))
+        done = await send(notifier, '@done', range(600, 603))
+        await asyncio.sleep(1.0)
+        await notifier.close(timeout=0.5)
+        server.faults['@restart'].clear()
+        assert not delivered(server, '@restart'), "delivered while the chat was failing"
+        restarted = TelegramNotifier('token', base_url=server.base_url, retry_path=retry_path,
+                                     digest_threshold=3, digest_window=0.2)
+        await restarted.start()
+        await restarted.flush(timeout=30)
+        await restarted.close()
+        exactly_once(server, '@restart', pending, 'restart')
+        exactly_once(server, '@done', done, 'restart, delivered before')
+        print(f"ok  {len(pending)} pending messages delivered once after a restart")
+
+        # queueing cost, retry buffer writes included
+        notifier = TelegramNotifier('token', base_url=server.base_url, retry_path=retry_path)
+        started = time.perf_counter()
+        for i in range(args.signals):
+            await notifier.send_signal(signal(i, '@bulk'))
+        queued = time.perf_counter() - started
+        print(f"    {args.signals} signals queued in {queued * 1000:.1f} ms")
+    finally:
+        await notifier.close(timeout=0.1)
+        await server.close()
+        for name in os.listdir(folder):
+            os.remove(os.path.join(folder, name))
+        os.rmdir(folder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--signals', type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(scenarios(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,352 @@
+"""Deterministic synthetic market data and local stand-ins for Elbank and Telegram.
+
+`SyntheticMarket` generates OHLCV for any number of symbols as geometric
+Brownian motion whose drift and volatility switch between regimes (calm,
+trending up, trending down, volatile) on a Markov chain. Every symbol also
+loads on a common market factor, so returns are correlated the way
+altcoins are, and symbols differ in price level, volatility and volume so
+they spread over the liquidity tiers. The same seed gives the same data
+on every machine.
+
+`FakeElbank` serves that market over HTTP with the endpoints and payloads
+of the real API (`market/symbols`, `market/ohlc`, `market/news`), and
+`FakeTelegram` accepts `sendMessage` calls, so the bot can run unchanged
+against `base_url`s on 127.0.0.1. Both can be told to fail the next calls
+of an endpoint with given statuses, bodies and headers (`fail`), and log
+when and over which connection every call arrived. `FakeElbankStream` is the kline
+websocket: it tracks subscriptions, answers heartbeats, pushes klines of
+the market on demand and can drop connections to force a reconnect.
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+from aiohttp import WSMsgType, web
+
+from core.candle_store import PRICE_COLUMNS, TIMEFRAME_MS
+
+# name, drift and volatility of one candle's log return
+REGIMES: Tuple[Tuple[str, float, float], ...] = (
+    ('calm', 0.0, 0.004),
+    ('trend_up', 0.0008, 0.008),
+    ('trend_down', -0.0008, 0.009),
+    ('volatile', 0.0, 0.025)
+)
+
+HEADLINES = (
+    '{name} surges after exchange listing',
+    '{name} rallies as inflows hit record highs',
+    '{name} partnership announced, adoption grows',
+    '{name} plunges after exploit drains bridge',
+    '{name} falls as regulators open investigation',
+    '{name} network outage halts withdrawals',
+    '{name} trading volume steady ahead of upgrade',
+    'Analysts see no crash for {name} despite fears'
+)
+
+
+def regime_path(n: int, rng: np.random.Generator, mean_length: float = 120.0) -> np.ndarray:
+    """Regime index per candle; a regime lasts `mean_length` candles on average."""
+    switches = rng.random(n) < 1.0 / mean_length
+    switches[0] = True
+    # jump to a different regime at every switch
+    steps = np.where(switches, rng.integers(1, len(REGIMES), n), 0)
+    return np.cumsum(steps) % len(REGIMES)
+
+
+def synthetic_ohlc(n: int, seed: int = 7, market: Optional[np.ndarray] = None, beta: float = 0.6,
+                   timeframe: str = '1h', start: int = 1_600_000_000_000) -> Dict[str, np.ndarray]:
+    """One symbol's candles: regime-switching GBM, optionally loaded on `market` returns."""
+    rng = np.random.default_rng(seed)
+    regime = regime_path(n, rng)
+    drift = np.array([r[1] for r in REGIMES])[regime]
+    sigma = np.array([r[2] for r in REGIMES])[regime] * rng.lognormal(0.0, 0.3)
+    returns = drift - 0.5 * sigma ** 2 + sigma * rng.standard_normal(n)
+    if market is not None:
+        returns = beta * market[:n] + np.sqrt(1 - beta ** 2) * returns
+
+    close = rng.lognormal(1.0, 2.0) * np.exp(np.cumsum(returns))
+    open_ = np.r_[close[0] * np.exp(-returns[0]), close[:-1]]
+    wick = np.abs(rng.standard_normal((2, n))) * sigma * 0.5
+    high = np.maximum(open_, close) * np.exp(wick[0])
+    low = np.minimum(open_, close) * np.exp(-wick[1])
+    # busier in volatile regimes and on large moves
+    volume = rng.lognormal(8.0, 1.5) * rng.lognormal(0.0, 0.4, n) * (1 + 50 * np.abs(returns))
+    return {
+        'timestamp': start + np.arange(n, dtype=np.int64) * TIMEFRAME_MS[timeframe],
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume
+    }
+
+
+class SyntheticMarket:
+    """A fixed universe of synthetic symbols whose candles are revealed one at a time.
+
+    `visible` candles of each symbol are "closed" and served; `advance()`
+    closes the next one, so a benchmark can run cycle after cycle on
+    fresh data without regenerating anything.
+    """
+
+    def __init__(self, symbols: int = 100, candles: int = 1000, extra: int = 100,
+                 seed: int = 7, timeframe: str = '1h'):
+        self.timeframe = timeframe
+        self.visible = candles
+        n = candles + extra
+        rng = np.random.default_rng(seed)
+        self.market = regime_path(n, rng)
+        market = np.array([r[2] for r in REGIMES])[self.market] * rng.standard_normal(n)
+        self.symbols = [f"S{i:04d}USDT" for i in range(symbols)]
+        self.data = {
+            symbol: synthetic_ohlc(n, seed=seed * 100_003 + i, market=market, timeframe=timeframe)
+            for i, symbol in enumerate(self.symbols)
+        }
+        self.rows = {symbol: np.column_stack([ohlc['timestamp']] + [ohlc[c] for c in PRICE_COLUMNS])
+                     for symbol, ohlc in self.data.items()}
+
+    @property
+    def capacity(self) -> int:
+        return len(next(iter(self.data.values()))['close'])
+
+    def advance(self, candles: int = 1):
+        self.visible = min(self.capacity, self.visible + candles)
+
+    def ohlc(self, symbol: str, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        end = self.visible if end is None else end
+        return {k: v[:end] for k, v in self.data[symbol].items()}
+
+    def candles(self, symbol: str, since: Optional[int] = None, limit: Optional[int] = None) -> List[List[float]]:
+        """[timestamp, open, high, low, close, volume] rows as `market/ohlc` returns them."""
+        rows = self.rows[symbol][:self.visible]
+        if since is not None:
+            rows = rows[np.searchsorted(rows[:, 0], since):]
+        rows = rows[-(limit or 1000):]
+        return [[int(row[0])] + row[1:].tolist() for row in rows]
+
+    def news(self, count: int = 50, seed: int = 0) -> List[Dict[str, Any]]:
+        rng = np.random.default_rng(seed)
+        now = time.time()
+        items = []
+        for i in range(count):
+            symbol = self.symbols[rng.integers(len(self.symbols))]
+            items.append({
+                'title': HEADLINES[rng.integers(len(HEADLINES))].format(name=symbol[:-4]),
+                'url': f"https://news.example/{seed}/{i}",
+                'source': 'synthetic',
+                'published_at': now - float(rng.uniform(0, 12 * 3600))
+            })
+        return items
+
+
+class _Server(ABC):
+    """Local aiohttp server on a free port; subclasses add their routes."""
+
+    def __init__(self, latency: float = 0.0, host: str = '127.0.0.1'):
+        self.latency = latency
+        self.host = host
+        self.requests: Counter = Counter()
+        # endpoint -> (monotonic time, client address) of every call
+        self.calls: Dict[str, List[Tuple[float, Any]]] = defaultdict(list)
+        self.faults: Dict[str, Deque[Tuple[int, Dict[str, Any], Dict[str, str]]]] = defaultdict(deque)
+        self.port: Optional[int] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @abstractmethod
+    def routes(self, app: web.Application):
+        ...
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def fail(self, endpoint: str, *statuses: int, body: Optional[Dict[str, Any]] = None,
+             headers: Optional[Dict[str, str]] = None):
+        """Answer the next calls of `endpoint`, one per status, with these errors."""
+        for status in statuses:
+            self.faults[endpoint].append((status, body or {}, headers or {}))
+
+    async def _enter(self, request: web.Request, endpoint: str) -> Optional[web.Response]:
+        """Record a call and apply the latency; returns the injected error, if any."""
+        self.requests[endpoint] += 1
+        self.calls[endpoint].append((time.monotonic(), request.transport.get_extra_info('peername')))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._fault(endpoint)
+
+    def _fault(self, key: str) -> Optional[web.Response]:
+        if not self.faults[key]:
+            return None
+        status, body, headers = self.faults[key].popleft()
+        return web.json_response(body, status=status, headers=headers)
+
+    async def start(self) -> str:
+        app = web.Application()
+        self.routes(app)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+
+class FakeElbank(_Server):
+    """Elbank REST endpoints backed by a SyntheticMarket, with optional per-request latency."""
+
+    def __init__(self, market: SyntheticMarket, latency: float = 0.0, news_count: int = 50, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.market = market
+        self.news_count = news_count
+
+    def routes(self, app: web.Application):
+        app.router.add_get('/market/symbols', self._symbols)
+        app.router.add_get('/market/ohlc', self._ohlc)
+        app.router.add_get('/market/news', self._news)
+
+    async def _symbols(self, request: web.Request) -> web.Response:
+        fault = await self._enter(request, 'market/symbols')
+        if fault is not None:
+            return fault
+        return web.json_response({'symbols': self.market.symbols})
+
+    async def _ohlc(self, request: web.Request) -> web.Response:
+        fault = await self._enter(request, 'market/ohlc')
+        if fault is not None:
+            return fault
+        symbol = request.query.get('symbol')
+        if symbol not in self.market.data:
+            return web.json_response({'error': f"unknown symbol {symbol}"}, status=400)
+        since = request.query.get('since')
+        limit = request.query.get('limit')
+        candles = self.market.candles(symbol, int(since) if since else None, int(limit) if limit else None)
+        return web.json_response({'candles': candles})
+
+    async def _news(self, request: web.Request) -> web.Response:
+        fault = await self._enter(request, 'market/news')
+        if fault is not None:
+            return fault
+        # new articles every candle, stable within one
+        return web.json_response({'news': self.market.news(self.news_count, seed=self.market.visible)})
+
+
+class FakeTelegram(_Server):
+    """Accepts Bot API `sendMessage` calls for any token and keeps the messages.
+
+    Besides `fail('sendMessage', ...)`, errors can be injected for a single
+    chat with `fail(chat_id, ...)`; `error` builds Bot API error bodies.
+    """
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.messages: List[Dict[str, Any]] = []
+        self.attempts: List[Tuple[float, Dict[str, Any]]] = []  # (time, payload) of every call
+
+    @staticmethod
+    def error(status: int, description: str, retry_after: Optional[int] = None) -> Dict[str, Any]:
+        body = {'ok': False, 'error_code': status, 'description': description}
+        if retry_after is not None:
+            body['parameters'] = {'retry_after': retry_after}
+        return body
+
+    def routes(self, app: web.Application):
+        app.router.add_post('/{bot}/sendMessage', self._send)
+
+    async def _send(self, request: web.Request) -> web.Response:
+        fault = await self._enter(request, 'sendMessage')
+        payload = await request.json()
+        self.attempts.append((time.monotonic(), payload))
+        fault = fault or self._fault(str(payload.get('chat_id')))
+        if fault is not None:
+            return fault
+        self.messages.append(payload)
+        return web.json_response({'ok': True, 'result': {'message_id': len(self.messages)}})
+
+
+class FakeElbankStream(_Server):
+    """Kline websocket at `/ws` serving a SyntheticMarket.
+
+    Klines are only sent when `push` is called, so a test decides exactly
+    which candles the client sees (and which it has to backfill).
+    """
+
+    def __init__(self, market: SyntheticMarket, **kwargs):
+        super().__init__(**kwargs)
+        self.market = market
+        self.sockets: List[web.WebSocketResponse] = []
+        self.subscriptions: Dict[web.WebSocketResponse, List[str]] = {}
+        self.pings = 0
+        self.connections = 0
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    def routes(self, app: web.Application):
+        app.router.add_get('/ws', self._handle)
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(autoping=False)
+        await ws.prepare(request)
+        self.connections += 1
+        self.sockets.append(ws)
+        self.subscriptions[ws] = []
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.PING:
+                    self.pings += 1
+                    await ws.pong(msg.data)
+                elif msg.type == WSMsgType.TEXT:
+                    message = msg.json()
+                    if message.get('method') == 'SUBSCRIBE':
+                        self.subscriptions[ws].extend(message.get('params', []))
+                        await ws.send_json({'result': None, 'id': message.get('id')})
+        finally:
+            self.sockets.remove(ws)
+            self.subscriptions.pop(ws, None)
+        return ws
+
+    def subscribed(self) -> List[str]:
+        return [name for names in self.subscriptions.values() for name in names]
+
+    def kline(self, symbol: str, index: int, closed: bool = True) -> Dict[str, Any]:
+        row = self.market.rows[symbol][index]
+        return {
+            'stream': f"{symbol.lower()}@kline_{self.market.timeframe}",
+            'data': {
+                's': symbol,
+                'k': {'t': int(row[0]), 'o': row[1], 'h': row[2], 'l': row[3], 'c': row[4],
+                      'v': row[5], 'x': closed}
+            }
+        }
+
+    async def push(self, symbol: str, index: int, closed: bool = True) -> int:
+        """Send candle `index` of `symbol` to every connection subscribed to it."""
+        stream = f"{symbol.lower()}@kline_{self.market.timeframe}"
+        sent = 0
+        for ws, names in list(self.subscriptions.items()):
+            if stream in names and not ws.closed:
+                await ws.send_json(self.kline(symbol, index, closed))
+                sent += 1
+        return sent
+
+    async def drop(self):
+        """Close every connection, as a server restart or network cut would."""
+        for ws in list(self.sockets):
+            await ws.close()
@@ -1,5 +1,5 @@
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 class Settings:
     # تنظیمات API
@@ -7,22 +7,124 @@ class Settings:
     ELBANK_API_SECRET: str = os.getenv("ELBANK_API_SECRET", "your_api_secret_here")
     TELEGRAM_TOKEN: str = os.getenv("TELEGRAM_TOKEN", "your_bot_token_here")
     TELEGRAM_CHAT_ID: str = os.getenv("TELEGRAM_CHAT_ID", "@your_channel")
+    TELEGRAM_BASE_URL: str = os.getenv("TELEGRAM_BASE_URL", "https://api.telegram.org")
+    TELEGRAM_RETRY_PATH: str = "telegram_pending.json"  # پیام‌های ارسال نشده
+    TELEGRAM_DIGEST_THRESHOLD: int = 3  # از این تعداد سیگنال به بالا یک پیام خلاصه ارسال می‌شود
+    TELEGRAM_DIGEST_WINDOW: float = 2.0  # مدت جمع‌آوری سیگنال‌ها برای پیام خلاصه (ثانیه)
+    
+    # تنظیمات اتصال به صرافی
+    ELBANK_BASE_URL: str = os.getenv("ELBANK_BASE_URL", "https://api.elbank.com/v1")
+    ELBANK_POOL_SIZE: int = 32  # حداکثر اتصال‌های همزمان
+    ELBANK_KEEPALIVE: float = 30.0  # نگهداری اتصال بیکار (ثانیه)
+    ELBANK_WEIGHT_LIMIT: int = 1200  # سقف وزن درخواست در دقیقه
+    ELBANK_MAX_RETRIES: int = 4
+    ELBANK_WS_URL: str = os.getenv("ELBANK_WS_URL", "wss://stream.elbank.com/ws")
+    ELBANK_WS_STREAMS_PER_CONNECTION: int = 200  # تعداد استریم روی هر اتصال وب‌سوکت
+    ELBANK_WS_HEARTBEAT: float = 20.0
+    ELBANK_ENDPOINT_WEIGHTS: Dict[str, int] = {
+        'market/ohlc': 2,
+        'market/symbols': 10,
+        'market/news': 1
+    }
     
     # تنظیمات ترید
     RISK_PER_TRADE: float = 0.01  # 1% از سرمایه
     RR_RATIO: int = 3  # نسبت ریسک به ریوارد
-    MAX_LEVERAGE: int = 20  # حداکثر لورج مجاز
+    MAX_LEVERAGE: int = 20  # حداکثر لورج مجاز (برای کل حساب نیز)
+    ACCOUNT_EQUITY: float = float(os.getenv("ACCOUNT_EQUITY", "10000"))  # سرمایه مبنای اندازه پوزیشن‌ها
+    RISK_MAX_PORTFOLIO: float = 0.05  # حداکثر ریسک همبسته همه پوزیشن‌ها در حد ضرر (نسبت به سرمایه)
+    RISK_CORRELATION_WINDOW: int = 100  # تعداد کندل برای همبستگی بازده نمادها
+    
+    # معاملات کاغذی (شبیه‌سازی اجرای سیگنال‌ها)
+    PAPER_TRADING: bool = os.getenv("PAPER_TRADING", "1") == "1"
+    PAPER_EQUITY: float = float(os.getenv("PAPER_EQUITY", str(ACCOUNT_EQUITY)))  # سرمایه اولیه
+    PAPER_MAX_EXPOSURE: float = 3.0  # حداکثر مجموع ارزش پوزیشن‌ها نسبت به سرمایه
+    PAPER_FEE_RATE: float = 0.0006
+    PAPER_SLIPPAGE: float = 0.0005
+    PAPER_MAX_HOLD_HOURS: float = 168  # بستن پوزیشن پس از این مدت
+    PAPER_CLOSED_HISTORY: int = 1000  # تعداد پوزیشن‌های بسته شده نگهداری شده در حافظه و وضعیت
+    
+    # تنظیمات اسکنر
+    SCAN_INTERVAL: int = 60  # فاصله بین چرخه‌ها (ثانیه)
+    SCAN_CONCURRENCY: int = int(os.getenv("SCAN_CONCURRENCY", "16"))  # حداکثر نمادهای همزمان
+    SYMBOL_TIMEOUT: float = float(os.getenv("SYMBOL_TIMEOUT", "30"))  # مهلت آنالیز هر نماد (ثانیه)
+    STREAMING: bool = os.getenv("STREAMING", "0") == "1"  # دریافت کندل‌ها از وب‌سوکت
+    STREAM_UPDATE_INTERVAL: float = 60.0  # حداقل فاصله آنالیز کندل در حال تشکیل (ثانیه)
+    UNIVERSE_TTL: float = 3600.0  # اعتبار لیست نمادها (ثانیه)
+    UNIVERSE_WINDOW: int = 168  # تعداد کندل برای رتبه‌بندی حجم و نوسان
+    UNIVERSE_VOLATILITY_WEIGHT: float = 0.3  # وزن نوسان در رتبه (بقیه حجم معاملات)
+    # سطح‌ها: (نام، سهم تجمعی از نمادهای رتبه‌بندی شده، اسکن هر چند چرخه)
+    UNIVERSE_TIERS: list = [('core', 0.2, 1), ('active', 0.5, 3), ('tail', 1.0, 12)]
+    UNIVERSE_MAX_PER_CYCLE: int = int(os.getenv("UNIVERSE_MAX_PER_CYCLE", "0"))  # سقف نماد در هر چرخه، 0 یعنی بدون سقف
+    PREFILTER: bool = os.getenv("PREFILTER", "1") == "1"  # فقط نمادهای کاندید آنالیز کامل می‌شوند
+    PREFILTER_ATR_BAND: tuple = (0.002, 0.1)  # بازه مجاز ATR نسبت به قیمت
+    PREFILTER_VOLUME_FACTOR: float = 2.0  # جهش حجم نسبت به میانگین 20 کندل
+    PREFILTER_LEVEL_DISTANCE: float = 0.01  # حداکثر فاصله نسبی قیمت تا حمایت/مقاومت
     
     # تنظیمات الگوها
+    # بازه نسبت‌های فیبوناچی هر الگو (حداقل، حداکثر)
+    # ab_retrace: اصلاح AB از XA | bc_retrace: اصلاح BC از AB
+    # cd_extension: امتداد CD از BC | xa_retrace: محل D نسبت به XA
     HARMONIC_PATTERNS: Dict[str, Any] = {
-        'gartley': {'xa_retrace': 0.618, 'ab_retrace': 0.382},
-        'bat': {'xa_retrace': 0.886, 'ab_retrace': 0.382},
-        'butterfly': {'xa_retrace': 0.786, 'ab_retrace': 0.382},
-        'crab': {'xa_retrace': 1.618, 'ab_retrace': 0.382}
+        'gartley': {'ab_retrace': (0.618, 0.618), 'bc_retrace': (0.382, 0.886),
+                    'cd_extension': (1.272, 1.618), 'xa_retrace': (0.786, 0.786)},
+        'bat': {'ab_retrace': (0.382, 0.5), 'bc_retrace': (0.382, 0.886),
+                'cd_extension': (1.618, 2.618), 'xa_retrace': (0.886, 0.886)},
+        'butterfly': {'ab_retrace': (0.786, 0.786), 'bc_retrace': (0.382, 0.886),
+                      'cd_extension': (1.618, 2.618), 'xa_retrace': (1.272, 1.618)},
+        'crab': {'ab_retrace': (0.382, 0.618), 'bc_retrace': (0.382, 0.886),
+                 'cd_extension': (2.24, 3.618), 'xa_retrace': (1.618, 1.618)},
+        'shark': {'ab_retrace': (0.382, 0.618), 'bc_retrace': (1.13, 1.618),
+                  'cd_extension': (1.618, 2.24), 'xa_retrace': (0.886, 1.13)}
     }
+    HARMONIC_TOLERANCE: float = 0.05  # خطای مجاز نسبی برای هر نسبت
+    HARMONIC_ZIGZAG_THRESHOLD: float = 0.02  # حداقل برگشت قیمت برای تایید سقف/کف
+    HARMONIC_PIVOT_DEPTH: int = 8  # تعداد پیوت‌های اخیر برای جستجوی XABCD
+    
+    # تنظیمات پرایس اکشن و اسمارت مانی
+    KEY_LEVEL_LOOKBACK: int = 20  # تعداد کندل برای سطوح کلیدی
+    OB_VOLUME_FACTOR: float = 1.5  # ضریب حجم برای تشخیص اوردر بلاک
+    
+    # اجرای آنالیز سنگین در پروسس‌های جداگانه
+    ANALYSIS_INLINE: bool = os.getenv("ANALYSIS_INLINE", "0") == "1"  # اجرا داخل حلقه رویداد (برای تست)
+    ANALYSIS_WORKERS: int = int(os.getenv("ANALYSIS_WORKERS", "0"))  # 0 یعنی همه هسته‌ها
+    ANALYSIS_CHUNK_SIZE: int = 8  # حداکثر تعداد نماد در هر ارسال به یک پروسس
+    # روش ساخت پروسس‌ها: fork، spawn یا forkserver (خالی یعنی پیش‌فرض سیستم)
+    ANALYSIS_START_METHOD: str = os.getenv("ANALYSIS_START_METHOD", "")
+    
+    # مانیتورینگ
+    METRICS_PORT: int = int(os.getenv("METRICS_PORT", "9108"))  # 0 یعنی غیرفعال
+    METRICS_LOG_INTERVAL: float = 300.0  # فاصله لاگ خلاصه متریک‌ها (ثانیه)
+    PROFILE_CYCLE_PATH: str = os.getenv("PROFILE_CYCLE_PATH", "")  # پروفایل اولین چرخه در این فایل
+    
+    # تنظیمات بهینه‌سازی پارامترها
+    OPTIMIZER_WORKERS: int = int(os.getenv("OPTIMIZER_WORKERS", "0"))  # 0 یعنی همه هسته‌ها
+    
+    # الگوهای کندلی talib که بررسی می‌شوند (None یعنی همه)
+    CANDLE_PATTERNS: Optional[List[str]] = None
     
     # تنظیمات تایم‌فریم
-    TIMEFRAMES: list = ['1h', '4h', '1d']
+    # تایم‌فریم‌های بالاتر از کندل‌های تایم‌فریم پایه ساخته می‌شوند و هر کدام حداقل
+    # MTF_MIN_CANDLES کندل بسته لازم دارند: 1000 کندل 1h برای 4h کافی است و 1d به
+    # حدود 4800 کندل (CANDLE_CAPACITY) نیاز دارد
+    TIMEFRAMES: list = ['1h', '4h']
+    CANDLE_CAPACITY: int = 1000  # تعداد کندل نگهداری شده برای هر نماد
+    MTF_MIN_CANDLES: int = 200  # حداقل کندل بسته تایم‌فریم بالاتر برای محاسبه جهت (دوره EMA200)
+    CONTEXT_CACHE_SIZE: int = 2048  # تعداد نماد/تایم‌فریم با محاسبات مشترک در حافظه
+    CANDLE_ARCHIVE_DIR: str = os.getenv("CANDLE_ARCHIVE_DIR", "data/candles")  # آرشیو کندل‌های بسته شده
+    CANDLE_ARCHIVE: bool = os.getenv("CANDLE_ARCHIVE", "1") == "1"
+    
+    # اخبار
+    NEWS_INTERVAL: float = 300.0  # فاصله دریافت فیدهای خبری (ثانیه)
+    NEWS_CACHE_TTL: float = 900.0  # اعتبار احساسات محاسبه شده هر نماد (ثانیه)
+    NEWS_WINDOW_HOURS: float = 24  # اخبار قدیمی‌تر کنار گذاشته می‌شوند
+    NEWS_HALF_LIFE_HOURS: float = 6  # نیمه‌عمر وزن هر خبر در میانگین
+    NEWS_NEUTRAL_BAND: float = 0.15  # امتیاز کمتر از این مقدار خنثی است
+    
+    # ذخیره وضعیت برای راه‌اندازی مجدد سریع
+    STATE_PATH: str = os.getenv("STATE_PATH", "data/bot_state.pkl")  # خالی یعنی غیرفعال
+    STATE_SNAPSHOT_INTERVAL: float = 300.0  # فاصله ذخیره وضعیت (ثانیه)
+    STATE_SIGNAL_LOG: int = 500  # تعداد آخرین سیگنال‌های ارسال شده در وضعیت
     
     # فعال/غیرفعال کردن ماژول‌ها
     MODULES: Dict[str, bool] = {
@@ -1 +1,271 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
+import numpy as np
+
+from config import settings
+from core.candle_store import PRICE_COLUMNS
+from core.executor import _analyze
+from core.pattern_detector import PatternDetector
+from core.pipeline import Prefilter
+from core.records import Signal
+from core.risk_engine import RiskEngine
+from core.signal_engine import SignalEngine
+from core.timeframes import TimeframeConfluence
+
+logger = logging.getLogger(__name__)
+
+HOUR_MS = 3600_000
+
+
+@dataclass
+class Trade:
+    symbol: str
+    direction: int  # 1 = BUY, -1 = SELL
+    entry_time: int
+    exit_time: int
+    entry: float
+    exit: float  # average fill price of all exits
+    stop_loss: float
+    target1: float
+    target2: float
+    outcome: str
+    return_pct: float  # net of fees and slippage, unlevered
+    r_multiple: float
+    leverage: int
+    strength: int
+    pattern: str
+
+
+@dataclass
+class BacktestResult:
+    trades: List[Trade] = field(default_factory=list)
+    invalid_signals: int = 0
+    risk_per_trade: float = 0.01
+
+    def equity_curve(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(exit times, equity) when every trade risks `risk_per_trade` of equity."""
+        if not self.trades:
+            return np.zeros(0, dtype=np.int64), np.ones(0)
+        trades = sorted(self.trades, key=lambda t: t.exit_time)
+        times = np.array([t.exit_time for t in trades], dtype=np.int64)
+        r = np.array([t.r_multiple for t in trades])
+        return times, np.cumprod(1 + self.risk_per_trade * r)
+
+    def stats(self) -> Dict[str, Any]:
+        _, equity = self.equity_curve()
+        r = np.array([t.r_multiple for t in self.trades])
+        returns = np.array([t.return_pct for t in self.trades])
+        if not len(r):
+            return {'trades': 0, 'invalid_signals': self.invalid_signals}
+
+        peaks = np.maximum.accumulate(np.r_[1.0, equity])
+        drawdown = 1 - np.r_[1.0, equity] / peaks
+        losses = -r[r < 0].sum()
+        outcomes: Dict[str, int] = {}
+        for t in self.trades:
+            outcomes[t.outcome] = outcomes.get(t.outcome, 0) + 1
+        hold = np.array([t.exit_time - t.entry_time for t in self.trades]) / HOUR_MS
+
+        return {
+            'trades': len(r),
+            'invalid_signals': self.invalid_signals,
+            'win_rate': float((r > 0).mean()),
+            'total_return': float(equity[-1] - 1),
+            'max_drawdown': float(drawdown.max()),
+            'avg_return_pct': float(returns.mean()),
+            'avg_r': float(r.mean()),
+            'median_r': float(np.median(r)),
+            'std_r': float(r.std()),
+            'best_r': float(r.max()),
+            'worst_r': float(r.min()),
+            'profit_factor': float(r[r > 0].sum() / losses) if losses > 0 else float('inf'),
+            'avg_hold_hours': float(hold.mean()),
+            'outcomes': outcomes
+        }
+
+
+class Backtester:
+    """Replays stored candles through the live analysis and signal path.
+
+    Signals are produced exactly as in `TradingBot`: candles must pass the
+    same `Prefilter` (when `settings.PREFILTER` is on), then go through the
+    analysis workers' `_analyze`, higher-timeframe confluence included, and
+    `SignalEngine.build_signal`, with the same per-symbol cooldown. The
+    analyzers see a window as long as the bot's candle buffer (zero-copy
+    slices); indicators come from one vectorized pass over each symbol's
+    history, and the prefilter is evaluated for every candle at once. The
+    outcome of each signal is resolved with a vectorized scan of the
+    following candles instead of stepping candle by candle:
+
+    * half of the position closes at target1, the rest at target2;
+    * after target1 the stop moves to the entry price;
+    * if stop and target are touched in the same candle the stop wins;
+    * positions still open after `max_hold` candles close at market.
+    """
+
+    def __init__(
+        self,
+        signal_engine: Optional[SignalEngine] = None,
+        timeframes: Optional[TimeframeConfluence] = None,
+        prefilter: Optional[Prefilter] = None,
+        fee_rate: float = 0.0006,
+        slippage: float = 0.0005,
+        warmup: int = 200,
+        window: Optional[int] = None,
+        cooldown_hours: float = 4,
+        max_hold: int = 168,
+        min_strength: int = 1,
+        risk_per_trade: Optional[float] = None
+    ):
+        self.pattern_detector = PatternDetector()
+        self.signals = signal_engine or SignalEngine(
+            self.pattern_detector,
+            RiskEngine(risk_per_trade=settings.RISK_PER_TRADE, rr_ratio=settings.RR_RATIO)
+        )
+        self.timeframes = timeframes or TimeframeConfluence(self.signals)
+        self.prefilter = (prefilter or Prefilter()) if settings.PREFILTER else None
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.warmup = warmup
+        self.window = window or settings.CANDLE_CAPACITY
+        self.cooldown_ms = int(cooldown_hours * HOUR_MS)
+        self.max_hold = max_hold
+        self.min_strength = min_strength
+        self.risk_per_trade = settings.RISK_PER_TRADE if risk_per_trade is None else risk_per_trade
+
+    def run(self, data: Dict[str, Dict[str, np.ndarray]]) -> BacktestResult:
+        """Backtest every symbol in `data` (symbol -> OHLC column arrays)."""
+        result = BacktestResult(risk_per_trade=self.risk_per_trade)
+        for symbol, ohlc in data.items():
+            trades, invalid = self.run_symbol(symbol, ohlc)
+            result.trades.extend(trades)
+            result.invalid_signals += invalid
+        return result
+
+    def run_symbol(self, symbol: str, ohlc: Dict[str, np.ndarray]) -> Tuple[List[Trade], int]:
+        times = np.asarray(ohlc['timestamp'], dtype=np.int64)
+        n = len(times)
+        series = self.pattern_detector.indicator_series(ohlc)
+        candidates = self.candidates(ohlc)
+        trades: List[Trade] = []
+        invalid = 0
+
+        i = self.warmup
+        while i < n - 1:
+            if not candidates[i]:
+                i += 1
+                continue
+            start = max(0, i - self.window + 1)
+            window = {k: v[start:i + 1] for k, v in ohlc.items()}
+            indicators = {k: float(v[i]) for k, v in series.items()}
+            timestamp = datetime.utcfromtimestamp(times[i] / 1000)
+
+            analysis = _analyze(self.signals, self.timeframes, symbol, window, timestamp, None,
+                                indicators=indicators, live=False)
+            signal = self.signals.build_signal(analysis, timestamp=timestamp)
+            if signal.strength < self.min_strength:
+                i += 1
+                continue
+
+            trade, exit_idx = self._simulate(symbol, signal, ohlc, i)
+            if trade is None:
+                invalid += 1
+                exit_idx = i
+            else:
+                trades.append(trade)
+
+            # Next signal after the cooldown and once the position is closed
+            next_allowed = max(times[i] + self.cooldown_ms, times[exit_idx])
+            i = max(exit_idx + 1, int(np.searchsorted(times, next_allowed, side='left')))
+
+        return trades, invalid
+
+    def candidates(self, ohlc: Dict[str, np.ndarray], chunk: int = 4096) -> np.ndarray:
+        """Per candle, whether the prefilter would pass the symbol with that candle last."""
+        n = len(ohlc['close'])
+        if self.prefilter is None:
+            return np.ones(n, dtype=bool)
+        length = self.prefilter.length
+        mask = np.zeros(n, dtype=bool)
+        if n < length:
+            return mask
+        # row j is the prefilter's matrix row for the window ending at candle j + length - 1
+        rows = {c: np.lib.stride_tricks.sliding_window_view(np.asarray(ohlc[c], dtype=np.float64), length)
+                for c in PRICE_COLUMNS}
+        for lo in range(0, n - length + 1, chunk):
+            matrix = {c: v[lo:lo + chunk] for c, v in rows.items()}
+            count = len(matrix['close'])
+            masks = self.prefilter.evaluate([''] * count, matrix)
+            mask[lo + length - 1:lo + length - 1 + count] = masks['candidate']
+        return mask
+
+    def _simulate(self, symbol: str, signal: Signal, ohlc: Dict[str, np.ndarray],
+                  i: int) -> Tuple[Optional[Trade], int]:
+        direction = signal.direction
+        price = signal.entry
+        stop, t1, t2 = signal.stop_loss, signal.target1, signal.target2
+
+        # Targets and stop must lie on the right side of the entry
+        if not (direction * (t1 - price) > 0 and direction * (t2 - t1) >= 0
+                and direction * (price - stop) > 0):
+            return None, i
+
+        entry = price * (1 + direction * self.slippage)
+        end = min(len(ohlc['close']), i + 1 + self.max_hold)
+        high, low = ohlc['high'][i + 1:end], ohlc['low'][i + 1:end]
+        close = ohlc['close']
+        favourable, adverse = (high, low) if direction == 1 else (low, high)
+
+        def first(mask: np.ndarray) -> int:
+            return int(mask.argmax()) if mask.any() else len(mask)
+
+        def reached(series: np.ndarray, level: float) -> np.ndarray:
+            return direction * (series - level) >= 0
+
+        def crossed(series: np.ndarray, level: float) -> np.ndarray:
+            return direction * (series - level) <= 0
+
+        horizon = len(high)
+        hit_stop = first(crossed(adverse, stop))
+        hit_t1 = first(reached(favourable, t1))
+
+        if hit_stop <= hit_t1:
+            if hit_stop < horizon:
+                exits, last, outcome = [stop * (1 - direction * self.slippage)], hit_stop, 'stop_loss'
+            else:
+                exits, last, outcome = [close[end - 1]], horizon - 1, 'timeout'
+        else:
+            hit_t2 = hit_t1 + first(reached(favourable[hit_t1:], t2))
+            hit_be = hit_t1 + 1 + first(crossed(adverse[hit_t1 + 1:], price))
+            if hit_t2 < min(hit_be, horizon):
+                exits, last, outcome = [t1, t2], hit_t2, 'target2'
+            elif hit_be < horizon:
+                exits, last, outcome = [t1, price * (1 - direction * self.slippage)], hit_be, 'target1'
+            else:
+                exits, last, outcome = [t1, close[end - 1]], horizon - 1, 'target1_timeout'
+
+        exit_price = float(np.mean(exits))
+        net = direction * (exit_price - entry) / entry - 2 * self.fee_rate
+        risk = abs(entry - stop) / entry
+        exit_idx = i + 1 + last
+        trade = Trade(
+            symbol=symbol,
+            direction=direction,
+            entry_time=int(ohlc['timestamp'][i]),
+            exit_time=int(ohlc['timestamp'][exit_idx]),
+            entry=entry,
+            exit=exit_price,
+            stop_loss=stop,
+            target1=t1,
+            target2=t2,
+            outcome=outcome,
+            return_pct=net,
+            r_multiple=net / risk,
+            leverage=signal.leverage,
+            strength=signal.strength,
+            pattern=signal.pattern
+        )
+        return trade, exit_idx
@@ -0,0 +1,282 @@
+"""Append-only on-disk candle archive with memory-mapped reads.
+
+Every symbol and timeframe gets its own directory holding one raw
+little-endian file per column (int64 timestamps, float64 prices):
+
+    <root>/<SYMBOL>/<timeframe>/timestamp.i8
+    <root>/<SYMBOL>/<timeframe>/open.f8 ... volume.f8
+
+The timestamp column is strictly increasing, so it doubles as the time
+index: a range read is two binary searches over a memory map and returns
+views backed by the page cache instead of arrays loaded into RAM.
+
+    python -m core.candle_archive import BTCUSDT_1h.csv ETHUSDT_1h.csv
+    python -m core.candle_archive import prices.csv --symbol BTCUSDT --timeframe 4h
+    python -m core.candle_archive export BTCUSDT --timeframe 1h --out BTCUSDT_1h.csv
+    python -m core.candle_archive fetch BTCUSDT ETHUSDT --since 2023-01-01
+    python -m core.candle_archive list
+
+CSV files need a header with timestamp (or time), open, high, low, close
+and volume columns; timestamps are epoch milliseconds (seconds are scaled).
+"""
+import argparse
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from core.candle_store import PRICE_COLUMNS, TIMEFRAME_MS, parse_ohlc
+
+logger = logging.getLogger(__name__)
+
+TIME_FILE = 'timestamp.i8'
+PRICE_FILES = {column: f'{column}.f8' for column in PRICE_COLUMNS}
+ROW_BYTES = 8
+
+
+class CandleArchive:
+    """Columnar candle history on disk, one directory per symbol/timeframe."""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = Path(root or settings.CANDLE_ARCHIVE_DIR)
+        # (symbol, timeframe) -> (rows mapped, column memmaps)
+        self._maps: Dict[Tuple[str, str], Tuple[int, Dict[str, np.memmap]]] = {}
+
+    def _dir(self, symbol: str, timeframe: str) -> Path:
+        return self.root / symbol / timeframe
+
+    def symbols(self) -> List[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    def timeframes(self, symbol: str) -> List[str]:
+        path = self.root / symbol
+        if not path.is_dir():
+            return []
+        return sorted((p.name for p in path.iterdir() if (p / TIME_FILE).exists()),
+                      key=lambda tf: TIMEFRAME_MS.get(tf, 0))
+
+    def count(self, symbol: str, timeframe: str) -> int:
+        """Number of complete rows; a torn append leaves columns of unequal length."""
+        path = self._dir(symbol, timeframe)
+        sizes = []
+        for name in (TIME_FILE, *PRICE_FILES.values()):
+            try:
+                sizes.append(os.path.getsize(path / name))
+            except FileNotFoundError:
+                return 0
+        return min(sizes) // ROW_BYTES
+
+    def last_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        n = self.count(symbol, timeframe)
+        if not n:
+            return None
+        with open(self._dir(symbol, timeframe) / TIME_FILE, 'rb') as f:
+            f.seek((n - 1) * ROW_BYTES)
+            return int(np.frombuffer(f.read(ROW_BYTES), dtype='<i8')[0])
+
+    def append(self, symbol: str, timeframe: str, times: np.ndarray, values: np.ndarray) -> int:
+        """Append candles newer than the last stored one, returning how many were written.
+
+        `times` must be sorted (as returned by `parse_ohlc`); rows at or before
+        the archive's last timestamp are ignored, so re-importing overlapping
+        data is harmless.
+        """
+        path = self._dir(symbol, timeframe)
+        path.mkdir(parents=True, exist_ok=True)
+        n = self.count(symbol, timeframe)
+        last = self.last_timestamp(symbol, timeframe)
+        if last is not None:
+            start = int(np.searchsorted(times, last, side='right'))
+            times, values = times[start:], values[:, start:]
+        if not len(times):
+            return 0
+
+        # Drop the tail of a previously interrupted append before writing
+        for name in (TIME_FILE, *PRICE_FILES.values()):
+            file = path / name
+            if file.exists() and os.path.getsize(file) != n * ROW_BYTES:
+                os.truncate(file, n * ROW_BYTES)
+
+        # Prices first, timestamps last: a row only counts once every column has it
+        for i, column in enumerate(PRICE_COLUMNS):
+            with open(path / PRICE_FILES[column], 'ab') as f:
+                f.write(np.ascontiguousarray(values[i], dtype='<f8').tobytes())
+        with open(path / TIME_FILE, 'ab') as f:
+            f.write(np.ascontiguousarray(times, dtype='<i8').tobytes())
+        return len(times)
+
+    def _open(self, symbol: str, timeframe: str) -> Optional[Dict[str, np.memmap]]:
+        key = (symbol, timeframe)
+        n = self.count(symbol, timeframe)
+        if not n:
+            return None
+        cached = self._maps.get(key)
+        if cached is not None and cached[0] == n:
+            return cached[1]
+        path = self._dir(symbol, timeframe)
+        maps = {'timestamp': np.memmap(path / TIME_FILE, dtype='<i8', mode='r', shape=(n,))}
+        for column, name in PRICE_FILES.items():
+            maps[column] = np.memmap(path / name, dtype='<f8', mode='r', shape=(n,))
+        self._maps[key] = (n, maps)
+        return maps
+
+    def read(self, symbol: str, timeframe: str = '1h', start: Optional[int] = None,
+             end: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """Read-only column views for start <= timestamp < end (epoch ms)."""
+        maps = self._open(symbol, timeframe)
+        if maps is None:
+            return None
+        times = maps['timestamp']
+        lo = int(np.searchsorted(times, start)) if start is not None else 0
+        hi = int(np.searchsorted(times, end)) if end is not None else len(times)
+        return {column: array[lo:hi] for column, array in maps.items()}
+
+    def tail(self, symbol: str, timeframe: str = '1h',
+             length: int = 1000) -> Optional[Dict[str, np.ndarray]]:
+        maps = self._open(symbol, timeframe)
+        if maps is None:
+            return None
+        return {column: array[-length:] for column, array in maps.items()}
+
+    def load(self, symbols: Optional[List[str]] = None, timeframe: str = '1h',
+             start: Optional[int] = None, end: Optional[int] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """symbol -> OHLC views, the input format of Backtester.run."""
+        data = {}
+        for symbol in symbols or self.symbols():
+            ohlc = self.read(symbol, timeframe, start, end)
+            if ohlc is not None and len(ohlc['timestamp']):
+                data[symbol] = ohlc
+        return data
+
+
+# --- command line ---
+
+def _parse_time(value: Optional[str]) -> Optional[int]:
+    if value is None:
+        return None
+    if value.isdigit():
+        return int(value)
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+def read_csv(path: str) -> Tuple[np.ndarray, np.ndarray]:
+    data = np.genfromtxt(path, delimiter=',', names=True, dtype=np.float64)
+    data = np.atleast_1d(data)
+    time_column = 'timestamp' if 'timestamp' in data.dtype.names else 'time'
+    times = data[time_column].astype(np.int64)
+    if len(times) and times.max() < 100_000_000_000:
+        times *= 1000  # epoch seconds
+    return parse_ohlc({'timestamp': times, **{c: data[c] for c in PRICE_COLUMNS}})
+
+
+def write_csv(path: str, ohlc: Dict[str, np.ndarray]):
+    rows = np.column_stack([ohlc['timestamp'].astype(np.float64)] + [ohlc[c] for c in PRICE_COLUMNS])
+    np.savetxt(path, rows, delimiter=',', fmt=['%d'] + ['%.10g'] * len(PRICE_COLUMNS),
+               header=','.join(('timestamp',) + PRICE_COLUMNS), comments='')
+
+
+def import_files(archive: CandleArchive, paths: List[str], symbol: Optional[str] = None,
+                 timeframe: Optional[str] = None):
+    for path in paths:
+        # BTCUSDT_1h.csv -> ('BTCUSDT', '1h') unless given explicitly
+        stem = Path(path).stem
+        name, _, tf = stem.rpartition('_')
+        file_symbol = symbol or (name if tf in TIMEFRAME_MS else stem)
+        file_timeframe = timeframe or (tf if tf in TIMEFRAME_MS else '1h')
+        times, values = read_csv(path)
+        added = archive.append(file_symbol, file_timeframe, times, values)
+        print(f"{path}: {added} of {len(times)} candles added to {file_symbol} {file_timeframe}")
+
+
+async def fetch(archive: CandleArchive, symbols: List[str], timeframe: str,
+                since: Optional[int], page: int = 1000):
+    """Backfill closed candles from the exchange, resuming after the archive's last row."""
+    from integrations.elbank_api import ElbankClient
+
+    period = TIMEFRAME_MS[timeframe]
+    async with ElbankClient(settings.ELBANK_API_KEY, settings.ELBANK_API_SECRET) as exchange:
+        if not symbols:
+            symbols = await exchange.get_all_symbols()
+        for symbol in symbols:
+            last = archive.last_timestamp(symbol, timeframe)
+            cursor = last + period if last is not None else since
+            added = 0
+            while True:
+                data = await exchange.get_ohlc(symbol, timeframe=timeframe, since=cursor, limit=page)
+                times, values = parse_ohlc(data)
+                # never archive the still forming candle
+                closed = times + period <= int(datetime.now(timezone.utc).timestamp() * 1000)
+                written = archive.append(symbol, timeframe, times[closed], values[:, closed])
+                added += written
+                if len(times) < page or not written:
+                    break
+                cursor = int(times[closed][-1]) + period
+            print(f"{symbol} {timeframe}: {added} candles fetched")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog='python -m core.candle_archive', description=__doc__.split('\n')[0])
+    parser.add_argument('--root', default=None, help='archive directory (default: settings.CANDLE_ARCHIVE_DIR)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    imp = commands.add_parser('import', help='append CSV files to the archive')
+    imp.add_argument('paths', nargs='+')
+    imp.add_argument('--symbol', help='symbol for every file (default: from SYMBOL_TIMEFRAME.csv)')
+    imp.add_argument('--timeframe', help='timeframe for every file (default: from the file name or 1h)')
+
+    exp = commands.add_parser('export', help='write archived candles to CSV')
+    exp.add_argument('symbols', nargs='+')
+    exp.add_argument('--timeframe', default='1h')
+    exp.add_argument('--start', help='epoch ms or ISO date (inclusive)')
+    exp.add_argument('--end', help='epoch ms or ISO date (exclusive)')
+    exp.add_argument('--out', help='output file for a single symbol (default: SYMBOL_TIMEFRAME.csv)')
+
+    fet = commands.add_parser('fetch', help='backfill closed candles from the exchange')
+    fet.add_argument('symbols', nargs='*', help='default: every listed symbol')
+    fet.add_argument('--timeframe', default='1h')
+    fet.add_argument('--since', help='epoch ms or ISO date for symbols not archived yet')
+
+    commands.add_parser('list', help='show archived symbols, timeframes and ranges')
+
+    args = parser.parse_args(argv)
+    archive = CandleArchive(args.root)
+
+    if args.command == 'import':
+        import_files(archive, args.paths, args.symbol, args.timeframe)
+    elif args.command == 'export':
+        if args.out and len(args.symbols) > 1:
+            parser.error('--out needs a single symbol')
+        for symbol in args.symbols:
+            ohlc = archive.read(symbol, args.timeframe, _parse_time(args.start), _parse_time(args.end))
+            if ohlc is None:
+                print(f"{symbol} {args.timeframe}: not archived")
+                continue
+            path = args.out or f"{symbol}_{args.timeframe}.csv"
+            write_csv(path, ohlc)
+            print(f"{symbol} {args.timeframe}: {len(ohlc['timestamp'])} candles written to {path}")
+    elif args.command == 'fetch':
+        asyncio.run(fetch(archive, args.symbols, args.timeframe, _parse_time(args.since)))
+    else:
+        for symbol in archive.symbols():
+            for timeframe in archive.timeframes(symbol):
+                ohlc = archive.read(symbol, timeframe)
+                if ohlc is None:
+                    continue
+                times = ohlc['timestamp']
+                first, last = (datetime.fromtimestamp(t / 1000, timezone.utc).isoformat()
+                               for t in (times[0], times[-1]))
+                print(f"{symbol:<16}{timeframe:<6}{len(times):>10}  {first} .. {last}")
+
+
+if __name__ == '__main__':
+    main()
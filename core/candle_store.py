@@ -0,0 +1,271 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+TIMEFRAME_MS = {
+    '1m': 60_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000,
+    '1h': 3_600_000, '2h': 7_200_000, '4h': 14_400_000, '1d': 86_400_000
+}
+
+
+def parse_ohlc(data: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert an OHLC payload into (timestamps, values[5, n]) arrays.
+
+    Accepts either a dict of columns or a list of
+    [timestamp, open, high, low, close, volume] rows.
+    """
+    if isinstance(data, dict):
+        if 'candles' in data:
+            return parse_ohlc(data['candles'])
+        times = np.asarray(data.get('timestamp', data.get('time', [])), dtype=np.int64)
+        values = np.vstack([np.asarray(data[c], dtype=np.float64) for c in PRICE_COLUMNS])
+    else:
+        rows = np.asarray(data, dtype=np.float64).reshape(-1, 6)
+        times = rows[:, 0].astype(np.int64)
+        values = np.ascontiguousarray(rows[:, 1:].T)
+
+    if len(times) > 1 and np.any(np.diff(times) <= 0):
+        order = np.argsort(times, kind='stable')
+        times, values = times[order], values[:, order]
+        # keep the last occurrence of duplicated timestamps
+        keep = np.append(times[1:] != times[:-1], True)
+        times, values = times[keep], values[:, keep]
+    return times, values
+
+
+def resample(ohlc: Dict[str, np.ndarray], timeframe: str) -> Dict[str, np.ndarray]:
+    """Aggregate candles into a higher timeframe with NumPy reductions.
+
+    Buckets are aligned on the epoch (UTC). The last bucket may be partial.
+    """
+    times = np.asarray(ohlc['timestamp'], dtype=np.int64)
+    if not len(times):
+        return {k: np.asarray(v)[:0] for k, v in ohlc.items()}
+    period = TIMEFRAME_MS[timeframe]
+    buckets = times - times % period
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(times)] - 1
+    return {
+        'timestamp': buckets[starts],
+        'open': np.asarray(ohlc['open'])[starts],
+        'high': np.maximum.reduceat(ohlc['high'], starts),
+        'low': np.minimum.reduceat(ohlc['low'], starts),
+        'close': np.asarray(ohlc['close'])[ends],
+        'volume': np.add.reduceat(ohlc['volume'], starts)
+    }
+
+
+class CandleBuffer:
+    """Fixed-capacity candle history for one symbol and timeframe.
+
+    Backed by arrays twice the capacity: appends write at the tail and,
+    once the tail is reached, the newest `capacity` rows are moved back to
+    the front. Every column is therefore always one contiguous slice, so
+    `as_ohlc` can hand out views instead of copies.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self._time = np.zeros(2 * capacity, dtype=np.int64)
+        self._values = np.full((len(PRICE_COLUMNS), 2 * capacity), np.nan)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        return int(self._time[self._end - 1]) if len(self) else None
+
+    def _append(self, times: np.ndarray, values: np.ndarray):
+        n = len(times)
+        if n > self.capacity:
+            times, values, n = times[-self.capacity:], values[:, -self.capacity:], self.capacity
+        if self._end + n > len(self._time):
+            keep = min(len(self), self.capacity - n)
+            src = slice(self._end - keep, self._end)
+            self._time[:keep] = self._time[src]
+            self._values[:, :keep] = self._values[:, src]
+            self._start, self._end = 0, keep
+        self._time[self._end:self._end + n] = times
+        self._values[:, self._end:self._end + n] = values
+        self._end += n
+        self._start = max(self._start, self._end - self.capacity)
+
+    def merge(self, times: np.ndarray, values: np.ndarray) -> int:
+        """Merge fetched candles, returning the number of new candles.
+
+        Candles whose timestamp is already stored (typically the still
+        forming last candle) are overwritten in place.
+        """
+        if not len(times):
+            return 0
+        if not len(self):
+            self._append(times, values)
+            return len(times)
+
+        stored = self._time[self._start:self._end]
+        last = stored[-1]
+        existing = times <= last
+        if existing.any():
+            idx = np.searchsorted(stored, times[existing])
+            found = (idx < len(stored)) & (stored[np.minimum(idx, len(stored) - 1)] == times[existing])
+            self._values[:, self._start + idx[found]] = values[:, existing][:, found]
+
+        fresh = ~existing
+        if fresh.any():
+            self._append(times[fresh], values[:, fresh])
+        return int(fresh.sum())
+
+    def as_ohlc(self) -> Dict[str, np.ndarray]:
+        """Zero-copy column views, valid until the next merge."""
+        window = slice(self._start, self._end)
+        ohlc = {'timestamp': self._time[window]}
+        for i, column in enumerate(PRICE_COLUMNS):
+            ohlc[column] = self._values[i, window]
+        return ohlc
+
+
+class CandleStore:
+    """Per-symbol, per-timeframe candle buffers kept in sync incrementally.
+
+    With an archive, new buffers start from the archived history and closed
+    candles are appended to it, so a restart only fetches what it missed.
+    Appends only happen when a buffer's newest closed candle moves on, and
+    the writes run in a thread, batched while one is in progress.
+    """
+
+    def __init__(self, exchange, capacity: Optional[int] = None, archive=None):
+        self.exchange = exchange
+        self.capacity = capacity or settings.CANDLE_CAPACITY
+        self.archive = archive
+        self.buffers: Dict[Tuple[str, str], CandleBuffer] = {}
+        self.candles_fetched = 0
+        # newest closed candle handed to the archive, per buffer
+        self._archived: Dict[Tuple[str, str], Optional[int]] = {}
+        self._archive_queue: List[Tuple[str, str, np.ndarray, np.ndarray]] = []
+        self._archive_writer: Optional[asyncio.Task] = None
+        # called as listener(symbol, timeframe, times, values) with every merged batch
+        self.listeners: List[Callable[[str, str, np.ndarray, np.ndarray], None]] = []
+
+    def buffer(self, symbol: str, timeframe: str = '1h') -> CandleBuffer:
+        key = (symbol, timeframe)
+        if key not in self.buffers:
+            self.buffers[key] = buffer = CandleBuffer(self.capacity)
+            history = self.archive.tail(symbol, timeframe, self.capacity) if self.archive else None
+            if history is not None:
+                buffer.merge(np.asarray(history['timestamp']),
+                             np.vstack([history[c] for c in PRICE_COLUMNS]))
+            if self.archive is not None:
+                self._archived[key] = buffer.last_timestamp
+        return self.buffers[key]
+
+    def merge(self, symbol: str, timeframe: str, times: np.ndarray, values: np.ndarray) -> int:
+        """Merge candles into the buffer, archive the ones that have closed and notify listeners."""
+        buffer = self.buffer(symbol, timeframe)
+        fresh = buffer.merge(times, values)
+        if self.archive is not None:
+            self._archive_closed(symbol, timeframe, buffer)
+        for listener in self.listeners:
+            listener(symbol, timeframe, times, values)
+        return fresh
+
+    def _archive_closed(self, symbol: str, timeframe: str, buffer: CandleBuffer):
+        key = (symbol, timeframe)
+        ohlc = buffer.as_ohlc()
+        times = ohlc['timestamp']
+        # candles whose period has ended and which are not archived yet
+        now = int(time.time() * 1000)
+        hi = int(np.searchsorted(times, now - TIMEFRAME_MS[timeframe], side='right'))
+        last = self._archived.get(key)
+        if not hi or (last is not None and times[hi - 1] <= last):
+            return  # a tick of the forming candle: nothing new has closed
+        lo = 0 if last is None else int(np.searchsorted(times, last, side='right'))
+        self._archived[key] = int(times[hi - 1])
+        # copies, the buffer's views change with the next merge
+        self._archive_queue.append((symbol, timeframe, times[lo:hi].copy(),
+                                    np.vstack([ohlc[c][lo:hi] for c in PRICE_COLUMNS])))
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self._write_archive(self._take_archive_queue())
+            return
+        if self._archive_writer is None or self._archive_writer.done():
+            self._archive_writer = asyncio.create_task(self._flush_archive())
+
+    def _take_archive_queue(self) -> List[Tuple[str, str, np.ndarray, np.ndarray]]:
+        batch, self._archive_queue = self._archive_queue, []
+        return batch
+
+    async def _flush_archive(self):
+        while self._archive_queue:
+            await asyncio.to_thread(self._write_archive, self._take_archive_queue())
+
+    def _write_archive(self, batch: List[Tuple[str, str, np.ndarray, np.ndarray]]):
+        for symbol, timeframe, times, values in batch:
+            try:
+                self.archive.append(symbol, timeframe, times, values)
+            except OSError as e:
+                logger.error(f"Could not archive {symbol} {timeframe} candles: {str(e)}")
+
+    async def close(self):
+        """Wait for archive writes still in progress."""
+        if self._archive_writer is not None:
+            await self._archive_writer
+            self._archive_writer = None
+
+    def snapshot(self) -> Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]:
+        """Copies of every buffer as (times, values) for a state snapshot."""
+        state = {}
+        for key, buffer in self.buffers.items():
+            if len(buffer):
+                ohlc = buffer.as_ohlc()
+                state[key] = (ohlc['timestamp'].copy(), np.vstack([ohlc[c] for c in PRICE_COLUMNS]))
+        return state
+
+    def restore(self, state: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray]]):
+        """Refill buffers from a snapshot, without notifying listeners or archiving."""
+        for (symbol, timeframe), (times, values) in state.items():
+            self.buffer(symbol, timeframe).merge(times, values)
+
+    def get(self, symbol: str, timeframe: str = '1h') -> Optional[Dict[str, np.ndarray]]:
+        buffer = self.buffers.get((symbol, timeframe))
+        return buffer.as_ohlc() if buffer is not None and len(buffer) else None
+
+    def matrix(self, symbols: List[str], timeframe: str = '1h',
+               length: int = 200) -> Tuple[List[str], Dict[str, np.ndarray]]:
+        """Stack the newest `length` candles of each symbol into 2D arrays.
+
+        Rows are right-aligned on the latest candle and NaN-padded on the
+        left; symbols without stored candles are left out.
+        """
+        present = [s for s in symbols if len(self.buffers.get((s, timeframe), ()))]
+        matrix = {c: np.full((len(present), length), np.nan) for c in PRICE_COLUMNS}
+        for row, symbol in enumerate(present):
+            ohlc = self.buffers[(symbol, timeframe)].as_ohlc()
+            n = min(length, len(ohlc['close']))
+            for column in PRICE_COLUMNS:
+                matrix[column][row, length - n:] = ohlc[column][-n:]
+        return present, matrix
+
+    async def sync(self, symbol: str, timeframe: str = '1h',
+                   since: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Fetch only candles since the last stored one (or `since`) and merge them."""
+        buffer = self.buffer(symbol, timeframe)
+        # Refetch from the last stored candle so the forming candle gets fixed up
+        data = await self.exchange.get_ohlc(
+            symbol, timeframe=timeframe, since=buffer.last_timestamp if since is None else since)
+        times, values = parse_ohlc(data)
+        self.candles_fetched += len(times)
+        self.merge(symbol, timeframe, times, values)
+        return buffer.as_ohlc()
@@ -0,0 +1,151 @@
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Mapping, Optional, Tuple
+
+import numpy as np
+import talib
+
+from config import settings
+
+COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class CandleContext(Mapping):
+    """Candle columns of one symbol converted once, plus memoized derived series.
+
+    Behaves like the usual OHLC dict (`ctx['close']` is a float64 array), so
+    it can be handed to any function that takes `ohlc`. Derived values are
+    computed on first use and shared by every module that asks for them
+    during the same analysis.
+    """
+
+    def __init__(self, ohlc: Mapping[str, Any]):
+        self._columns: Dict[str, np.ndarray] = {c: np.asarray(ohlc[c], dtype=np.float64) for c in COLUMNS if c in ohlc}
+        if 'timestamp' in ohlc:
+            self._columns['timestamp'] = np.asarray(ohlc['timestamp'], dtype=np.int64)
+        self.memo: Dict[Hashable, Any] = {}
+        self._signature: Optional[Tuple] = None
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    @property
+    def length(self) -> int:
+        return len(self._columns['close'])
+
+    @property
+    def signature(self) -> Tuple:
+        """Identifies the candles: length, last timestamp and a checksum of every column.
+
+        The checksum covers all rows, so a merge that corrects an older candle
+        (which leaves the length and last candle of a full buffer alone)
+        still changes the signature.
+        """
+        if self._signature is None:
+            if not self.length:
+                self._signature = (0,)
+            else:
+                times = self._columns.get('timestamp')
+                checksum = 0
+                for column in self._columns.values():
+                    checksum = zlib.crc32(np.ascontiguousarray(column), checksum)
+                self._signature = (self.length, int(times[-1]) if times is not None else None, checksum)
+        return self._signature
+
+    def cached(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        if key not in self.memo:
+            self.memo[key] = compute()
+        return self.memo[key]
+
+    # --- derived series ---
+
+    def typical_price(self) -> np.ndarray:
+        return self.cached('typical_price', lambda: (self['high'] + self['low'] + self['close']) / 3)
+
+    def atr(self, period: int = 14) -> np.ndarray:
+        return self.cached(('atr', period), lambda: talib.ATR(self['high'], self['low'], self['close'], period))
+
+    def highest(self, column: str, window: int) -> float:
+        """Max of `column` over the last `window` candles."""
+        return self.cached(('highest', column, window), lambda: float(self[column][-window:].max()))
+
+    def lowest(self, column: str, window: int) -> float:
+        return self.cached(('lowest', column, window), lambda: float(self[column][-window:].min()))
+
+    def rolling_max(self, column: str, window: int) -> np.ndarray:
+        """Rolling max series, NaN for the first window - 1 candles."""
+        def compute():
+            out = np.full(self.length, np.nan)
+            if self.length >= window:
+                out[window - 1:] = np.lib.stride_tricks.sliding_window_view(self[column], window).max(axis=1)
+            return out
+        return self.cached(('rolling_max', column, window), compute)
+
+    def rolling_min(self, column: str, window: int) -> np.ndarray:
+        def compute():
+            out = np.full(self.length, np.nan)
+            if self.length >= window:
+                out[window - 1:] = np.lib.stride_tricks.sliding_window_view(self[column], window).min(axis=1)
+            return out
+        return self.cached(('rolling_min', column, window), compute)
+
+    def top_volume(self, k: int) -> np.ndarray:
+        """Indices of the `k` highest-volume candles, largest first."""
+        return self.cached(('top_volume', k), lambda: self['volume'].argsort()[-k:][::-1])
+
+    def swing_pivots(self) -> List[Tuple[int, float, int]]:
+        """Zigzag pivots as (index, price, +1 high / -1 low), indices relative to this context.
+
+        The harmonic scanner publishes its incremental pivots here; when it did
+        not run, they are computed from these candles.
+        """
+        def compute():
+            from strategies.harmonic import ZigZag
+            zigzag = ZigZag(settings.HARMONIC_ZIGZAG_THRESHOLD, settings.HARMONIC_PIVOT_DEPTH)
+            for high, low in zip(self['high'].tolist(), self['low'].tolist()):
+                zigzag.update(high, low)
+            return list(zigzag.pivots)
+        return self.cached('swing_pivots', compute)
+
+
+def as_context(ohlc: Mapping[str, Any]) -> CandleContext:
+    return ohlc if isinstance(ohlc, CandleContext) else CandleContext(ohlc)
+
+
+class ContextCache:
+    """LRU of CandleContexts keyed by (symbol, timeframe).
+
+    A stored context is reused while the candles it was built from are
+    unchanged (same signature); any new or updated candle, including a
+    correction to an older one, starts a fresh one.
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity or settings.CONTEXT_CACHE_SIZE
+        self.items: 'OrderedDict[Hashable, CandleContext]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, ohlc: Mapping[str, Any]) -> CandleContext:
+        fresh = as_context(ohlc)
+        # taken now: the columns may be views of a buffer that later merges rewrite
+        signature = fresh.signature
+        ctx = self.items.get(key)
+        if ctx is not None and ctx.signature == signature:
+            # same candles: keep the memo, but read from the arrays just passed in
+            ctx._columns = fresh._columns
+            self.items.move_to_end(key)
+            self.hits += 1
+            return ctx
+        self.misses += 1
+        self.items[key] = fresh
+        self.items.move_to_end(key)
+        while len(self.items) > self.capacity:
+            self.items.popitem(last=False)
+        return fresh
@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from core.candle_store import PRICE_COLUMNS
+from core.metrics import metrics
+from core.pattern_detector import PatternDetector
+from core.records import Analysis
+from core.risk_engine import RiskEngine
+from core.signal_engine import SignalEngine
+from core.timeframes import TimeframeConfluence
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('timestamp',) + PRICE_COLUMNS
+
+
+class _Chunk:
+    """Symbols bound for one worker, their candles packed into one shared segment.
+
+    Column i of symbol j lives at rows[i, offset_j:offset_j + n_j]; timestamps
+    are stored as float64 alongside the prices (exact below 2**53 ms).
+    """
+
+    def __init__(self, rows: int):
+        self.rows = rows
+        self.shm = shared_memory.SharedMemory(create=True, size=len(COLUMNS) * rows * 8)
+        self.data = np.ndarray((len(COLUMNS), rows), dtype=np.float64, buffer=self.shm.buf)
+        self.used = 0
+        self.items: List[Tuple[str, int, int, Optional[datetime], Any]] = []
+        self.futures: List[asyncio.Future] = []
+
+    def fits(self, n: int) -> bool:
+        return self.used + n <= self.rows
+
+    def add(self, symbol: str, ohlc: Dict[str, np.ndarray], timestamp, news, future: asyncio.Future):
+        n = len(ohlc['close'])
+        for i, column in enumerate(COLUMNS):
+            self.data[i, self.used:self.used + n] = ohlc[column]
+        self.items.append((symbol, self.used, n, timestamp, news))
+        self.futures.append(future)
+        self.used += n
+
+    def release(self):
+        del self.data
+        self.shm.close()
+        self.shm.unlink()
+
+
+def process_context(*preload: str):
+    """multiprocessing context for worker pools (settings.ANALYSIS_START_METHOD).
+
+    Under forkserver the server process imports `preload` once and every
+    worker is forked from it, instead of each worker importing the analysis
+    stack from scratch as it does under spawn.
+    """
+    context = multiprocessing.get_context(settings.ANALYSIS_START_METHOD or None)
+    if context.get_start_method() == 'forkserver':
+        context.set_forkserver_preload(['__main__', *preload])
+    return context
+
+
+_worker_signals: Optional[SignalEngine] = None
+_worker_timeframes: Optional[TimeframeConfluence] = None
+
+
+def _init_worker(timeframes: List[str]):
+    global _worker_signals, _worker_timeframes
+    started = time.perf_counter()
+    metrics.drain()  # drop whatever the parent had recorded before the fork
+    _worker_signals = SignalEngine(PatternDetector(), RiskEngine())
+    _worker_timeframes = TimeframeConfluence(_worker_signals, timeframes)
+    # shipped back with the worker's first chunk
+    metrics.observe('worker_init_seconds', time.perf_counter() - started)
+
+
+def _analyze_chunk(name: str, rows: int, items) -> Tuple[List[Any], Dict[str, Any]]:
+    # workers share the parent's resource tracker, which unlinks the segment
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        data = np.ndarray((len(COLUMNS), rows), dtype=np.float64, buffer=shm.buf)
+        results = []
+        for symbol, offset, n, timestamp, news in items:
+            ohlc = {column: data[i, offset:offset + n] for i, column in enumerate(COLUMNS)}
+            ohlc['timestamp'] = ohlc['timestamp'].astype(np.int64)
+            try:
+                results.append(_analyze(_worker_signals, _worker_timeframes, symbol, ohlc, timestamp, news))
+            except Exception as e:
+                results.append(e)
+        del data, ohlc
+        # timings recorded here are merged into the parent's registry
+        return results, metrics.drain()
+    finally:
+        shm.close()
+
+
+def _engine_state(signals: SignalEngine, timeframes: TimeframeConfluence) -> Dict[str, Dict]:
+    # incremental state keyed by (symbol, timeframe)
+    return {
+        'indicators': signals.pattern_detector.indicator_engine.states,
+        'harmonics': signals.harmonics.scanners if settings.MODULES['harmonic'] else {},
+        'timeframes': timeframes.cache
+    }
+
+
+def _export_worker_state() -> Dict[str, Dict]:
+    return _engine_state(_worker_signals, _worker_timeframes)
+
+
+def _import_worker_state(state: Dict[str, Dict]):
+    for name, items in _engine_state(_worker_signals, _worker_timeframes).items():
+        items.update(state.get(name, {}))
+
+
+def _analyze(signals: SignalEngine, timeframes: TimeframeConfluence, symbol: str,
+             ohlc: Dict[str, np.ndarray], timestamp, news,
+             indicators: Optional[Dict[str, Any]] = None, live: bool = True) -> Analysis:
+    # also the backtester's path, which passes precomputed indicators and closed candles
+    analysis = signals.analyze(symbol, ohlc, timestamp=timestamp, news=news, indicators=indicators,
+                               live=live, timeframe=timeframes.base)
+    with metrics.timer('analysis_seconds', module='mtf'):
+        analysis.mtf = timeframes.analyze(symbol, ohlc)
+    return analysis
+
+
+class AnalysisExecutor:
+    """Runs the CPU-bound part of a symbol's analysis off the event loop.
+
+    Each symbol is pinned to one single-process worker (by a stable hash), so
+    the incremental indicator, zigzag and higher-timeframe state built up for
+    it stays in that process. Requests issued in the same loop iteration are
+    grouped into chunks of up to `chunk_size` symbols per worker; a chunk's
+    candles are copied once into a shared memory segment and only offsets
+    and small metadata are pickled.
+
+    With `inline=True` (or zero workers) analysis runs directly in the
+    calling coroutine, exactly as before.
+    """
+
+    def __init__(
+        self,
+        signal_engine: SignalEngine,
+        timeframes: TimeframeConfluence,
+        workers: Optional[int] = None,
+        chunk_size: Optional[int] = None,
+        inline: Optional[bool] = None
+    ):
+        self.signals = signal_engine
+        self.timeframes = timeframes
+        self.workers = workers if workers is not None else (settings.ANALYSIS_WORKERS or os.cpu_count() or 1)
+        self.chunk_size = chunk_size or settings.ANALYSIS_CHUNK_SIZE
+        self.inline = settings.ANALYSIS_INLINE if inline is None else inline
+        if self.workers < 1:
+            self.inline = True
+        self._pools: List[Optional[ProcessPoolExecutor]] = [None] * self.workers
+        self._open: Dict[int, _Chunk] = {}
+        self._tasks = set()
+        self.chunks_sent = 0
+        self.symbols_sent = 0
+
+    def _pool(self, worker: int) -> ProcessPoolExecutor:
+        if self._pools[worker] is None:
+            self._pools[worker] = ProcessPoolExecutor(
+                max_workers=1, mp_context=process_context('core.executor'), initializer=_init_worker,
+                initargs=([self.timeframes.base] + self.timeframes.higher,))
+        return self._pools[worker]
+
+    async def analyze(self, symbol: str, ohlc: Dict[str, np.ndarray],
+                      timestamp: Optional[datetime] = None, news: Optional[Any] = None) -> Analysis:
+        """Full analysis (including higher timeframes) of one symbol."""
+        if self.inline:
+            return _analyze(self.signals, self.timeframes, symbol, ohlc, timestamp, news)
+
+        worker = zlib.crc32(symbol.encode()) % self.workers
+        n = len(ohlc['close'])
+        chunk = self._open.get(worker)
+        if chunk is not None and not chunk.fits(n):
+            self._dispatch(worker)
+            chunk = None
+        if chunk is None:
+            chunk = self._open[worker] = _Chunk(max(n, self.chunk_size * settings.CANDLE_CAPACITY))
+            # everything requested during this loop iteration joins the chunk
+            asyncio.get_running_loop().call_soon(self._dispatch, worker, chunk)
+
+        future = asyncio.get_running_loop().create_future()
+        chunk.add(symbol, ohlc, timestamp, news, future)
+        if len(chunk.items) >= self.chunk_size:
+            self._dispatch(worker)
+        return await future
+
+    def _dispatch(self, worker: int, chunk: Optional[_Chunk] = None):
+        if chunk is not None and self._open.get(worker) is not chunk:
+            return  # already sent
+        chunk = self._open.pop(worker)
+        task = asyncio.create_task(self._run_chunk(worker, chunk))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_chunk(self, worker: int, chunk: _Chunk):
+        self.chunks_sent += 1
+        self.symbols_sent += len(chunk.items)
+        loop = asyncio.get_running_loop()
+        try:
+            results, recorded = await loop.run_in_executor(
+                self._pool(worker), _analyze_chunk, chunk.shm.name, chunk.rows, chunk.items)
+            metrics.merge(recorded)
+        except BrokenProcessPool as e:
+            logger.error(f"Analysis worker {worker} died: {str(e)}")
+            self._pools[worker] = None
+            results = [e] * len(chunk.items)
+        except Exception as e:
+            results = [e] * len(chunk.items)
+        finally:
+            chunk.release()
+
+        for future, result in zip(chunk.futures, results):
+            if future.done():
+                continue  # caller timed out
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def export_state(self) -> Dict[str, Dict]:
+        """Incremental analysis state of every symbol, gathered from the workers."""
+        if self.inline:
+            return {k: dict(v) for k, v in _engine_state(self.signals, self.timeframes).items()}
+        loop = asyncio.get_running_loop()
+        parts = await asyncio.gather(*(
+            loop.run_in_executor(pool, _export_worker_state)
+            for pool in self._pools if pool is not None))
+        state: Dict[str, Dict] = {}
+        for part in parts:
+            for name, items in part.items():
+                state.setdefault(name, {}).update(items)
+        return state
+
+    async def import_state(self, state: Dict[str, Dict]):
+        """Hand restored state to the worker that owns each symbol."""
+        if self.inline:
+            for name, items in _engine_state(self.signals, self.timeframes).items():
+                items.update(state.get(name, {}))
+            return
+        parts: List[Dict[str, Dict]] = [{} for _ in range(self.workers)]
+        for name, items in state.items():
+            for key, value in items.items():
+                worker = zlib.crc32(key[0].encode()) % self.workers
+                parts[worker].setdefault(name, {})[key] = value
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self._pool(worker), _import_worker_state, part)
+            for worker, part in enumerate(parts) if part))
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'mode': 'inline' if self.inline else 'process',
+            'workers': 0 if self.inline else self.workers,
+            'chunks': self.chunks_sent,
+            'symbols': self.symbols_sent,
+            'avg_chunk': self.symbols_sent / self.chunks_sent if self.chunks_sent else 0.0
+        }
+
+    async def close(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        for chunk in self._open.values():
+            for future in chunk.futures:
+                if not future.done():
+                    future.cancel()
+            chunk.release()
+        self._open.clear()
+        for pool in self._pools:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._pools = [None] * self.workers
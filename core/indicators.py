@@ -0,0 +1,308 @@
+import math
+from collections import deque
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+NAN = float('nan')
+
+
+def _is_zero(x: float) -> bool:
+    return -1e-14 < x < 1e-14
+
+
+def true_range(high: float, low: float, prev_close: float) -> float:
+    return max(high - low, abs(prev_close - high), abs(prev_close - low))
+
+
+# Each indicator keeps only its running state. `update(..., commit=False)`
+# returns the value the indicator would have if the candle closed now without
+# touching the state, which is how provisional values for the live candle are
+# produced. Seeding follows TA-Lib so values match a full recomputation.
+
+class EMA:
+    __slots__ = ('period', 'k', 'count', 'seed_sum', 'value')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.count = 0
+        self.seed_sum = 0.0
+        self.value: Optional[float] = None
+
+    def seed(self, value: float):
+        self.count, self.value = self.period, value
+
+    def update(self, x: float, commit: bool = True) -> Optional[float]:
+        if self.value is None:
+            count, seed_sum = self.count + 1, self.seed_sum + x
+            value = seed_sum / self.period if count == self.period else None
+            if commit:
+                self.count, self.seed_sum, self.value = count, seed_sum, value
+            return value
+        value = ((x - self.value) * self.k) + self.value
+        if commit:
+            self.value = value
+        return value
+
+
+class RSI:
+    __slots__ = ('period', 'count', 'prev', 'gain', 'loss')
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.prev: Optional[float] = None
+        self.gain = 0.0
+        self.loss = 0.0
+
+    def update(self, x: float, commit: bool = True) -> Optional[float]:
+        if self.prev is None:
+            if commit:
+                self.prev = x
+            return None
+        diff = x - self.prev
+        count = self.count + 1
+        n = self.period
+        if count < n:
+            gain, loss = self.gain, self.loss
+            if diff < 0:
+                loss -= diff
+            else:
+                gain += diff
+            value = None
+        else:
+            if count == n:
+                gain, loss = self.gain, self.loss
+                if diff < 0:
+                    loss -= diff
+                else:
+                    gain += diff
+                gain /= n
+                loss /= n
+            else:
+                gain, loss = self.gain * (n - 1), self.loss * (n - 1)
+                if diff < 0:
+                    loss -= diff
+                else:
+                    gain += diff
+                gain /= n
+                loss /= n
+            total = gain + loss
+            value = 100.0 * (gain / total) if not _is_zero(total) else 0.0
+        if commit:
+            self.prev, self.count, self.gain, self.loss = x, count, gain, loss
+        return value
+
+
+class ATR:
+    __slots__ = ('period', 'count', 'prev_close', 'value')
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.prev_close: Optional[float] = None
+        self.value = 0.0
+
+    def update(self, high: float, low: float, close: float, commit: bool = True) -> Optional[float]:
+        if self.prev_close is None:
+            if commit:
+                self.prev_close = close
+            return None
+        tr = true_range(high, low, self.prev_close)
+        count = self.count + 1
+        n = self.period
+        if count < n:
+            value, result = self.value + tr, None
+        elif count == n:
+            value = (self.value + tr) / n
+            result = value
+        else:
+            value = ((self.value * (n - 1)) + tr) / n
+            result = value
+        if commit:
+            self.prev_close, self.count, self.value = close, count, value
+        return result
+
+
+class MACD:
+    __slots__ = ('fast', 'slow', 'signal', 'count', 'recent')
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.count = 0
+        # TA-Lib seeds the fast EMA on the candles right before the slow EMA
+        # becomes valid, so the last `fast` closes are kept until then
+        self.recent = deque(maxlen=fast)
+
+    def update(self, x: float, commit: bool = True) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        slow = self.slow.update(x, commit)
+        if slow is None:
+            if commit:
+                self.count += 1
+                self.recent.append(x)
+            return None, None, None
+
+        if self.fast.value is None:
+            recent = list(self.recent) + [x]
+            fast = sum(recent[-self.fast.period:]) / self.fast.period
+            if commit:
+                self.fast.seed(fast)
+                self.recent.clear()
+        else:
+            fast = self.fast.update(x, commit)
+
+        line = fast - slow
+        signal = self.signal.update(line, commit)
+        if signal is None:
+            return None, None, None
+        return line, signal, line - signal
+
+
+class ADX:
+    __slots__ = ('period', 'count', 'prev_high', 'prev_low', 'prev_close',
+                 'plus_dm', 'minus_dm', 'tr', 'sum_dx', 'value')
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self.prev_high = self.prev_low = self.prev_close = None
+        self.plus_dm = self.minus_dm = self.tr = 0.0
+        self.sum_dx = 0.0
+        self.value: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float, commit: bool = True) -> Optional[float]:
+        if self.prev_high is None:
+            if commit:
+                self.prev_high, self.prev_low, self.prev_close = high, low, close
+            return None
+
+        n = self.period
+        count = self.count + 1
+        diff_p = high - self.prev_high
+        diff_m = self.prev_low - low
+        tr = true_range(high, low, self.prev_close)
+        plus_dm, minus_dm, tr_sum = self.plus_dm, self.minus_dm, self.tr
+        sum_dx, value = self.sum_dx, self.value
+
+        if count >= n:
+            # Wilder smoothing once the first period-1 bars are summed up
+            minus_dm -= minus_dm / n
+            plus_dm -= plus_dm / n
+            tr_sum = tr_sum - (tr_sum / n) + tr
+        else:
+            tr_sum += tr
+        if diff_m > 0 and diff_p < diff_m:
+            minus_dm += diff_m
+        elif diff_p > 0 and diff_p > diff_m:
+            plus_dm += diff_p
+
+        result = None
+        if count >= n:
+            dx = None
+            if not _is_zero(tr_sum):
+                minus_di = 100.0 * (minus_dm / tr_sum)
+                plus_di = 100.0 * (plus_dm / tr_sum)
+                total = minus_di + plus_di
+                if not _is_zero(total):
+                    dx = 100.0 * (abs(minus_di - plus_di) / total)
+            if count < 2 * n - 1:
+                sum_dx += dx or 0.0
+            elif count == 2 * n - 1:
+                sum_dx += dx or 0.0
+                value = result = sum_dx / n
+            else:
+                if dx is not None:
+                    value = ((value * (n - 1)) + dx) / n
+                result = value
+
+        if commit:
+            self.prev_high, self.prev_low, self.prev_close = high, low, close
+            self.count, self.plus_dm, self.minus_dm, self.tr = count, plus_dm, minus_dm, tr_sum
+            self.sum_dx, self.value = sum_dx, value
+        return result
+
+
+class IndicatorState:
+    """Running indicator state of one symbol/timeframe."""
+    __slots__ = ('rsi', 'macd', 'atr', 'ema50', 'ema200', 'adx', 'last_timestamp', 'closed')
+
+    def __init__(self):
+        self.rsi = RSI(14)
+        self.macd = MACD(12, 26, 9)
+        self.atr = ATR(14)
+        self.ema50 = EMA(50)
+        self.ema200 = EMA(200)
+        self.adx = ADX(14)
+        self.last_timestamp: Optional[int] = None
+        self.closed: Dict[str, float] = {}
+
+    def update(self, high: float, low: float, close: float, commit: bool = True) -> Dict[str, float]:
+        macd, signal, hist = self.macd.update(close, commit)
+        values = {
+            'rsi': self.rsi.update(close, commit),
+            'macd': macd,
+            'macd_signal': signal,
+            'macd_hist': hist,
+            'atr': self.atr.update(high, low, close, commit),
+            'ema50': self.ema50.update(close, commit),
+            'ema200': self.ema200.update(close, commit),
+            'adx': self.adx.update(high, low, close, commit)
+        }
+        values = {k: NAN if v is None else v for k, v in values.items()}
+        if commit:
+            self.closed = values
+        return values
+
+
+class IndicatorEngine:
+    """Streaming RSI/MACD/ATR/EMA/ADX kept per symbol and timeframe.
+
+    Closed candles are folded into the state once (O(1) each); the forming
+    candle only produces provisional values and is never committed.
+    """
+
+    def __init__(self):
+        self.states: Dict[Hashable, IndicatorState] = {}
+
+    def reset(self, key: Hashable):
+        self.states.pop(key, None)
+
+    def update(self, key: Hashable, ohlc: Dict[str, Any], live: bool = True) -> Dict[str, float]:
+        """Feed a candle history; returns indicator values at its last candle.
+
+        Only candles newer than the last committed one are processed; a
+        history without timestamps is folded in from scratch. With
+        `live=True` the last candle is treated as still forming.
+        """
+        high, low, close = ohlc['high'], ohlc['low'], ohlc['close']
+        times = ohlc.get('timestamp')
+        n = len(close)
+        if not n:
+            return {}
+        closed_end = n - 1 if live else n
+
+        state = self.states.get(key)
+        start = 0
+        if state is not None and (times is None or state.last_timestamp is None):
+            # nothing tells which of these candles are already folded in: start over
+            state = None
+        elif state is not None:
+            start = int(np.searchsorted(times, state.last_timestamp, side='right'))
+            if start == 0 and times[0] != state.last_timestamp:
+                # gap between the stored state and the new history: start over
+                state = None
+        if state is None:
+            state = self.states[key] = IndicatorState()
+            start = 0
+
+        for i in range(start, closed_end):
+            state.update(float(high[i]), float(low[i]), float(close[i]))
+        if closed_end > start and times is not None:
+            state.last_timestamp = int(times[closed_end - 1])
+
+        if live:
+            return state.update(float(high[-1]), float(low[-1]), float(close[-1]), commit=False)
+        return dict(state.closed)
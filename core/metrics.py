@@ -0,0 +1,263 @@
+"""In-process metrics: histograms, counters and collected gauges.
+
+Everything is recorded into the module-level `metrics` registry, exposed as
+Prometheus text on a local port (`MetricsServer`) and condensed into one
+log line (`MetricsRegistry.summary`). Worker processes record into their
+own registry and ship it back with `drain()`; the parent `merge()`s it.
+
+`SamplingProfiler` samples the main thread's stack and writes collapsed
+stacks ("frame;frame;frame count"), the input format of flamegraph.pl and
+speedscope.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Seconds; the last bucket is +Inf
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th value."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if seen + n >= rank and n:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                low = self.buckets[i - 1] if i else 0.0
+                return low + (self.buckets[i] - low) * (rank - seen) / n
+            seen += n
+        return self.buckets[-1]
+
+    def merge(self, counts: List[int], total: float):
+        for i, n in enumerate(counts):
+            self.counts[i] += n
+        self.sum += total
+        self.count += sum(counts)
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.collectors: List[Callable[[], Dict[str, float]]] = []
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _labels(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms.setdefault(key, Histogram())
+        histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        key = (name, _labels(labels))
+        self.counters[key] = self.counters.get(key, 0.0) + value
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def add_collector(self, collector: Callable[[], Dict[str, float]]):
+        """Register a callable returning gauge name -> value at scrape time."""
+        self.collectors.append(collector)
+
+    def drain(self) -> Dict[str, Any]:
+        """Picklable snapshot of histograms and counters; resets them."""
+        state = {
+            'histograms': [(k, h.counts, h.sum) for k, h in self.histograms.items()],
+            'counters': list(self.counters.items())
+        }
+        self.histograms = {}
+        self.counters = {}
+        return state
+
+    def merge(self, state: Dict[str, Any]):
+        for key, counts, total in state['histograms']:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms.setdefault(key, Histogram())
+            histogram.merge(counts, total)
+        for key, value in state['counters']:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines = []
+        seen = set()
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} histogram")
+                seen.add(name)
+            cumulative = 0
+            for bound, n in zip(histogram.buckets + (float('inf'),), histogram.counts):
+                cumulative += n
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                extra = f'le="{le}"'
+                lines.append(f"{name}_bucket{_format_labels(labels, extra)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        for (name, labels), value in sorted(self.counters.items()):
+            if name not in seen:
+                lines.append(f"# TYPE {name} counter")
+                seen.add(name)
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name, value in sorted(self._gauges().items()):
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def _gauges(self) -> Dict[str, float]:
+        gauges = {}
+        for collector in self.collectors:
+            try:
+                gauges.update(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {str(e)}")
+        return gauges
+
+    def summary(self) -> str:
+        """One line with count and p50/p95 (ms) per histogram series."""
+        parts = []
+        for (name, labels), histogram in sorted(self.histograms.items()):
+            if not histogram.count:
+                continue
+            tag = ','.join(v for _, v in labels)
+            label = f"{name.replace('_seconds', '')}[{tag}]" if tag else name.replace('_seconds', '')
+            parts.append(f"{label} n={histogram.count} p50={histogram.quantile(0.5) * 1000:.1f}ms "
+                         f"p95={histogram.quantile(0.95) * 1000:.1f}ms")
+        errors = sum(v for (name, _), v in self.counters.items() if name == 'symbol_errors_total')
+        parts.append(f"symbol_errors={errors:.0f}")
+        return ' | '.join(parts)
+
+
+metrics = MetricsRegistry()
+
+
+async def monitor_loop_lag(registry: MetricsRegistry = metrics, interval: float = 0.5):
+    """Record how late the event loop wakes up from a sleep of `interval` seconds."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        registry.observe('event_loop_lag_seconds', max(0.0, loop.time() - started - interval))
+
+
+class MetricsServer:
+    """Serves GET /metrics in Prometheus text format.
+
+    aiohttp is imported on start, so the analysis workers and the backtester,
+    which record metrics but never serve them, do not load it.
+    """
+
+    def __init__(self, registry: MetricsRegistry = metrics, host: str = '127.0.0.1',
+                 port: Optional[int] = None):
+        self.registry = registry
+        self.host = host
+        self.port = settings.METRICS_PORT if port is None else port
+        self._runner: Optional['web.AppRunner'] = None
+
+    async def _handle(self, request: 'web.Request') -> 'web.Response':
+        from aiohttp import web
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8')
+
+    async def start(self):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Metrics on http://{self.host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class SamplingProfiler:
+    """Samples one thread's Python stack every `interval` seconds from a helper thread."""
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.main_thread().ident
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Wrote {sum(self.stacks.values())} stack samples to {path}")
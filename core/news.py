@@ -0,0 +1,321 @@
+"""News ingestion shared by all symbols.
+
+Feeds are fetched once per interval rather than once per symbol. Each
+article is deduplicated by a hash of its normalized title and link, mapped
+to the symbols it mentions through an inverted keyword index, and scored
+together with the other new articles of the round against a small local
+lexicon. Per-symbol sentiment is then aggregated into a TTL cache, so the
+analysis only does a dict lookup.
+"""
+import asyncio
+import hashlib
+import logging
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"\$?[A-Za-z0-9]+")
+
+# Word -> polarity in [-1, 1], tuned for crypto headlines
+LEXICON: Dict[str, float] = {
+    # bullish
+    'surge': 0.8, 'surges': 0.8, 'soar': 0.8, 'soars': 0.8, 'rally': 0.7, 'rallies': 0.7,
+    'jump': 0.6, 'jumps': 0.6, 'gain': 0.5, 'gains': 0.5, 'rise': 0.5, 'rises': 0.5,
+    'bullish': 0.8, 'breakout': 0.6, 'record': 0.5, 'high': 0.3, 'highs': 0.4, 'ath': 0.7,
+    'adoption': 0.6, 'partnership': 0.6, 'approval': 0.7, 'approved': 0.7, 'approves': 0.7,
+    'etf': 0.3, 'launch': 0.4, 'launches': 0.4, 'listing': 0.6, 'listed': 0.5, 'lists': 0.5,
+    'upgrade': 0.5, 'integration': 0.4, 'inflows': 0.6, 'accumulate': 0.5, 'accumulation': 0.5,
+    'buyback': 0.6, 'burn': 0.3, 'recovery': 0.5, 'recovers': 0.5, 'rebound': 0.5, 'rebounds': 0.5,
+    'outperform': 0.5, 'outperforms': 0.5, 'support': 0.2, 'growth': 0.4, 'profit': 0.4,
+    'wins': 0.5, 'win': 0.4, 'positive': 0.4, 'optimism': 0.5, 'optimistic': 0.5,
+    # bearish
+    'crash': -0.9, 'crashes': -0.9, 'plunge': -0.8, 'plunges': -0.8, 'dump': -0.7, 'dumps': -0.7,
+    'drop': -0.5, 'drops': -0.5, 'fall': -0.5, 'falls': -0.5, 'slump': -0.6, 'slumps': -0.6,
+    'bearish': -0.8, 'selloff': -0.7, 'sell': -0.2, 'low': -0.3, 'lows': -0.4, 'loss': -0.5,
+    'losses': -0.5, 'hack': -0.9, 'hacked': -0.9, 'exploit': -0.9, 'exploited': -0.9,
+    'scam': -0.9, 'fraud': -0.9, 'lawsuit': -0.7, 'sues': -0.7, 'sued': -0.7, 'ban': -0.8,
+    'bans': -0.8, 'banned': -0.8, 'crackdown': -0.7, 'investigation': -0.6, 'probe': -0.5,
+    'delist': -0.8, 'delisting': -0.8, 'delisted': -0.8, 'outflows': -0.6, 'liquidation': -0.5,
+    'liquidations': -0.5, 'bankruptcy': -0.9, 'bankrupt': -0.9, 'insolvent': -0.9,
+    'halt': -0.6, 'halts': -0.6, 'suspend': -0.6, 'suspends': -0.6, 'outage': -0.6,
+    'vulnerability': -0.6, 'warning': -0.4, 'warns': -0.4, 'fear': -0.5, 'fears': -0.5,
+    'negative': -0.4, 'resistance': -0.2, 'rejected': -0.5, 'rejects': -0.5, 'decline': -0.5,
+    'declines': -0.5, 'tumble': -0.7, 'tumbles': -0.7, 'fine': -0.4, 'fined': -0.6
+}
+NEGATIONS = frozenset({'not', 'no', 'never', 'without', 'fails', 'failed', 'denies', 'denied'})
+
+# Full names of common base assets; tickers are matched on their own
+ASSET_NAMES: Dict[str, Tuple[str, ...]] = {
+    'BTC': ('bitcoin',), 'ETH': ('ethereum', 'ether'), 'BNB': ('binance',), 'SOL': ('solana',),
+    'XRP': ('ripple',), 'ADA': ('cardano',), 'DOGE': ('dogecoin',), 'DOT': ('polkadot',),
+    'AVAX': ('avalanche',), 'LINK': ('chainlink',), 'LTC': ('litecoin',), 'TRX': ('tron',),
+    'MATIC': ('polygon',), 'ATOM': ('cosmos',), 'XLM': ('stellar',), 'SHIB': ('shiba',),
+    'UNI': ('uniswap',), 'ETC': ('ethereum classic',), 'FIL': ('filecoin',), 'APT': ('aptos',),
+    'ARB': ('arbitrum',), 'OP': ('optimism',), 'TON': ('toncoin',), 'NEAR': ('near protocol',)
+}
+QUOTE_ASSETS = ('USDT', 'USDC', 'BUSD', 'FDUSD', 'TUSD', 'USD', 'EUR', 'BTC', 'ETH')
+
+
+def base_asset(symbol: str) -> str:
+    """BTCUSDT, btc_usdt, BTC/USDT -> BTC"""
+    name = re.sub(r'[^A-Za-z0-9]', '', symbol).upper()
+    for quote in QUOTE_ASSETS:
+        if name.endswith(quote) and len(name) > len(quote):
+            return name[:-len(quote)]
+    return name
+
+
+@dataclass(slots=True)
+class Article:
+    id: str
+    title: str
+    text: str
+    url: str
+    source: str
+    published: int  # ms
+    symbols: Tuple[str, ...] = ()
+    score: float = 0.0
+
+    @classmethod
+    def from_dict(cls, item: Dict[str, Any], source: str = '') -> 'Article':
+        title = str(item.get('title') or '')
+        text = str(item.get('summary') or item.get('body') or item.get('content') or '')
+        url = str(item.get('url') or item.get('link') or '')
+        digest = hashlib.sha1(f"{' '.join(title.lower().split())}|{url}".encode()).hexdigest()
+        return cls(
+            id=digest,
+            title=title,
+            text=text,
+            url=url,
+            source=str(item.get('source') or source),
+            published=_timestamp_ms(item.get('published_at') or item.get('published') or item.get('time'))
+        )
+
+
+def _timestamp_ms(value: Any) -> int:
+    if isinstance(value, (int, float)) and value > 0:
+        # seconds or milliseconds
+        return int(value * 1000) if value < 1e11 else int(value)
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+        except ValueError:
+            pass
+    return int(time.time() * 1000)
+
+
+class SymbolIndex:
+    """Inverted index from keywords to the symbols they refer to.
+
+    Tickers match as uppercase words or with a `$` prefix (so NEAR or $near,
+    but not "near"); full asset names match case-insensitively, multi-word
+    names on consecutive words.
+    """
+
+    def __init__(self, symbols: Iterable[str] = ()):
+        self.tickers: Dict[str, Set[str]] = {}
+        self.names: Dict[Tuple[str, ...], Set[str]] = {}
+        self.longest_name = 1
+        self.symbols: Set[str] = set()
+        self.update(symbols)
+
+    def update(self, symbols: Iterable[str]):
+        for symbol in symbols:
+            if symbol in self.symbols:
+                continue
+            self.symbols.add(symbol)
+            base = base_asset(symbol)
+            self.tickers.setdefault(base, set()).add(symbol)
+            for name in ASSET_NAMES.get(base, ()):
+                words = tuple(name.split())
+                self.names.setdefault(words, set()).add(symbol)
+                self.longest_name = max(self.longest_name, len(words))
+
+    def match(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        words = TOKEN.findall(text)
+        lowered = [w.lstrip('$').lower() for w in words]
+        for i, word in enumerate(words):
+            if word.startswith('$') or word.isupper():
+                found |= self.tickers.get(word.lstrip('$').upper(), set())
+            for n in range(1, self.longest_name + 1):
+                found |= self.names.get(tuple(lowered[i:i + n]), set())
+        return found
+
+
+class LexiconScorer:
+    """Scores many texts in one pass over a flat token array.
+
+    Each text's score is tanh of its summed word polarities (flipped after a
+    negation), so a few strong words saturate toward +/-1.
+    """
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None):
+        self.lexicon = lexicon or LEXICON
+        self.vocabulary = {word: i + 1 for i, word in enumerate(self.lexicon)}
+        self.weights = np.array([0.0] + list(self.lexicon.values()))
+
+    def score_batch(self, texts: Sequence[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros(0)
+        ids, signs, docs = [], [], []
+        for doc, text in enumerate(texts):
+            negated = False
+            for word in TOKEN.findall(text.lower()):
+                word = word.lstrip('$')
+                if word in NEGATIONS:
+                    negated = True
+                    continue
+                ids.append(self.vocabulary.get(word, 0))
+                signs.append(-1.0 if negated else 1.0)
+                docs.append(doc)
+                negated = False
+        totals = np.bincount(np.array(docs, dtype=np.int64),
+                             weights=self.weights[np.array(ids, dtype=np.int64)] * np.array(signs),
+                             minlength=len(texts)) if docs else np.zeros(len(texts))
+        return np.tanh(totals)
+
+
+def label(score: float) -> str:
+    if score > settings.NEWS_NEUTRAL_BAND:
+        return 'bullish'
+    if score < -settings.NEWS_NEUTRAL_BAND:
+        return 'bearish'
+    return 'neutral'
+
+
+NewsSource = Callable[[], Awaitable[List[Dict[str, Any]]]]
+
+
+class NewsService:
+    """Periodic news ingestion with per-symbol sentiment in a TTL cache.
+
+    `refresh` pulls every source at most once per `interval`; `sentiment`
+    returns the cached {'sentiment', 'score', 'articles'} for a symbol, or
+    None when no recent article mentions it. Symbol sentiment is the
+    recency-weighted mean of its articles' scores (half-life
+    `half_life_hours`) over the last `window_hours`.
+    """
+
+    def __init__(
+        self,
+        sources: Sequence[NewsSource],
+        interval: Optional[float] = None,
+        ttl: Optional[float] = None,
+        window_hours: Optional[float] = None,
+        half_life_hours: Optional[float] = None,
+        scorer: Optional[LexiconScorer] = None
+    ):
+        self.sources = list(sources)
+        self.interval = settings.NEWS_INTERVAL if interval is None else interval
+        self.ttl = settings.NEWS_CACHE_TTL if ttl is None else ttl
+        self.window_ms = int((window_hours or settings.NEWS_WINDOW_HOURS) * 3600_000)
+        self.half_life_ms = (half_life_hours or settings.NEWS_HALF_LIFE_HOURS) * 3600_000
+        self.scorer = scorer or LexiconScorer()
+        self.index = SymbolIndex()
+        self.articles: Dict[str, Article] = {}
+        self.by_symbol: Dict[str, List[Article]] = {}
+        self.cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self.last_refresh = 0.0
+        self.duplicates = 0
+        self._lock = asyncio.Lock()
+
+    def set_symbols(self, symbols: Iterable[str]):
+        self.index.update(symbols)
+
+    def sentiment(self, symbol: str) -> Optional[Dict[str, Any]]:
+        entry = self.cache.get(symbol)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    async def refresh(self, force: bool = False) -> int:
+        """Fetch all sources if the interval has passed; returns the number of new articles."""
+        async with self._lock:
+            if not force and time.monotonic() - self.last_refresh < self.interval:
+                return 0
+            self.last_refresh = time.monotonic()
+            results = await asyncio.gather(*(source() for source in self.sources), return_exceptions=True)
+            items = []
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.warning(f"News source failed: {str(result)}")
+                    continue
+                items.extend(result or [])
+            added = self.ingest(items)
+            logger.info(f"News refreshed: {added} new articles, {len(self.articles)} tracked")
+            return added
+
+    def ingest(self, items: Iterable[Dict[str, Any]], now: Optional[int] = None) -> int:
+        """Deduplicate, index and score raw articles, then rebuild the cache."""
+        now = now if now is not None else int(time.time() * 1000)
+        fresh: List[Article] = []
+        for item in items:
+            article = Article.from_dict(item)
+            if article.id in self.articles or now - article.published > self.window_ms:
+                self.duplicates += article.id in self.articles
+                continue
+            self.articles[article.id] = article
+            fresh.append(article)
+
+        if fresh:
+            texts = [f"{a.title}. {a.text}" for a in fresh]
+            scores = self.scorer.score_batch(texts)
+            for article, text, score in zip(fresh, texts, scores):
+                article.score = float(score)
+                article.symbols = tuple(sorted(self.index.match(text)))
+                for symbol in article.symbols:
+                    self.by_symbol.setdefault(symbol, []).append(article)
+
+        self._expire(now)
+        self._rebuild(now)
+        return len(fresh)
+
+    def _expire(self, now: int):
+        cutoff = now - self.window_ms
+        for key in [k for k, a in self.articles.items() if a.published < cutoff]:
+            del self.articles[key]
+        for symbol in list(self.by_symbol):
+            kept = [a for a in self.by_symbol[symbol] if a.published >= cutoff]
+            if kept:
+                self.by_symbol[symbol] = kept
+            else:
+                del self.by_symbol[symbol]
+
+    def _rebuild(self, now: int):
+        expires = time.monotonic() + self.ttl
+        cache = {}
+        for symbol, articles in self.by_symbol.items():
+            ages = np.array([now - a.published for a in articles], dtype=np.float64)
+            weights = np.exp2(-np.maximum(ages, 0) / self.half_life_ms)
+            score = float(np.dot(weights, [a.score for a in articles]) / weights.sum())
+            cache[symbol] = (expires, {
+                'sentiment': label(score),
+                'score': score,
+                'articles': len(articles)
+            })
+        self.cache = cache
+
+    async def run(self):
+        """Refresh forever; meant to run as a background task."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"News refresh error: {str(e)}")
+            await asyncio.sleep(max(1.0, self.interval - (time.monotonic() - self.last_refresh)))
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'articles': len(self.articles),
+            'symbols': len(self.cache),
+            'duplicates': self.duplicates
+        }
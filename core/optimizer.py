@@ -0,0 +1,284 @@
+import copy
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+from core.backtester import Backtester
+from core.executor import process_context
+
+logger = logging.getLogger(__name__)
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+# Parameters are addressed by settings attribute, with dots for nested keys:
+# 'RR_RATIO', 'KEY_LEVEL_LOOKBACK', 'OB_VOLUME_FACTOR',
+# 'HARMONIC_TOLERANCE', 'HARMONIC_PATTERNS.gartley.xa_retrace', ...
+
+
+def grid(space: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Every combination of the listed values."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*space.values())]
+
+
+def random_samples(space: Dict[str, Any], n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """`n` random points; (low, high) tuples are sampled uniformly, lists by choice."""
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(n):
+        point = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                point[name] = (rng.randint(low, high) if isinstance(low, int) and isinstance(high, int)
+                               else rng.uniform(low, high))
+            else:
+                point[name] = rng.choice(list(values))
+        samples.append(point)
+    return samples
+
+
+def params_key(params: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+
+@contextmanager
+def apply_params(params: Dict[str, Any]) -> Iterator[None]:
+    """Temporarily override settings attributes (dotted paths for nested dicts)."""
+    saved = {}
+    try:
+        for path, value in params.items():
+            name, *keys = path.split('.')
+            if name not in saved:
+                saved[name] = copy.deepcopy(getattr(settings, name))
+            if not keys:
+                setattr(settings, name, value)
+                continue
+            target = copy.deepcopy(getattr(settings, name))
+            node = target
+            for key in keys[:-1]:
+                node = node[key]
+            node[keys[-1]] = value
+            setattr(settings, name, target)
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+
+class SharedCandles:
+    """All symbols' candles packed into two shared memory segments.
+
+    Workers attach by name and get zero-copy per-symbol views, so nothing but
+    the small layout dict is pickled per process.
+    """
+
+    def __init__(self, data: Dict[str, Dict[str, np.ndarray]]):
+        lengths = [len(ohlc['close']) for ohlc in data.values()]
+        total = max(1, sum(lengths))
+        self._values = shared_memory.SharedMemory(create=True, size=total * len(PRICE_COLUMNS) * 8)
+        self._times = shared_memory.SharedMemory(create=True, size=total * 8)
+        values = np.ndarray((len(PRICE_COLUMNS), total), dtype=np.float64, buffer=self._values.buf)
+        times = np.ndarray(total, dtype=np.int64, buffer=self._times.buf)
+
+        offsets = {}
+        offset = 0
+        for (symbol, ohlc), n in zip(data.items(), lengths):
+            times[offset:offset + n] = ohlc['timestamp']
+            for i, column in enumerate(PRICE_COLUMNS):
+                values[i, offset:offset + n] = ohlc[column]
+            offsets[symbol] = (offset, n)
+            offset += n
+
+        self.layout = {
+            'values': self._values.name,
+            'times': self._times.name,
+            'total': total,
+            'offsets': offsets
+        }
+
+    @staticmethod
+    def attach(layout: Dict[str, Any]) -> Tuple[Dict[str, Dict[str, np.ndarray]], list]:
+        values_shm = shared_memory.SharedMemory(name=layout['values'])
+        times_shm = shared_memory.SharedMemory(name=layout['times'])
+        values = np.ndarray((len(PRICE_COLUMNS), layout['total']), dtype=np.float64, buffer=values_shm.buf)
+        times = np.ndarray(layout['total'], dtype=np.int64, buffer=times_shm.buf)
+        data = {}
+        for symbol, (offset, n) in layout['offsets'].items():
+            ohlc = {'timestamp': times[offset:offset + n]}
+            for i, column in enumerate(PRICE_COLUMNS):
+                ohlc[column] = values[i, offset:offset + n]
+            data[symbol] = ohlc
+        # keep the handles alive as long as the views are used
+        return data, [values_shm, times_shm]
+
+    def close(self):
+        for shm in (self._values, self._times):
+            shm.close()
+            shm.unlink()
+
+
+_worker_data: Dict[str, Dict[str, np.ndarray]] = {}
+_worker_handles: list = []
+
+
+def _init_worker(layout: Dict[str, Any]):
+    global _worker_data, _worker_handles
+    _worker_data, _worker_handles = SharedCandles.attach(layout)
+
+
+def _slice_period(data: Dict[str, Dict[str, np.ndarray]], start: Optional[int],
+                  end: Optional[int], warmup: int) -> Dict[str, Dict[str, np.ndarray]]:
+    """Views of each symbol's candles in [start, end) plus `warmup` earlier candles."""
+    sliced = {}
+    for symbol, ohlc in data.items():
+        times = ohlc['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, end, side='left'))
+        lo = max(0, lo - warmup)
+        if hi - lo > warmup + 1:
+            sliced[symbol] = {k: v[lo:hi] for k, v in ohlc.items()}
+    return sliced
+
+
+def _evaluate(params: Dict[str, Any], start: Optional[int], end: Optional[int],
+              backtest_args: Dict[str, Any]) -> Dict[str, Any]:
+    with apply_params(params):
+        backtester = Backtester(**backtest_args)
+        data = _slice_period(_worker_data, start, end, backtester.warmup)
+        return backtester.run(data).stats()
+
+
+class SweepRunner:
+    """Evaluates parameter sets with the backtester on a process pool.
+
+    Every finished evaluation is appended to `results_path` (JSON lines), and
+    evaluations already present there are skipped, so an interrupted sweep
+    resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        data: Dict[str, Dict[str, np.ndarray]],
+        results_path: str = 'sweep_results.jsonl',
+        workers: Optional[int] = None,
+        objective: str = 'total_return',
+        min_trades: int = 30,
+        backtest_args: Optional[Dict[str, Any]] = None
+    ):
+        self.data = data
+        self.results_path = results_path
+        self.workers = workers or settings.OPTIMIZER_WORKERS or os.cpu_count() or 1
+        self.objective = objective
+        self.min_trades = min_trades
+        self.backtest_args = backtest_args or {}
+
+    def score(self, stats: Dict[str, Any]) -> float:
+        if stats.get('trades', 0) < self.min_trades:
+            return float('-inf')
+        return float(stats.get(self.objective, float('-inf')))
+
+    def _load_done(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        done = {}
+        if os.path.exists(self.results_path):
+            with open(self.results_path) as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        done[(row['period'], row['key'])] = row
+        return done
+
+    def evaluate(self, param_sets: List[Dict[str, Any]], start: Optional[int] = None,
+                 end: Optional[int] = None, period: str = 'full') -> List[Dict[str, Any]]:
+        """Evaluate `param_sets` on [start, end), returning rows ranked by score."""
+        done = self._load_done()
+        rows = {params_key(p): done[(period, params_key(p))]
+                for p in param_sets if (period, params_key(p)) in done}
+        pending = [p for p in param_sets if params_key(p) not in rows]
+        if pending:
+            logger.info(f"{period}: {len(pending)} evaluations pending, {len(rows)} resumed")
+            rows.update(self._run_pending(pending, start, end, period))
+        return sorted(rows.values(), key=lambda r: r['score'], reverse=True)
+
+    def _run_pending(self, pending, start, end, period) -> Dict[str, Dict[str, Any]]:
+        rows = {}
+        shared = SharedCandles(self.data)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=process_context('core.optimizer'),
+                                     initializer=_init_worker, initargs=(shared.layout,)) as pool, \
+                    open(self.results_path, 'a') as out:
+                futures = {pool.submit(_evaluate, p, start, end, self.backtest_args): p
+                           for p in pending}
+                for future in as_completed(futures):
+                    params = futures[future]
+                    stats = future.result()
+                    row = {
+                        'period': period,
+                        'key': params_key(params),
+                        'params': params,
+                        'score': self.score(stats),
+                        'stats': stats
+                    }
+                    out.write(json.dumps(row, default=float) + '\n')
+                    out.flush()
+                    rows[row['key']] = row
+        finally:
+            shared.close()
+        return rows
+
+    def walk_forward(self, param_sets: List[Dict[str, Any]], train_hours: int,
+                     test_hours: int, step_hours: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Pick the best parameters on each train window and score them on the next test window."""
+        hour = 3600_000
+        step = (step_hours or test_hours) * hour
+        first = min(int(o['timestamp'][0]) for o in self.data.values())
+        last = max(int(o['timestamp'][-1]) for o in self.data.values())
+
+        folds = []
+        train_start = first
+        while train_start + (train_hours + test_hours) * hour <= last + hour:
+            train_end = train_start + train_hours * hour
+            test_end = train_end + test_hours * hour
+            fold = len(folds)
+            ranked = self.evaluate(param_sets, train_start, train_end, period=f"train{fold}")
+            best = ranked[0]
+            test = self.evaluate([best['params']], train_end, test_end, period=f"test{fold}")[0]
+            folds.append({
+                'fold': fold,
+                'train_start': train_start,
+                'train_end': train_end,
+                'test_end': test_end,
+                'params': best['params'],
+                'train_score': best['score'],
+                'test_score': test['score'],
+                'test_stats': test['stats']
+            })
+            train_start += step
+        return folds
+
+    @staticmethod
+    def write_table(rows: List[Dict[str, Any]], path: str):
+        """Write ranked rows as CSV: rank, score, one column per parameter and metric."""
+        params = sorted({k for r in rows for k in r['params']})
+        metrics = sorted({k for r in rows for k, v in r.get('stats', {}).items()
+                          if not isinstance(v, dict)})
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['rank', 'score'] + params + metrics)
+            for rank, row in enumerate(rows, 1):
+                writer.writerow(
+                    [rank, row['score']] +
+                    [row['params'].get(p) for p in params] +
+                    [row.get('stats', {}).get(m) for m in metrics]
+                )
@@ -0,0 +1,411 @@
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from core.candle_store import TIMEFRAME_MS
+from core.records import Signal
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Fill:
+    position_id: int
+    symbol: str
+    kind: str  # target1, target2, stop_loss, breakeven, timeout
+    price: float
+    quantity: float
+    pnl: float  # net of fees
+    time: int
+
+
+@dataclass
+class PaperPosition:
+    id: int
+    symbol: str
+    direction: int  # 1 = BUY, -1 = SELL
+    entry: float
+    quantity: float
+    stop_loss: float
+    target1: float
+    target2: float
+    leverage: int
+    opened_at: int
+    candle_time: int  # candle during which the position was opened
+    pattern: str = ''
+    remaining: float = 0.0
+    realized: float = 0.0
+    stage: int = 0  # 0 = waiting for target1, 1 = waiting for target2
+    version: int = 0  # bumped whenever the indexed stop/target changes
+    closed_at: Optional[int] = None
+    outcome: Optional[str] = None
+    fills: List[Fill] = field(default_factory=list)
+
+    @property
+    def is_open(self) -> bool:
+        return self.closed_at is None
+
+
+class _Levels:
+    """Stop and target heaps per direction d, keyed so that the position
+    closest to triggering is on top and the check is always `key <= threshold`:
+
+        stops:   key = -d * stop,   threshold = -d * adverse price
+        targets: key =  d * target, threshold =  d * favourable price
+
+    Entries are (key, seq, position id, version); an entry whose version no
+    longer matches the position is stale and dropped when it surfaces.
+    """
+
+    def __init__(self):
+        self.stops: Dict[int, list] = {1: [], -1: []}
+        self.targets: Dict[int, list] = {1: [], -1: []}
+
+    def absorb(self, other: '_Levels'):
+        for mine, theirs in ((self.stops, other.stops), (self.targets, other.targets)):
+            for d in (1, -1):
+                if theirs[d]:
+                    mine[d].extend(theirs[d])
+                    heapq.heapify(mine[d])
+                    theirs[d] = []
+
+
+class _Book:
+    """Trigger index of one symbol's open positions.
+
+    Positions opened during the current candle sit in `fresh` and are checked
+    against the last price only, since that candle's high and low may predate
+    the entry; from the next candle on they move to `live` and are checked
+    against full candles.
+    """
+
+    def __init__(self):
+        self.live = _Levels()
+        self.fresh = _Levels()
+        self.fresh_until = -1  # candle time of the newest fresh position
+        # breakeven stops armed after target1, activated on the next update
+        self.deferred: List[Tuple[_Levels, PaperPosition]] = []
+        self.open = 0
+        # sum(d * remaining) and sum(d * remaining * entry), for O(1) unrealized PnL
+        self.net_quantity = 0.0
+        self.net_cost = 0.0
+
+
+class PaperTrader:
+    """Simulated execution of signals against live candles.
+
+    Follows the backtester's rules: half of the position closes at target1
+    and the rest at target2, the stop moves to the entry after target1, a
+    stop touched in the same candle as a target wins, and positions older
+    than `max_hold_hours` close at the last price.
+
+    Each position risks `risk_per_trade` of equity between entry and stop;
+    its size is then cut to fit the portfolio caps on gross exposure
+    (`max_exposure` x equity) and on margin (notional / leverage <= equity).
+    """
+
+    def __init__(
+        self,
+        equity: Optional[float] = None,
+        risk_per_trade: Optional[float] = None,
+        max_exposure: Optional[float] = None,
+        max_leverage: Optional[int] = None,
+        fee_rate: Optional[float] = None,
+        slippage: Optional[float] = None,
+        max_hold_hours: Optional[float] = None
+    ):
+        self.initial_equity = equity or settings.PAPER_EQUITY
+        self.balance = self.initial_equity
+        self.risk_per_trade = risk_per_trade or settings.RISK_PER_TRADE
+        self.max_exposure = max_exposure or settings.PAPER_MAX_EXPOSURE
+        self.max_leverage = max_leverage or settings.MAX_LEVERAGE
+        self.fee_rate = settings.PAPER_FEE_RATE if fee_rate is None else fee_rate
+        self.slippage = settings.PAPER_SLIPPAGE if slippage is None else slippage
+        max_hold = settings.PAPER_MAX_HOLD_HOURS if max_hold_hours is None else max_hold_hours
+        self.max_hold_ms = int(max_hold * 3600_000) if max_hold else None
+
+        self.positions: Dict[int, PaperPosition] = {}
+        # only the newest closed positions are kept; counts cover all of them
+        self.closed: Deque[PaperPosition] = deque(maxlen=settings.PAPER_CLOSED_HISTORY)
+        self.closed_count = 0
+        self.wins = 0
+        self.books: Dict[str, _Book] = {}
+        self.last_price: Dict[str, float] = {}
+        self._expiries: list = []  # (expires_at, position id)
+        self.next_id = 1
+        self._seq = itertools.count()
+        self.gross_notional = 0.0
+        self.margin = 0.0
+        self.rejected = 0
+
+    # --- portfolio ---
+
+    def unrealized(self, symbol: Optional[str] = None) -> float:
+        books = [(symbol, self.books[symbol])] if symbol in self.books else (
+            [] if symbol is not None else self.books.items())
+        total = 0.0
+        for name, book in books:
+            price = self.last_price.get(name)
+            if price is not None and book.open:
+                total += book.net_quantity * price - book.net_cost
+        return total
+
+    @property
+    def equity(self) -> float:
+        return self.balance + self.unrealized()
+
+    def open_symbols(self) -> List[str]:
+        return [symbol for symbol, book in self.books.items() if book.open]
+
+    def risk_by_symbol(self) -> Dict[str, float]:
+        """Signed equity lost per symbol if every open position hit its stop (positive = long)."""
+        risk: Dict[str, float] = {}
+        for position in self.positions.values():
+            loss = position.remaining * abs(position.entry - position.stop_loss)
+            risk[position.symbol] = risk.get(position.symbol, 0.0) + position.direction * loss
+        return risk
+
+    # --- opening ---
+
+    def open(self, signal: Signal, candle_time: int, now: Optional[int] = None,
+             quantity: Optional[float] = None) -> Optional[PaperPosition]:
+        """Open a position for `signal`; returns None if it is invalid or no capacity is left.
+
+        `quantity` overrides the risk-based size (e.g. one sized by RiskEngine);
+        the portfolio caps still apply.
+        """
+        now = now if now is not None else int(time.time() * 1000)
+        d = signal.direction
+        entry = signal.entry * (1 + d * self.slippage)
+        stop, t1, t2 = signal.stop_loss, signal.target1, signal.target2
+        if not (d * (t1 - entry) > 0 and d * (t2 - t1) >= 0 and d * (entry - stop) > 0):
+            self.rejected += 1
+            return None
+
+        equity = self.equity
+        leverage = max(1, min(int(signal.leverage), self.max_leverage))
+        if quantity is None:
+            quantity = equity * self.risk_per_trade / abs(entry - stop)
+        # scale down to the room left under the exposure and margin caps
+        room = min(equity * self.max_exposure - self.gross_notional,
+                   (equity - self.margin) * leverage)
+        quantity = min(quantity, max(0.0, room) / entry)
+        if quantity * entry < 1e-9 * equity or quantity <= 0:
+            self.rejected += 1
+            logger.info(f"Paper position for {signal.symbol} rejected: portfolio caps reached")
+            return None
+
+        position = PaperPosition(
+            id=self.next_id,
+            symbol=signal.symbol,
+            direction=d,
+            entry=entry,
+            quantity=quantity,
+            remaining=quantity,
+            stop_loss=stop,
+            target1=t1,
+            target2=t2,
+            leverage=leverage,
+            opened_at=now,
+            candle_time=candle_time,
+            pattern=signal.pattern
+        )
+        self.next_id += 1
+        self.balance -= quantity * entry * self.fee_rate
+        self._track(position, fresh=True)
+        return position
+
+    def _track(self, position: PaperPosition, fresh: bool):
+        d = position.direction
+        notional = position.remaining * position.entry
+        self.gross_notional += notional
+        self.margin += notional / position.leverage
+        self.positions[position.id] = position
+
+        book = self.books.setdefault(position.symbol, _Book())
+        levels = book.fresh if fresh else book.live
+        target = position.target1 if position.stage == 0 else position.target2
+        self._push(levels.stops[d], -d * position.stop_loss, position)
+        self._push(levels.targets[d], d * target, position)
+        if fresh:
+            book.fresh_until = max(book.fresh_until, position.candle_time)
+        book.open += 1
+        book.net_quantity += d * position.remaining
+        book.net_cost += d * position.remaining * position.entry
+        if self.max_hold_ms:
+            heapq.heappush(self._expiries, (position.opened_at + self.max_hold_ms, position.id))
+
+    def _push(self, heap: list, key: float, position: PaperPosition):
+        heapq.heappush(heap, (key, next(self._seq), position.id, position.version))
+
+    # --- price updates ---
+
+    def on_tick(self, symbol: str, price: float, time_ms: Optional[int] = None) -> List[Fill]:
+        return self.on_candle(symbol, None, price, price, price, time_ms)
+
+    def on_candle(self, symbol: str, candle_time: Optional[int], high: float, low: float,
+                  close: float, time_ms: Optional[int] = None) -> List[Fill]:
+        """Check triggers against one candle (or tick when candle_time is None)."""
+        time_ms = time_ms if time_ms is not None else int(time.time() * 1000)
+        self.last_price[symbol] = close
+        fills: List[Fill] = []
+        book = self.books.get(symbol)
+        if book is not None and book.open:
+            if candle_time is not None and candle_time > book.fresh_until:
+                book.live.absorb(book.fresh)
+            for d in (1, -1):
+                favourable, adverse = (high, low) if d == 1 else (low, high)
+                self._trigger(book, book.live, d, favourable, adverse, time_ms, fills)
+                self._trigger(book, book.fresh, d, close, close, time_ms, fills)
+            for levels, position in book.deferred:
+                if position.is_open:
+                    self._push(levels.stops[position.direction], -position.direction * position.stop_loss, position)
+            book.deferred = []
+
+        self._expire(time_ms, fills)
+        return fills
+
+    def _pop_triggered(self, heap: list, threshold: float) -> Optional[PaperPosition]:
+        while heap and heap[0][0] <= threshold:
+            _, _, position_id, version = heapq.heappop(heap)
+            position = self.positions.get(position_id)
+            if position is not None and position.version == version:
+                return position
+        return None
+
+    def _trigger(self, book: _Book, levels: _Levels, d: int, favourable: float, adverse: float,
+                 time_ms: int, fills: List[Fill]):
+        # stops first: when both are touched in the same candle the stop wins
+        while True:
+            position = self._pop_triggered(levels.stops[d], -d * adverse)
+            if position is None:
+                break
+            kind = 'breakeven' if position.stage else 'stop_loss'
+            price = position.stop_loss * (1 - d * self.slippage)
+            self._close(book, position, price, position.remaining, kind, time_ms, fills)
+
+        while True:
+            position = self._pop_triggered(levels.targets[d], d * favourable)
+            if position is None:
+                break
+            if position.stage == 0:
+                self._close(book, position, position.target1, position.quantity / 2, 'target1', time_ms, fills)
+                # the rest runs to target2 (possibly in this same candle) with the
+                # stop at the entry, which is only checked from the next update on
+                position.stage = 1
+                position.stop_loss = position.entry
+                position.version += 1
+                self._push(levels.targets[d], d * position.target2, position)
+                book.deferred.append((levels, position))
+            else:
+                self._close(book, position, position.target2, position.remaining, 'target2', time_ms, fills)
+
+    def _expire(self, time_ms: int, fills: List[Fill]):
+        while self._expiries and self._expiries[0][0] <= time_ms:
+            _, position_id = heapq.heappop(self._expiries)
+            position = self.positions.get(position_id)
+            if position is None:
+                continue
+            price = self.last_price.get(position.symbol, position.entry)
+            self._close(self.books[position.symbol], position, price, position.remaining, 'timeout', time_ms, fills)
+
+    def _close(self, book: _Book, position: PaperPosition, price: float, quantity: float,
+               kind: str, time_ms: int, fills: List[Fill]):
+        d = position.direction
+        quantity = min(quantity, position.remaining)
+        pnl = d * (price - position.entry) * quantity - price * quantity * self.fee_rate
+        fill = Fill(position.id, position.symbol, kind, price, quantity, pnl, time_ms)
+        position.fills.append(fill)
+        position.remaining -= quantity
+        position.realized += pnl
+        self.balance += pnl
+        notional = quantity * position.entry
+        self.gross_notional -= notional
+        self.margin -= notional / position.leverage
+        book.net_quantity -= d * quantity
+        book.net_cost -= d * quantity * position.entry
+        fills.append(fill)
+
+        if position.remaining <= position.quantity * 1e-12:
+            position.remaining = 0.0
+            position.closed_at = time_ms
+            position.outcome = kind
+            position.version += 1  # invalidates its heap entries
+            del self.positions[position.id]
+            self.closed.append(position)
+            self.closed_count += 1
+            self.wins += position.realized > 0
+            book.open -= 1
+            if not book.open:
+                book.net_quantity = book.net_cost = 0.0
+            logger.info(f"Paper {position.symbol} #{position.id} closed by {kind}, "
+                        f"PnL {position.realized:+.2f}")
+
+    # --- persistence ---
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Open positions, balance and the retained closed positions."""
+        return {
+            'balance': self.balance,
+            'positions': list(self.positions.values()),
+            'closed': list(self.closed),
+            'closed_count': self.closed_count,
+            'wins': self.wins,
+            'last_price': dict(self.last_price),
+            'rejected': self.rejected,
+            'next_id': self.next_id
+        }
+
+    def restore(self, state: Dict[str, Any]):
+        """Reload a snapshot into an empty trader; restored positions see full candles at once."""
+        self.balance = state['balance']
+        self.closed.extend(state['closed'])
+        # snapshots from before the history was capped hold every closed position
+        self.closed_count = state.get('closed_count', len(state['closed']))
+        self.wins = state.get('wins', sum(p.realized > 0 for p in state['closed']))
+        self.last_price.update(state['last_price'])
+        self.rejected = state['rejected']
+        self.next_id = state['next_id']
+        for position in state['positions']:
+            self._track(position, fresh=False)
+
+    # --- wiring ---
+
+    def attach(self, candles, timeframe: str = '1h'):
+        """Follow every candle merged into a CandleStore for `timeframe`."""
+        period = TIMEFRAME_MS[timeframe]
+
+        def listener(symbol: str, tf: str, times: np.ndarray, values: np.ndarray):
+            if tf != timeframe or not len(times):
+                return
+            if symbol not in self.books:
+                self.last_price[symbol] = float(values[3, -1])
+                return
+            now = int(time.time() * 1000)
+            for i in range(len(times)):
+                t = int(times[i])
+                # replaying the forming candle is harmless: each level fires once
+                self.on_candle(symbol, t, float(values[1, i]), float(values[2, i]),
+                               float(values[3, i]), min(now, t + period))
+
+        candles.listeners.append(listener)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'equity': float(self.equity),
+            'balance': float(self.balance),
+            'unrealized': float(self.unrealized()),
+            'open_positions': len(self.positions),
+            'closed_positions': self.closed_count,
+            'gross_exposure': float(self.gross_notional / self.equity) if self.equity > 0 else 0.0,
+            'margin_used': float(self.margin),
+            'win_rate': self.wins / self.closed_count if self.closed_count else 0.0,
+            'rejected': self.rejected
+        }
@@ -1,17 +1,97 @@
 import talib
 import numpy as np
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Callable, Dict, Any, Hashable, List, Optional, Sequence, Tuple
+
+from config import settings
+from core.context import as_context
+from core.indicators import IndicatorEngine
+from core.news import LexiconScorer, label
+
+ALL_CANDLE_PATTERNS: Tuple[str, ...] = tuple(sorted(
+    talib.get_function_groups()['Pattern Recognition']))
+
+
+@lru_cache(maxsize=1)
+def candle_pattern_registry() -> Dict[str, Tuple[Callable, int]]:
+    """talib function and tail window (lookback + 1 candles) of every CDL* pattern.
+
+    Built once per process and shared by all scanners; forked workers inherit
+    it from the parent.
+    """
+    import talib.abstract
+    return {name: (getattr(talib, name), talib.abstract.Function(name).lookback + 1)
+            for name in ALL_CANDLE_PATTERNS}
+
+
+class CandlePatternScanner:
+    """Evaluates talib CDL* patterns on the last candle only.
+
+    Each pattern runs on a tail slice just long enough for its own lookback
+    (the candles it compares plus TA-Lib's body/shadow averaging periods),
+    instead of on the full history. Results are packed into bitmasks with
+    bit i standing for `patterns[i]`.
+    """
+
+    def __init__(self, patterns: Optional[Sequence[str]] = None):
+        self.patterns = tuple(patterns or ALL_CANDLE_PATTERNS)
+        if len(self.patterns) > 64:
+            raise ValueError("at most 64 patterns fit in a mask")
+        registry = candle_pattern_registry()
+        self.functions = [registry[name][0] for name in self.patterns]
+        self.windows = [registry[name][1] for name in self.patterns]
+
+    def scan(self, ohlc: Dict[str, Any]) -> Tuple[int, int]:
+        """(bullish mask, bearish mask) for the last candle of `ohlc`."""
+        ctx = as_context(ohlc)
+        o, h, l, c = ctx['open'], ctx['high'], ctx['low'], ctx['close']
+        n = len(c)
+        bullish = bearish = 0
+        for bit, (func, window) in enumerate(zip(self.functions, self.windows)):
+            if n < window:
+                continue
+            value = func(o[-window:], h[-window:], l[-window:], c[-window:])[-1]
+            if value > 0:
+                bullish |= 1 << bit
+            elif value < 0:
+                bearish |= 1 << bit
+        return bullish, bearish
+
+    def scan_batch(self, ohlcs: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Bullish and bearish masks for many symbols as uint64 arrays."""
+        masks = np.array([self.scan(ohlc) for ohlc in ohlcs], dtype=np.uint64).reshape(-1, 2)
+        return masks[:, 0], masks[:, 1]
+
+    def decode(self, mask: int) -> List[str]:
+        return [name for bit, name in enumerate(self.patterns) if int(mask) >> bit & 1]
+
 
 class PatternDetector:
+    def __init__(self):
+        self.indicator_engine = IndicatorEngine()
+        self.candle_scanner = CandlePatternScanner(settings.CANDLE_PATTERNS)
+        self.news_scorer = LexiconScorer()
+
+    def candle_pattern_mask(self, ohlc: Dict[str, Any]) -> int:
+        # Bit i is set when candle_scanner.patterns[i] fired on the last candle
+        bullish, bearish = self.candle_scanner.scan(ohlc)
+        return bullish | bearish
+
     def detect_candle_patterns(self, ohlc: Dict[str, Any]) -> Dict[str, bool]:
-        # Implement all 61 candlestick patterns
-        patterns = {}
-        for func in [f for f in dir(talib) if f.startswith('CDL')]:
-            result = getattr(talib, func)(
-                ohlc['open'], ohlc['high'], ohlc['low'], ohlc['close'])
-            patterns[func] = bool(result[-1])
-        return patterns
+        # Candlestick patterns on the last candle (see CandlePatternScanner)
+        mask = self.candle_pattern_mask(ohlc)
+        return {name: bool(mask >> bit & 1) for bit, name in enumerate(self.candle_scanner.patterns)}
     
+    def analyze_news_sentiment(self, news: Any) -> Optional[Dict[str, Any]]:
+        # Either a symbol's cached entry from NewsService, or raw articles scored here in one batch
+        if not news:
+            return None
+        if isinstance(news, dict):
+            return news
+        texts = [f"{item.get('title', '')}. {item.get('summary') or item.get('body') or ''}" for item in news]
+        score = float(self.news_scorer.score_batch(texts).mean())
+        return {'sentiment': label(score), 'score': score, 'articles': len(texts)}
+
     def detect_harmonic_patterns(self, ohlc: Dict[str, Any]) -> Dict[str, bool]:
         # Implement harmonic patterns (Gartley, Bat, Butterfly, etc.)
         patterns = {
@@ -23,16 +103,28 @@ class PatternDetector:
         }
         return patterns
     
-    def calculate_indicators(self, ohlc: Dict[str, Any]) -> Dict[str, Any]:
+    def calculate_indicators(self, ohlc: Dict[str, Any], key: Optional[Hashable] = None,
+                             live: bool = True) -> Dict[str, Any]:
+        # With a key (e.g. (symbol, timeframe)) indicators are updated
+        # incrementally; with `live` the last candle is treated as forming
+        if key is not None:
+            return self.indicator_engine.update(key, as_context(ohlc), live=live)
+
         # Calculate technical indicators
-        closes = np.array(ohlc['close'])
+        return {k: v[-1] for k, v in self.indicator_series(ohlc).items()}
+
+    def indicator_series(self, ohlc: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        # Full indicator series in one vectorized pass per indicator
+        ctx = as_context(ohlc)
+        closes = ctx['close']
+        macd, macd_signal, macd_hist = talib.MACD(closes)
         return {
-            'rsi': talib.RSI(closes)[-1],
-            'macd': talib.MACD(closes)[-1],
-            'atr': talib.ATR(
-                ohlc['high'], ohlc['low'], ohlc['close'])[-1],
-            'ema50': talib.EMA(closes, 50)[-1],
-            'ema200': talib.EMA(closes, 200)[-1],
-            'adx': talib.ADX(
-                ohlc['high'], ohlc['low'], ohlc['close'])[-1]
+            'rsi': talib.RSI(closes),
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_hist': macd_hist,
+            'atr': ctx.atr(14),
+            'ema50': talib.EMA(closes, 50),
+            'ema200': talib.EMA(closes, 200),
+            'adx': talib.ADX(ctx['high'], ctx['low'], closes)
         }
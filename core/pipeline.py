@@ -0,0 +1,178 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from core.candle_store import CandleStore
+from core.metrics import metrics
+from core.scanner import ScanReport, SymbolHandler, SymbolScanner
+from strategies.batch import BatchAnalyzer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StageStats:
+    name: str
+    entered: int = 0
+    passed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def dropped(self) -> int:
+        return self.entered - self.passed
+
+
+@dataclass
+class PipelineReport:
+    """Funnel of one cycle: symbols in/out and time spent per stage."""
+    stages: List[StageStats] = field(default_factory=list)
+    # symbols passing each prefilter criterion on its own
+    criteria: Dict[str, int] = field(default_factory=dict)
+    scans: Dict[str, ScanReport] = field(default_factory=dict)
+    results: Dict[str, Any] = field(default_factory=dict)
+    signals: int = 0  # set by the caller once the cycle's signals are sized and sent
+
+    @property
+    def wall_time(self) -> float:
+        return sum(s.seconds for s in self.stages)
+
+    def stage(self, name: str) -> StageStats:
+        stats = StageStats(name)
+        self.stages.append(stats)
+        return stats
+
+    def summary(self) -> str:
+        funnel = " | ".join(f"{s.name} {s.entered}->{s.passed} ({s.seconds:.2f}s)" for s in self.stages)
+        criteria = ", ".join(f"{k}={v}" for k, v in self.criteria.items())
+        return f"{funnel} | signals {self.signals} in {self.wall_time:.2f}s [{criteria}]"
+
+
+class Prefilter:
+    """Vectorized screen over the (symbols x candles) matrix.
+
+    A symbol is a candidate when its ATR is inside the configured band (as a
+    fraction of price) and it shows at least one reason to look closer: a
+    volume spike, price near a key level, or a candle/smart-money setup on
+    the last candle.
+    """
+
+    def __init__(
+        self,
+        cooldown: timedelta = timedelta(hours=4),
+        atr_period: int = 14,
+        atr_band: Optional[Tuple[float, float]] = None,
+        volume_factor: Optional[float] = None,
+        volume_window: int = 20,
+        level_distance: Optional[float] = None
+    ):
+        self.cooldown = cooldown
+        self.atr_period = atr_period
+        self.atr_band = atr_band or settings.PREFILTER_ATR_BAND
+        self.volume_factor = volume_factor or settings.PREFILTER_VOLUME_FACTOR
+        self.volume_window = volume_window
+        self.level_distance = level_distance or settings.PREFILTER_LEVEL_DISTANCE
+
+    @property
+    def length(self) -> int:
+        # candles needed per symbol
+        return max(settings.KEY_LEVEL_LOOKBACK, self.atr_period + 1, self.volume_window + 1)
+
+    def cooldown_mask(self, symbols: List[str], last_signals: Dict[str, datetime],
+                      now: Optional[datetime] = None) -> np.ndarray:
+        """True for symbols that may signal again (same rule as should_send_signal)."""
+        now = now or datetime.utcnow()
+        cutoff = (now - self.cooldown).timestamp()
+        last = np.array([last_signals[s].timestamp() if s in last_signals else -np.inf for s in symbols])
+        return last < cutoff
+
+    def evaluate(self, symbols: List[str], matrix: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Boolean masks per criterion plus the combined 'candidate' mask."""
+        high, low, close, volume = matrix['high'], matrix['low'], matrix['close'], matrix['volume']
+        price = close[:, -1]
+
+        with np.errstate(invalid='ignore'):
+            prev_close = np.concatenate([np.full((len(close), 1), np.nan), close[:, :-1]], axis=1)
+            tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+            atr = np.nanmean(tr[:, -self.atr_period:], axis=1) / price
+            atr_ok = (atr >= self.atr_band[0]) & (atr <= self.atr_band[1])
+
+            average = np.nanmean(volume[:, -self.volume_window - 1:-1], axis=1)
+            volume_spike = volume[:, -1] > average * self.volume_factor
+
+            batch = BatchAnalyzer.analyze(symbols, matrix)
+            distance = np.fmin(np.abs(price - batch['support']), np.abs(batch['resistance'] - price)) / price
+            near_level = distance <= self.level_distance
+
+        setup = (batch['pinbar'] | batch['engulfing'] | batch['bullish_ob'] | batch['bearish_ob'] |
+                 batch['bullish_fvg'] | batch['bearish_fvg'])
+        return {
+            'atr_band': atr_ok,
+            'volume_spike': volume_spike,
+            'near_level': near_level,
+            'setup': setup,
+            'candidate': atr_ok & (volume_spike | near_level | setup)
+        }
+
+
+class SignalPipeline:
+    """Cooldown -> fetch -> prefilter -> full analysis, with per-stage stats.
+
+    Only the symbols surviving the cheap stages reach `analyze`, which
+    should run the expensive analysis on already synced candles.
+    """
+
+    def __init__(self, candles: CandleStore, scanner: SymbolScanner,
+                 prefilter: Optional[Prefilter] = None, timeframe: str = '1h'):
+        self.candles = candles
+        self.scanner = scanner
+        self.prefilter = prefilter or Prefilter()
+        self.timeframe = timeframe
+
+    async def run(self, symbols: List[str], last_signals: Dict[str, datetime],
+                  analyze: SymbolHandler) -> PipelineReport:
+        report = PipelineReport()
+
+        stage = report.stage('cooldown')
+        t = time.perf_counter()
+        stage.entered = len(symbols)
+        symbols = [s for s, ok in zip(symbols, self.prefilter.cooldown_mask(symbols, last_signals)) if ok]
+        stage.passed, stage.seconds = len(symbols), time.perf_counter() - t
+
+        stage = report.stage('fetch')
+        stage.entered = len(symbols)
+        scan = await self.scanner.scan(symbols, self._sync)
+        report.scans['fetch'] = scan
+        symbols = [s for s in symbols if s in scan.results]
+        stage.passed, stage.seconds = len(symbols), scan.wall_time
+
+        stage = report.stage('prefilter')
+        t = time.perf_counter()
+        stage.entered = len(symbols)
+        present, matrix = self.candles.matrix(symbols, self.timeframe, self.prefilter.length)
+        if present:
+            masks = self.prefilter.evaluate(present, matrix)
+            report.criteria = {k: int(v.sum()) for k, v in masks.items() if k != 'candidate'}
+            symbols = [s for s, ok in zip(present, masks['candidate']) if ok]
+        else:
+            symbols = []
+        stage.passed, stage.seconds = len(symbols), time.perf_counter() - t
+
+        stage = report.stage('analysis')
+        stage.entered = len(symbols)
+        scan = await self.scanner.scan(symbols, analyze)
+        report.scans['analysis'] = scan
+        report.results = scan.results
+        stage.passed, stage.seconds = scan.completed, scan.wall_time
+
+        for stats in report.stages:
+            metrics.observe('pipeline_stage_seconds', stats.seconds, stage=stats.name)
+        return report
+
+    async def _sync(self, symbol: str):
+        ohlc = await self.candles.sync(symbol, self.timeframe)
+        return ohlc if len(ohlc['close']) else None
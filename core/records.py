@@ -0,0 +1,200 @@
+from dataclasses import asdict, dataclass, field, fields
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+NAN = float('nan')
+
+
+@dataclass(slots=True)
+class Indicators:
+    rsi: float = NAN
+    macd: float = NAN
+    macd_signal: float = NAN
+    macd_hist: float = NAN
+    atr: float = NAN
+    ema50: float = NAN
+    ema200: float = NAN
+    adx: float = NAN
+
+    @classmethod
+    def from_dict(cls, values: Dict[str, Any]) -> 'Indicators':
+        return cls(**{f.name: float(values.get(f.name, NAN)) for f in fields(cls)})
+
+
+@dataclass(slots=True)
+class HarmonicMatch:
+    name: str
+    bullish: bool
+    confidence: float
+    entry: float = NAN
+    target: float = NAN
+    stop_loss: float = NAN
+
+    @classmethod
+    def from_dict(cls, name: str, values: Dict[str, Any]) -> 'HarmonicMatch':
+        return cls(
+            name=name,
+            bullish=values.get('pattern_type') == 'bullish',
+            confidence=float(values.get('confidence', 0.0)),
+            entry=float(values.get('entry', NAN)),
+            target=float(values.get('target', NAN)),
+            stop_loss=float(values.get('stop_loss', NAN))
+        )
+
+
+@dataclass(slots=True)
+class TimeframeBias:
+    timeframe: str
+    bullish: bool
+    strength: int
+    candle_time: int
+    indicators: Indicators
+
+
+@dataclass(slots=True)
+class Analysis:
+    """Flat result of analyzing one symbol on one timeframe."""
+    symbol: str
+    timestamp: datetime
+    price: float
+    timeframe: str = '1h'
+    indicators: Indicators = field(default_factory=Indicators)
+    # هارمونیک
+    harmonic: Tuple[HarmonicMatch, ...] = ()
+    # پرایس اکشن
+    has_price_action: bool = False
+    support: float = NAN
+    resistance: float = NAN
+    pivot: float = NAN
+    pinbar: bool = False
+    engulfing: bool = False
+    inside_bar: bool = False
+    # اسمارت مانی
+    has_smart_money: bool = False
+    bullish_ob: bool = False
+    bearish_ob: bool = False
+    bullish_fvg: bool = False
+    bearish_fvg: bool = False
+    liquidity_highs: Tuple[float, ...] = ()
+    liquidity_lows: Tuple[float, ...] = ()
+    # اخبار
+    news_sentiment: Optional[str] = None
+    news_score: float = NAN
+    mtf: Dict[str, TimeframeBias] = field(default_factory=dict)
+
+    @property
+    def key_levels(self) -> Dict[str, float]:
+        if not self.has_price_action:
+            return {}
+        return {'resistance': self.resistance, 'support': self.support, 'pivot': self.pivot}
+
+    def set_price_action(self, pa: Dict[str, Any]):
+        levels = pa.get('key_levels', {})
+        self.has_price_action = True
+        self.support = float(levels.get('support', NAN))
+        self.resistance = float(levels.get('resistance', NAN))
+        self.pivot = float(levels.get('pivot', NAN))
+        self.pinbar = bool(pa.get('pinbar', False))
+        self.engulfing = bool(pa.get('engulfing', False))
+        self.inside_bar = bool(pa.get('inside_bar', False))
+
+    def set_smart_money(self, sm: Dict[str, Any]):
+        order_blocks = sm.get('order_blocks', {})
+        fvg = sm.get('fair_value_gap', {})
+        zones = sm.get('liquidity_zones', {})
+        self.has_smart_money = bool(order_blocks)
+        self.bullish_ob = bool(order_blocks.get('bullish_ob', False))
+        self.bearish_ob = bool(order_blocks.get('bearish_ob', False))
+        self.bullish_fvg = bool(fvg.get('bullish', False))
+        self.bearish_fvg = bool(fvg.get('bearish', False))
+        self.liquidity_highs = tuple(float(x) for x in zones.get('highs', ()))
+        self.liquidity_lows = tuple(float(x) for x in zones.get('lows', ()))
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['timestamp'] = self.timestamp.isoformat()
+        return data
+
+
+@dataclass(slots=True)
+class Signal:
+    symbol: str
+    position_type: str
+    entry: float
+    target1: float
+    target2: float
+    stop_loss: float
+    leverage: int
+    pattern: str
+    rr_ratio: float
+    strength: int
+    timestamp: str
+    analysis_summary: str = ''
+
+    @property
+    def direction(self) -> int:
+        return 1 if self.position_type == 'BUY' else -1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class SizedOrder:
+    signal: Signal
+    quantity: float
+    notional: float
+    leverage: int
+    risk: float  # equity lost if the stop is hit
+    score: float
+    scale: float  # fraction of the full risk-based size that fit the portfolio caps
+    reason: str = ''  # why the order got no size, empty when it has one
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = self.signal.to_dict()
+        data.update(quantity=self.quantity, notional=self.notional, risk=self.risk, score=self.score)
+        return data
+
+
+# Scalar fields that become columns in AnalysisBatch
+_SCALAR_FIELDS = (
+    'price', 'support', 'resistance', 'pivot', 'pinbar', 'engulfing', 'inside_bar',
+    'bullish_ob', 'bearish_ob', 'bullish_fvg', 'bearish_fvg', 'news_score'
+)
+_COLUMN_TYPES = {
+    'pinbar': np.bool_, 'engulfing': np.bool_, 'inside_bar': np.bool_, 'bullish_ob': np.bool_,
+    'bearish_ob': np.bool_, 'bullish_fvg': np.bool_, 'bearish_fvg': np.bool_
+}
+
+
+class AnalysisBatch:
+    """Columnar form of a whole cycle's analyses (one array per field)."""
+
+    def __init__(self, symbols: List[str], columns: Dict[str, np.ndarray]):
+        self.symbols = symbols
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    @classmethod
+    def from_records(cls, records: Iterable[Analysis]) -> 'AnalysisBatch':
+        records = [r for r in records if isinstance(r, Analysis)]
+        columns = {
+            name: np.array([getattr(r, name) for r in records], dtype=_COLUMN_TYPES.get(name, np.float64))
+            for name in _SCALAR_FIELDS
+        }
+        for name in (f.name for f in fields(Indicators)):
+            columns[name] = np.array([getattr(r.indicators, name) for r in records], dtype=np.float64)
+        columns['harmonic_count'] = np.array([len(r.harmonic) for r in records], dtype=np.int32)
+        return cls([r.symbol for r in records], columns)
+
+    def to_dict(self) -> Dict[str, List[Any]]:
+        data = {'symbol': list(self.symbols)}
+        data.update({k: v.tolist() for k, v in self.columns.items()})
+        return data
@@ -0,0 +1,216 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from core.records import Signal, SizedOrder
+
+
+class RiskEngine:
+    """Stops, targets and position sizes for signals in both directions.
+
+    `levels` places stop and targets ATR multiples away from the entry on
+    the side given by the direction. `size` sizes every candidate of a cycle
+    at once: each order risks `risk_per_trade` of equity between entry and
+    stop, orders are ranked by a risk-adjusted score, and they are admitted
+    in that order until either cap is hit:
+
+    - correlated risk: the risk vector r (signed equity lost at each stop,
+      open positions included) must keep sqrt(r' C r) under
+      `max_portfolio_risk` x equity, C being the correlation of per-candle
+      returns, so five longs on coins that move together count like one
+      large position rather than five small ones;
+    - leverage: gross notional must stay under `max_leverage` x equity.
+
+    The order that crosses a cap is scaled down to fit; those after it get
+    zero size.
+    """
+
+    def __init__(
+        self,
+        params: Optional[Dict[str, Any]] = None,
+        risk_per_trade: Optional[float] = None,
+        rr_ratio: Optional[float] = None,
+        max_leverage: Optional[int] = None,
+        max_portfolio_risk: Optional[float] = None
+    ):
+        params = params or {}
+        self.rr_ratio = rr_ratio if rr_ratio is not None else params.get('rr_ratio', settings.RR_RATIO)
+        self.max_risk = risk_per_trade if risk_per_trade is not None else params.get('max_risk', settings.RISK_PER_TRADE)
+        self.max_leverage = max_leverage or params.get('max_leverage', settings.MAX_LEVERAGE)
+        self.max_portfolio_risk = max_portfolio_risk or params.get('max_portfolio_risk', settings.RISK_MAX_PORTFOLIO)
+
+    # --- levels ---
+
+    def levels(self, direction: np.ndarray, entry: np.ndarray, atr: np.ndarray) -> Dict[str, np.ndarray]:
+        """Targets at 1 and `rr_ratio` ATR, stop at 1 ATR, on the side of each direction (+1/-1)."""
+        d = np.asarray(direction, dtype=np.float64)
+        entry = np.asarray(entry, dtype=np.float64)
+        atr = np.asarray(atr, dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # a 1 ATR move costs about 10% of the margin
+            leverage = np.floor(10 / (atr / entry * 100))
+        leverage = np.clip(np.nan_to_num(leverage, nan=1.0, posinf=self.max_leverage), 1, self.max_leverage)
+        return {
+            'entry': entry,
+            'target1': entry + d * atr,
+            'target2': entry + d * atr * self.rr_ratio,
+            'stop_loss': entry - d * atr,
+            'leverage': leverage.astype(np.int64)
+        }
+
+    def calculate_position(
+        self,
+        atr: float,
+        key_levels: Dict[str, float],
+        current_price: Optional[float] = None,
+        direction: int = 1
+    ) -> Dict[str, Any]:
+        # Enter at the given level, or at the current price when there is none
+        entry = key_levels.get('entry', current_price)
+        levels = self.levels(np.array([direction]), np.array([entry]), np.array([atr]))
+        position = {k: float(v[0]) for k, v in levels.items()}
+        position['leverage'] = int(position['leverage'])
+        return position
+
+    # --- portfolio sizing ---
+
+    @staticmethod
+    def correlation(closes: np.ndarray) -> np.ndarray:
+        """Correlation of per-candle log returns between the rows of a (symbols x candles) close matrix.
+
+        Missing candles count as zero returns; a flat series is uncorrelated
+        with everything else.
+        """
+        closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+        n = len(closes)
+        if closes.shape[1] < 3:
+            return np.eye(n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            returns = np.diff(np.log(closes), axis=1)
+        returns = np.nan_to_num(returns, nan=0.0, posinf=0.0, neginf=0.0)
+        returns -= returns.mean(axis=1, keepdims=True)
+        covariance = returns @ returns.T / (returns.shape[1] - 1)
+        std = np.sqrt(np.diag(covariance))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            correlation = covariance / np.outer(std, std)
+        correlation = np.nan_to_num(correlation, nan=0.0, posinf=0.0, neginf=0.0)
+        np.fill_diagonal(correlation, 1.0)
+        return np.clip(correlation, -1.0, 1.0)
+
+    def size(
+        self,
+        signals: List[Signal],
+        equity: float,
+        book_risk: Optional[Dict[str, float]] = None,
+        book_notional: float = 0.0,
+        symbols: Optional[List[str]] = None,
+        closes: Optional[np.ndarray] = None
+    ) -> List[SizedOrder]:
+        """Size and rank `signals` against the open book.
+
+        `book_risk` maps symbols with open positions to their signed equity at
+        risk (positive long); `book_notional` is their gross notional.
+        `symbols`/`closes` are recent closes as returned by
+        `CandleStore.matrix`; symbols missing there are treated as
+        uncorrelated. Returns every signal, best score first; orders that got
+        no size carry the `reason`.
+        """
+        if not signals:
+            return []
+        book_risk = book_risk or {}
+        universe = list(dict.fromkeys([s.symbol for s in signals] + list(book_risk)))
+        column = {s: i for i, s in enumerate(universe)}
+
+        # correlation over the universe, identity where there is no history
+        correlation = np.eye(len(universe))
+        if symbols and closes is not None and len(symbols):
+            rows = [i for i, s in enumerate(symbols) if s in column]
+            at = np.array([column[symbols[i]] for i in rows], dtype=np.int64)
+            if len(rows):
+                correlation[np.ix_(at, at)] = self.correlation(np.asarray(closes)[rows])
+
+        d = np.array([s.direction for s in signals], dtype=np.float64)
+        entry = np.array([s.entry for s in signals], dtype=np.float64)
+        stop = np.array([s.stop_loss for s in signals], dtype=np.float64)
+        target = np.array([s.target2 for s in signals], dtype=np.float64)
+        strength = np.array([s.strength for s in signals], dtype=np.float64)
+        idx = np.array([column[s.symbol] for s in signals], dtype=np.int64)
+
+        distance = d * (entry - stop)
+        valid = (distance > 0) & (d * (target - entry) > 0) & np.isfinite(entry)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            quantity = np.where(valid, equity * self.max_risk / distance, 0.0)
+            reward = np.where(valid, d * (target - entry) / distance, 0.0)
+        # why a signal cannot be sized at all, '' when it can
+        invalid = np.select(
+            [~np.isfinite(entry), ~np.isfinite(stop), ~(distance > 0), ~(d * (target - entry) > 0),
+             np.full(len(signals), not equity > 0)],
+            ['invalid entry price', 'no stop loss (ATR unavailable)', 'stop loss on the wrong side of the entry',
+             'target on the wrong side of the entry', 'no equity'],
+            default='')
+
+        # correlation of each candidate with the open book, in risk terms
+        book = np.zeros(len(universe))
+        for symbol, risk in book_risk.items():
+            book[column[symbol]] = risk
+        book_exposure = correlation @ book
+        book_variance = float(book @ book_exposure)
+        if book_variance > 0:
+            overlap = d * book_exposure[idx] / np.sqrt(book_variance)
+        else:
+            overlap = np.zeros(len(signals))
+        # adding to what the book already holds is worth less than diversifying
+        score = np.where(valid, strength * reward * (1 - 0.5 * np.clip(overlap, -1, 1)), -np.inf)
+
+        order = np.argsort(-score, kind='stable')
+        risk = np.where(valid, d * equity * self.max_risk, 0.0)[order]
+        corr = correlation[np.ix_(idx[order], idx[order])]
+        scale = np.where(valid[order], 1.0, 0.0)
+        limited = np.full(len(signals), '', dtype=object)  # cap that cut each rank, by rank
+
+        # portfolio risk after admitting the first k orders: Q_k = (b + r_1..k)' C (b + r_1..k)
+        cross = risk * book_exposure[idx[order]]
+        pairwise = np.outer(risk, risk) * corr
+        variance = book_variance + 2 * np.cumsum(cross) + np.diagonal(pairwise.cumsum(0).cumsum(1))
+        limit = (equity * self.max_portfolio_risk) ** 2
+        over = np.flatnonzero(variance > limit)
+        if len(over):
+            k = over[0]
+            # largest s in [0, 1] with Q_{k-1} + 2 s r_k (C(b + r_1..k-1))_k + s^2 r_k^2 <= limit
+            before = variance[k - 1] if k else book_variance
+            b = 2 * (cross[k] + (pairwise[k, :k].sum() if k else 0.0))
+            a = risk[k] ** 2
+            c = before - limit
+            disc = b * b - 4 * a * c
+            s = (-b + np.sqrt(disc)) / (2 * a) if a > 0 and disc >= 0 and c <= 0 else 0.0
+            scale[k] *= float(np.clip(s, 0.0, 1.0))
+            scale[k + 1:] = 0.0
+            limited[k:] = 'portfolio risk limit reached'
+
+        notional = quantity[order] * entry[order] * scale
+        room = equity * self.max_leverage - book_notional
+        gross = np.cumsum(notional)
+        over = np.flatnonzero(gross > room)
+        if len(over):
+            k = over[0]
+            fit = max(0.0, room - (gross[k - 1] if k else 0.0))
+            scale[k] *= fit / notional[k] if notional[k] > 0 else 0.0
+            scale[k + 1:] = 0.0
+            tail = limited[k:]
+            tail[tail == ''] = 'account leverage limit reached'
+
+        orders = []
+        for rank, i in enumerate(order):
+            sized = quantity[i] * scale[rank]
+            orders.append(SizedOrder(
+                signal=signals[i],
+                quantity=float(sized),
+                notional=float(sized * entry[i]),
+                leverage=int(signals[i].leverage),
+                risk=float(abs(risk[rank]) * scale[rank]),
+                score=float(score[i]) if valid[i] else 0.0,
+                scale=float(scale[rank]),
+                reason='' if sized > 0 else str(invalid[i] or limited[rank] or 'zero size')
+            ))
+        return orders
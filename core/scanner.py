@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SymbolHandler = Callable[[str], Awaitable[Optional[Any]]]
+
+
+@dataclass
+class ScanReport:
+    """Per-cycle statistics of a scanner run."""
+    total: int = 0
+    completed: int = 0
+    empty: int = 0
+    timed_out: int = 0
+    failed: int = 0
+    wall_time: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)
+    results: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def skipped(self) -> int:
+        # Symbols that did not produce a result for any reason
+        return self.empty + self.timed_out + self.failed
+
+    @property
+    def throughput(self) -> float:
+        # Symbols per second over the whole cycle
+        return self.total / self.wall_time if self.wall_time > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"scanned {self.total} symbols in {self.wall_time:.2f}s "
+            f"({self.throughput:.1f} sym/s) - completed={self.completed} "
+            f"skipped={self.skipped} (empty={self.empty}, "
+            f"timeout={self.timed_out}, error={self.failed})"
+        )
+
+
+class SymbolScanner:
+    """Bounded fan-out runner for per-symbol coroutines.
+
+    At most `concurrency` handlers are in flight at once and each one is
+    cancelled after `timeout` seconds, so a single slow symbol cannot stall
+    the whole cycle.
+    """
+
+    def __init__(self, concurrency: int = 16, timeout: Optional[float] = 30.0):
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+    async def scan(self, symbols: Iterable[str], handler: SymbolHandler) -> ScanReport:
+        queue: asyncio.Queue = asyncio.Queue()
+        for symbol in symbols:
+            queue.put_nowait(symbol)
+
+        report = ScanReport(total=queue.qsize())
+        started = time.perf_counter()
+
+        async def worker():
+            while True:
+                try:
+                    symbol = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._run_one(symbol, handler, report)
+
+        workers = min(self.concurrency, report.total)
+        await asyncio.gather(*(worker() for _ in range(workers)))
+
+        report.wall_time = time.perf_counter() - started
+        return report
+
+    async def _run_one(self, symbol: str, handler: SymbolHandler, report: ScanReport):
+        try:
+            if self.timeout:
+                result = await asyncio.wait_for(handler(symbol), self.timeout)
+            else:
+                result = await handler(symbol)
+        except asyncio.TimeoutError:
+            report.timed_out += 1
+            report.errors[symbol] = f"timeout after {self.timeout}s"
+            metrics.inc('symbol_errors_total', symbol=symbol, kind='timeout')
+            logger.warning(f"Timeout while processing {symbol}")
+            return
+        except Exception as e:
+            report.failed += 1
+            report.errors[symbol] = str(e)
+            metrics.inc('symbol_errors_total', symbol=symbol, kind='error')
+            logger.error(f"Error processing {symbol}: {str(e)}")
+            return
+
+        if result is None:
+            report.empty += 1
+        else:
+            report.completed += 1
+            report.results[symbol] = result
@@ -0,0 +1,204 @@
+import importlib
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+from config import settings
+from core.context import ContextCache
+from core.metrics import metrics
+from core.pattern_detector import PatternDetector
+from core.records import Analysis, HarmonicMatch, Indicators, Signal
+from core.risk_engine import RiskEngine
+
+# settings.MODULES switch -> strategy class, imported the first time it is used
+STRATEGIES: Dict[str, Tuple[str, str]] = {
+    'harmonic': ('strategies.harmonic', 'HarmonicEngine'),
+    'price_action': ('strategies.price_action', 'PriceActionAnalyzer'),
+    'smart_money': ('strategies.smart_money', 'SmartMoneyConcepts')
+}
+
+
+@lru_cache(maxsize=None)
+def strategy(module: str) -> Any:
+    path, name = STRATEGIES[module]
+    return getattr(importlib.import_module(path), name)
+
+
+class SignalEngine:
+    """Analysis and signal construction shared by the live bot and the backtester.
+
+    Nothing here touches the network or the clock, so the same code path can
+    replay stored candles.
+    """
+
+    def __init__(self, pattern_detector: PatternDetector, risk_engine: RiskEngine):
+        self.pattern_detector = pattern_detector
+        self.risk_engine = risk_engine
+        self._harmonics = None
+        self.contexts = ContextCache()
+
+    @property
+    def harmonics(self):
+        # per-symbol zigzag state, created once the harmonic module is first used
+        if self._harmonics is None:
+            self._harmonics = strategy('harmonic')()
+        return self._harmonics
+
+    def analyze(
+        self,
+        symbol: str,
+        ohlc: Dict[str, Any],
+        timestamp: Optional[datetime] = None,
+        news: Optional[Any] = None,
+        indicators: Optional[Dict[str, Any]] = None,
+        live: bool = True,
+        timeframe: str = '1h'
+    ) -> Analysis:
+        """آنالیز کامل یک نماد روی داده‌های موجود"""
+        # تبدیل یک‌باره داده‌ها و محاسبات مشترک بین ماژول‌ها
+        ohlc = self.contexts.get((symbol, timeframe), ohlc)
+        analysis = Analysis(
+            symbol=symbol,
+            timestamp=timestamp or datetime.utcnow(),
+            price=float(ohlc['close'][-1]),
+            timeframe=timeframe
+        )
+
+        # تحلیل هارمونیک
+        if settings.MODULES['harmonic']:
+            with metrics.timer('analysis_seconds', module='harmonic'):
+                found = self.harmonics.detect_all((symbol, timeframe), ohlc, live=live)
+            analysis.harmonic = tuple(HarmonicMatch.from_dict(k, v) for k, v in found.items())
+
+        # تحلیل پرایس اکشن
+        if settings.MODULES['price_action']:
+            with metrics.timer('analysis_seconds', module='price_action'):
+                analysis.set_price_action(strategy('price_action').analyze_candles(ohlc))
+
+        # تحلیل اسمارت مانی
+        if settings.MODULES['smart_money']:
+            with metrics.timer('analysis_seconds', module='smart_money'):
+                analysis.set_smart_money(strategy('smart_money').analyze(ohlc))
+
+        # محاسبه اندیکاتورها
+        if indicators is None:
+            with metrics.timer('analysis_seconds', module='indicators'):
+                indicators = self.pattern_detector.calculate_indicators(
+                    ohlc, key=(symbol, timeframe), live=live)
+        analysis.indicators = Indicators.from_dict(indicators)
+
+        # تحلیل اخبار
+        if settings.MODULES['news'] and news is not None:
+            with metrics.timer('analysis_seconds', module='news'):
+                sentiment = self.pattern_detector.analyze_news_sentiment(news)
+            if sentiment:
+                analysis.news_sentiment = sentiment['sentiment']
+                analysis.news_score = float(sentiment.get('score', float('nan')))
+
+        return analysis
+
+    def build_signal(self, analysis: Analysis, timestamp: Optional[datetime] = None) -> Signal:
+        """تولید سیگنال معاملاتی بر اساس تحلیل"""
+        # جهت، قدرت و الگوی اصلی در یک مرحله
+        is_bullish, strength, pattern = self.score(analysis)
+
+        # محاسبه نقاط ورود و خروج در جهت سیگنال
+        risk_data = self.risk_engine.calculate_position(
+            atr=analysis.indicators.atr,
+            current_price=analysis.price,
+            key_levels=analysis.key_levels,
+            direction=1 if is_bullish else -1
+        )
+        
+        return Signal(
+            symbol=analysis.symbol,
+            position_type='BUY' if is_bullish else 'SELL',
+            entry=risk_data['entry'],
+            target1=risk_data['target1'],
+            target2=risk_data['target2'],
+            stop_loss=risk_data['stop_loss'],
+            leverage=risk_data['leverage'],
+            pattern=pattern,
+            rr_ratio=settings.RR_RATIO,
+            strength=strength,
+            timestamp=(timestamp or datetime.utcnow()).isoformat(),
+            analysis_summary=self._generate_analysis_summary(analysis)
+        )
+
+    def score(self, analysis: Analysis) -> Tuple[bool, int, str]:
+        """جهت بازار، قدرت سیگنال (1 تا 5) و قوی‌ترین الگو"""
+        ind = analysis.indicators
+        strength = 0
+        best_pattern, best_score = "Multiple Indicators", -1.0
+
+        # 1. اندیکاتورها
+        indicators_bullish = ind.rsi > 50 and ind.macd > 0 and ind.ema50 > ind.ema200
+        if ind.rsi > 60 or ind.rsi < 40:
+            strength += 1
+        if ind.macd > 0:
+            strength += 1
+        if ind.adx > 25:
+            strength += 1
+
+        # 2. هارمونیک
+        harmonic_bullish = False
+        for match in analysis.harmonic:
+            harmonic_bullish = harmonic_bullish or match.bullish
+            if match.confidence > best_score:
+                best_pattern, best_score = f"Harmonic {match.name}", match.confidence
+        if analysis.harmonic:
+            strength += 2
+
+        # 3. پرایس اکشن
+        price_action_bullish = analysis.pinbar or analysis.engulfing
+        if price_action_bullish:
+            strength += 1
+        if analysis.pinbar and 0.8 > best_score:
+            best_pattern, best_score = "Pin Bar", 0.8
+        if analysis.engulfing and 0.7 > best_score:
+            best_pattern, best_score = "Engulfing", 0.7
+
+        # 4. اسمارت مانی
+        if analysis.has_smart_money:
+            strength += 1
+        if analysis.bullish_ob and 0.9 > best_score:
+            best_pattern, best_score = "Bullish OB", 0.9
+        elif analysis.bearish_ob and not analysis.bullish_ob and 0.9 > best_score:
+            best_pattern, best_score = "Bearish OB", 0.9
+
+        is_bullish = (indicators_bullish + price_action_bullish +
+                      harmonic_bullish + analysis.bullish_ob) >= 2
+
+        # هم‌جهتی تایم‌فریم‌های بالاتر
+        if analysis.mtf and all(tf.bullish == is_bullish for tf in analysis.mtf.values()):
+            strength += 1
+
+        return is_bullish, min(5, max(1, strength)), best_pattern
+
+    # --- متدهای کمکی ---
+    def _generate_analysis_summary(self, analysis: Analysis) -> str:
+        """تولید خلاصه تحلیل برای گزارش"""
+        summary = []
+        
+        if analysis.harmonic:
+            summary.append(f"📊 Harmonic Patterns: {', '.join(m.name for m in analysis.harmonic)}")
+        
+        pa_items = []
+        if analysis.pinbar: pa_items.append("Pin Bar")
+        if analysis.engulfing: pa_items.append("Engulfing")
+        if pa_items:
+            summary.append(f"🕯️ Price Action: {', '.join(pa_items)}")
+        
+        if analysis.bullish_ob:
+            summary.append("💰 Smart Money: Bullish OB")
+        elif analysis.bearish_ob:
+            summary.append("💰 Smart Money: Bearish OB")
+        
+        if analysis.mtf:
+            biases = [f"{tf} {'↑' if v.bullish else '↓'}" for tf, v in analysis.mtf.items()]
+            summary.append(f"⏱️ Timeframes: {', '.join(biases)}")
+        
+        if analysis.news_sentiment:
+            summary.append(f"📰 News Sentiment: {analysis.news_sentiment.capitalize()}")
+        
+        return "\n".join(summary) if summary else "No strong patterns detected"
@@ -0,0 +1,71 @@
+import logging
+import os
+import pickle
+import time
+from typing import Any, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'TBSTATE1'
+
+
+class StateStore:
+    """Snapshot of the bot's in-memory state in one local file.
+
+    The snapshot is a dict of plain values, numpy arrays and the analysis
+    engines' state objects, pickled behind a small header. It is written to
+    a temporary file, fsynced and renamed over the previous one, so a crash
+    mid-write leaves the last complete snapshot in place. A file that cannot
+    be read (truncated, or written by incompatible code) is ignored and the
+    bot starts cold.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = settings.STATE_PATH if path is None else path
+        self.last_saved: Optional[float] = None
+        self.last_size = 0
+
+    def dumps(self, state: Dict[str, Any]) -> bytes:
+        """Serialize `state`; call this where the state is not being mutated (the event loop)."""
+        return MAGIC + pickle.dumps(dict(state, saved_at=time.time()), protocol=pickle.HIGHEST_PROTOCOL)
+
+    def write(self, data: bytes):
+        """Atomically replace the snapshot file with `data` (safe to run in a thread)."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)  # make the rename itself durable
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+        self.last_saved, self.last_size = time.time(), len(data)
+
+    def save(self, state: Dict[str, Any]) -> int:
+        """Serialize and write `state`; returns the snapshot size in bytes."""
+        data = self.dumps(state)
+        self.write(data)
+        return len(data)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError("not a state snapshot")
+                state = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable state snapshot {self.path}: {str(e)}")
+            return None
+        return state
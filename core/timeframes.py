@@ -0,0 +1,73 @@
+import logging
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from core.candle_store import TIMEFRAME_MS, resample
+from core.records import TimeframeBias
+from core.signal_engine import SignalEngine
+
+logger = logging.getLogger(__name__)
+
+
+class TimeframeConfluence:
+    """Higher-timeframe bias built from the base timeframe's candles.
+
+    Higher timeframes are resampled locally instead of fetched, and each
+    timeframe is only re-analyzed when one of its own candles closes; until
+    then the cached result is returned. Only whole buckets are used, and a
+    timeframe gives no bias until the base history covers
+    `settings.MTF_MIN_CANDLES` of its candles: with fewer, the long EMAs
+    are still NaN and every comparison against them votes bearish.
+    """
+
+    def __init__(self, signal_engine: SignalEngine, timeframes: Optional[List[str]] = None):
+        self.signals = signal_engine
+        timeframes = timeframes or settings.TIMEFRAMES
+        self.base = timeframes[0]
+        self.higher = timeframes[1:]
+        for timeframe in self.higher:
+            candles = settings.CANDLE_CAPACITY * TIMEFRAME_MS[self.base] // TIMEFRAME_MS[timeframe]
+            if candles < settings.MTF_MIN_CANDLES:
+                logger.warning(f"{timeframe} never gets {settings.MTF_MIN_CANDLES} candles out of "
+                               f"{settings.CANDLE_CAPACITY} {self.base} candles and is ignored")
+        self.cache: Dict[Hashable, Tuple[int, TimeframeBias]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def analyze(self, symbol: str, ohlc: Dict[str, np.ndarray]) -> Dict[str, TimeframeBias]:
+        """Bias per higher timeframe, computed on closed higher-timeframe candles only."""
+        if not len(ohlc['close']):
+            return {}
+        result = {}
+        for timeframe in self.higher:
+            candles = resample(ohlc, timeframe)
+            # the newest bucket contains the forming base candle, so it is still open;
+            # the oldest one is partial unless the history starts on its boundary
+            first = 1 if ohlc['timestamp'][0] != candles['timestamp'][0] else 0
+            closed = {k: v[first:-1] for k, v in candles.items()}
+            if len(closed['close']) < settings.MTF_MIN_CANDLES:
+                continue
+
+            key = (symbol, timeframe)
+            last_closed = int(closed['timestamp'][-1])
+            cached = self.cache.get(key)
+            if cached is not None and cached[0] == last_closed:
+                self.hits += 1
+                result[timeframe] = cached[1]
+                continue
+
+            self.misses += 1
+            analysis = self.signals.analyze(symbol, closed, live=False, timeframe=timeframe)
+            bullish, strength, _ = self.signals.score(analysis)
+            summary = TimeframeBias(
+                timeframe=timeframe,
+                bullish=bool(bullish),
+                strength=strength,
+                candle_time=last_closed,
+                indicators=analysis.indicators
+            )
+            self.cache[key] = (last_closed, summary)
+            result[timeframe] = summary
+        return result
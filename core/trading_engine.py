@@ -2,13 +2,13 @@ import asyncio
 from datetime import datetime
 from typing import Dict, Any
 from core.pattern_detector import PatternDetector
-from core.risk_manager import RiskManager
+from core.risk_engine import RiskEngine
 
 class TradingEngine:
     def __init__(self, exchange, notifier, risk_params):
         self.exchange = exchange
         self.notifier = notifier
-        self.risk_manager = RiskManager(risk_params)
+        self.risk_engine = RiskEngine(risk_params)
         self.pattern_detector = PatternDetector()
         
     async def analyze_market(self, symbol: str):
@@ -31,9 +31,10 @@ class TradingEngine:
     
     async def generate_signal(self, symbol: str, analysis: Dict[str, Any]):
         # Risk calculation
-        risk_data = self.risk_manager.calculate_position(
+        risk_data = self.risk_engine.calculate_position(
             analysis['indicators']['atr'],
-            analysis['price_action']['key_levels']
+            analysis['price_action']['key_levels'],
+            direction=1 if analysis['bullish'] else -1
         )
         
         # Prepare signal
@@ -0,0 +1,179 @@
+import logging
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from core.candle_store import CandleStore
+from core.metrics import metrics
+from core.scanner import SymbolHandler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Tier:
+    name: str
+    share: float  # cumulative fraction of the ranked universe up to this tier
+    every: int  # scanned once every `every` cycles
+    symbols: List[str] = field(default_factory=list)
+    # last cycle
+    scanned: int = 0
+    seconds: float = 0.0
+
+    @property
+    def requests_per_cycle(self) -> float:
+        return len(self.symbols) / self.every
+
+
+class UniverseManager:
+    """Cached symbol list with liquidity/volatility tiers and per-cycle scheduling.
+
+    Symbols are ranked on the candles already held in the CandleStore: the
+    percentile of their average quote volume and of their return volatility
+    over `window` candles, blended by `volatility_weight`. The best ranked
+    fill the first tier, which is scanned every cycle; lower tiers are
+    scanned every N cycles, staggered by symbol so their load spreads
+    evenly. Symbols without candles yet go to the first tier so they get
+    ranked. With `max_per_cycle`, at most that many symbols are due per
+    cycle (most overdue, then best ranked first); the rest wait for the
+    next cycle.
+    """
+
+    def __init__(
+        self,
+        exchange,
+        candles: CandleStore,
+        timeframe: str = '1h',
+        ttl: Optional[float] = None,
+        tiers: Optional[List[Tuple[str, float, int]]] = None,
+        window: Optional[int] = None,
+        volatility_weight: Optional[float] = None,
+        max_per_cycle: Optional[int] = None
+    ):
+        self.exchange = exchange
+        self.candles = candles
+        self.timeframe = timeframe
+        self.ttl = settings.UNIVERSE_TTL if ttl is None else ttl
+        self.tiers = [Tier(name, share, every) for name, share, every in (tiers or settings.UNIVERSE_TIERS)]
+        self.window = window or settings.UNIVERSE_WINDOW
+        self.volatility_weight = (settings.UNIVERSE_VOLATILITY_WEIGHT
+                                  if volatility_weight is None else volatility_weight)
+        self.max_per_cycle = settings.UNIVERSE_MAX_PER_CYCLE if max_per_cycle is None else max_per_cycle
+
+        self.all: List[str] = []
+        self.fetched_at: Optional[float] = None
+        self.scores: Dict[str, float] = {}
+        self.tier_of: Dict[str, Tier] = {}
+        self.last_scan: Dict[str, int] = {}
+        self.cycle = 0
+
+    async def symbols(self) -> List[str]:
+        """All tradable symbols, refetched once the TTL has passed."""
+        if self.fetched_at is None or time.monotonic() - self.fetched_at > self.ttl:
+            try:
+                self.all = list(await self.exchange.get_all_symbols())
+                self.fetched_at = time.monotonic()
+            except Exception as e:
+                if not self.all:
+                    raise
+                logger.warning(f"Symbol list refresh failed, keeping {len(self.all)} cached: {str(e)}")
+        return self.all
+
+    def rank(self, symbols: List[str]) -> Dict[str, float]:
+        """Score in [0, 1] per symbol with candles, 1 being the most liquid/volatile."""
+        present, matrix = self.candles.matrix(symbols, self.timeframe, self.window + 1)
+        if not present:
+            return {}
+        close, volume = matrix['close'], matrix['volume']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            turnover = np.nanmean(close[:, 1:] * volume[:, 1:], axis=1)
+            volatility = np.nanstd(np.diff(np.log(close), axis=1), axis=1)
+        turnover = np.nan_to_num(turnover, nan=0.0)
+        volatility = np.nan_to_num(volatility, nan=0.0)
+
+        def percentile(values: np.ndarray) -> np.ndarray:
+            if len(values) < 2:
+                return np.ones(len(values))
+            return values.argsort(kind='stable').argsort() / (len(values) - 1)
+
+        w = self.volatility_weight
+        score = (1 - w) * percentile(turnover) + w * percentile(volatility)
+        return dict(zip(present, score.tolist()))
+
+    def assign(self, symbols: List[str]):
+        """Re-rank `symbols` and rebuild tier membership."""
+        self.scores = self.rank(symbols)
+        ranked = sorted(self.scores, key=self.scores.get, reverse=True)
+        unranked = [s for s in symbols if s not in self.scores]
+        for tier in self.tiers:
+            tier.symbols = []
+        start = 0
+        for i, tier in enumerate(self.tiers):
+            end = len(ranked) if i == len(self.tiers) - 1 else int(round(tier.share * len(ranked)))
+            tier.symbols = ranked[start:end]
+            start = max(start, end)
+        self.tiers[0].symbols = unranked + self.tiers[0].symbols
+        self.tier_of = {s: tier for tier in self.tiers for s in tier.symbols}
+
+    def due(self, symbols: List[str]) -> List[str]:
+        """Advance one cycle and return the symbols to scan in it."""
+        self.cycle += 1
+        self.assign(symbols)
+        due = []
+        for tier in self.tiers:
+            for symbol in tier.symbols:
+                if symbol not in self.scores or tier.every == 1:
+                    due.append(symbol)
+                    continue
+                # slow tiers scan each symbol in its own phase of the period, so the load spreads
+                waited = self.cycle - self.last_scan.get(symbol, -tier.every)
+                in_phase = (self.cycle + zlib.crc32(symbol.encode())) % tier.every == 0
+                if (waited >= tier.every and in_phase) or waited >= 2 * tier.every:
+                    due.append(symbol)
+        if self.max_per_cycle and len(due) > self.max_per_cycle:
+            due.sort(key=lambda s: (
+                -(self.cycle - self.last_scan.get(s, self.cycle - self.tier_of[s].every)) / self.tier_of[s].every,
+                -self.scores.get(s, 1.0)))
+            due = due[:self.max_per_cycle]
+        for tier in self.tiers:
+            tier.scanned, tier.seconds = 0, 0.0
+        for symbol in due:
+            self.last_scan[symbol] = self.cycle
+        return due
+
+    def timed(self, handler: SymbolHandler) -> SymbolHandler:
+        """Wrap a per-symbol handler to account its time to the symbol's tier."""
+        async def run(symbol: str):
+            started = time.perf_counter()
+            try:
+                return await handler(symbol)
+            finally:
+                seconds = time.perf_counter() - started
+                tier = self.tier_of.get(symbol)
+                if tier is not None:
+                    tier.scanned += 1
+                    tier.seconds += seconds
+                    metrics.observe('tier_symbol_seconds', seconds, tier=tier.name)
+        return run
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """Tier membership and timing of the last cycle."""
+        return {
+            tier.name: {
+                'symbols': len(tier.symbols),
+                'every': tier.every,
+                'requests_per_cycle': tier.requests_per_cycle,
+                'scanned': tier.scanned,
+                'seconds': tier.seconds
+            }
+            for tier in self.tiers
+        }
+
+    def summary(self) -> str:
+        return ' | '.join(
+            f"{tier.name} {len(tier.symbols)} /{tier.every} cycles, {tier.scanned} scanned in {tier.seconds:.1f}s"
+            for tier in self.tiers)
@@ -1,21 +1,205 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+
 import aiohttp
-from typing import Dict, Any, List
+
+from config import settings
+from core.metrics import metrics
+from integrations.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class LatencyStats:
+    """Rolling latency samples of one endpoint."""
+
+    def __init__(self, window: int = 1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'retries': self.retries,
+            'p50': self.percentile(0.50),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99)
+        }
+
 
 class ElbankClient:
-    def __init__(self, api_key: str, api_secret: str):
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        base_url: Optional[str] = None,
+        pool_size: Optional[int] = None,
+        weight_limit: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        timeout: float = 10.0
+    ):
         self.api_key = api_key
         self.api_secret = api_secret
-        self.base_url = "https://api.elbank.com/v1"
-        
-    async def get_ohlc(self, symbol: str, timeframe: str = '1h'):
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/market/ohlc?symbol={symbol}&timeframe={timeframe}"
-            async with session.get(url) as response:
-                return await response.json()
+        self.base_url = (base_url or settings.ELBANK_BASE_URL).rstrip('/')
+        self.pool_size = pool_size or settings.ELBANK_POOL_SIZE
+        self.max_retries = settings.ELBANK_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+
+        # Elbank limits are expressed as request weight per minute
+        weight_limit = weight_limit or settings.ELBANK_WEIGHT_LIMIT
+        self.limiter = TokenBucket(rate=weight_limit / 60.0, capacity=weight_limit)
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_lock = asyncio.Lock()
+        self.latency: Dict[str, LatencyStats] = {}
+        self.in_flight = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is not None and not self._session.closed:
+            return self._session
+        async with self._session_lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.pool_size,
+                    keepalive_timeout=settings.ELBANK_KEEPALIVE,
+                    ttl_dns_cache=300
+                )
+                trace = aiohttp.TraceConfig()
+                trace.on_connection_create_end.append(self._on_connection_created)
+                trace.on_connection_reuseconn.append(self._on_connection_reused)
+                self._session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=self.timeout,
+                    headers={'X-API-KEY': self.api_key},
+                    trace_configs=[trace]
+                )
+        return self._session
+
+    async def _on_connection_created(self, session, ctx, params):
+        self.connections_created += 1
+
+    async def _on_connection_reused(self, session, ctx, params):
+        self.connections_reused += 1
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        # Full jitter exponential backoff
+        return random.uniform(0, min(30.0, 0.5 * (2 ** attempt)))
+
+    async def request(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET an endpoint through the shared pool, rate limiter and retry policy."""
+        weight = settings.ELBANK_ENDPOINT_WEIGHTS.get(endpoint, 1)
+        stats = self.latency.setdefault(endpoint, LatencyStats())
+        url = f"{self.base_url}/{endpoint}"
+        session = await self._get_session()
+
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire(weight)
+            started = time.perf_counter()
+            self.in_flight += 1
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                        delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                        if response.status == 429:
+                            self.limiter.penalize(delay)
+                        logger.warning(
+                            f"{endpoint} returned {response.status}, retry in {delay:.2f}s")
+                        stats.retries += 1
+                        # read the error body so the connection goes back to the pool
+                        await response.read()
+                    else:
+                        response.raise_for_status()
+                        data = await response.json()
+                        stats.add(time.perf_counter() - started)
+                        metrics.observe('elbank_request_seconds', time.perf_counter() - started,
+                                        endpoint=endpoint)
+                        return data
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.max_retries:
+                    stats.errors += 1
+                    metrics.inc('elbank_request_errors_total', endpoint=endpoint)
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning(f"{endpoint} failed ({e!r}), retry in {delay:.2f}s")
+                stats.retries += 1
+            except aiohttp.ClientResponseError:
+                stats.errors += 1
+                metrics.inc('elbank_request_errors_total', endpoint=endpoint)
+                raise
+            finally:
+                self.in_flight -= 1
+            # back off outside the request: no connection or in-flight slot is held meanwhile
+            await asyncio.sleep(delay)
+
+    async def get_ohlc(
+        self,
+        symbol: str,
+        timeframe: str = '1h',
+        since: Optional[int] = None,
+        limit: Optional[int] = None
+    ):
+        params = {'symbol': symbol, 'timeframe': timeframe}
+        if since is not None:
+            params['since'] = since
+        if limit is not None:
+            params['limit'] = limit
+        return await self.request('market/ohlc', params)
                 
     async def get_all_symbols(self) -> List[str]:
-        async with aiohttp.ClientSession() as session:
-            url = f"{self.base_url}/market/symbols"
-            async with session.get(url) as response:
-                data = await response.json()
-                return data['symbols']
+        data = await self.request('market/symbols')
+        return data['symbols']
+
+    async def get_news(self, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        # Without a symbol: the general feed for all markets
+        data = await self.request('market/news', {'symbol': symbol} if symbol else None)
+        return data.get('news', []) if isinstance(data, dict) else data
+
+    def metrics(self) -> Dict[str, Any]:
+        """Connection pool and latency metrics."""
+        return {
+            'pool_size': self.pool_size,
+            'in_flight': self.in_flight,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+            'rate_limit_tokens': self.limiter.tokens,
+            'rate_limit_wait': self.limiter.total_wait,
+            'endpoints': {k: v.as_dict() for k, v in self.latency.items()}
+        }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+import numpy as np
+
+from config import settings
+from core.candle_store import CandleStore, TIMEFRAME_MS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class KlineEvent:
+    symbol: str
+    timeframe: str
+    timestamp: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    closed: bool
+    received: float  # time.monotonic() when the message arrived
+
+
+class ElbankStream:
+    """Live kline feed over a few multiplexed websocket connections.
+
+    Symbols are split into groups of `streams_per_connection`, each group
+    sharing one connection. Every kline is merged into the CandleStore and
+    published as a KlineEvent. After a reconnect, or when a kline shows a
+    gap, the missing candles are backfilled through REST from the last
+    stored candle; the symbol's klines are held until the backfill is done,
+    so the buffer never has holes and events are published in order.
+
+    The wire format is handled by `_subscribe_message` and `_parse_message`
+    only; adapt those two if the exchange changes it.
+    """
+
+    def __init__(
+        self,
+        exchange,
+        candles: CandleStore,
+        symbols: List[str],
+        timeframe: str = '1h',
+        url: Optional[str] = None,
+        streams_per_connection: Optional[int] = None
+    ):
+        self.exchange = exchange
+        self.candles = candles
+        self.symbols = list(symbols)
+        self.timeframe = timeframe
+        self.url = url or settings.ELBANK_WS_URL
+        self.streams_per_connection = streams_per_connection or settings.ELBANK_WS_STREAMS_PER_CONNECTION
+        self.events: asyncio.Queue = asyncio.Queue()
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks: List[asyncio.Task] = []
+        self._queued_updates: set = set()
+        # symbol -> running backfill, and the klines held until it finishes
+        self._backfilling: Dict[str, asyncio.Task] = {}
+        self._held: Dict[str, List[KlineEvent]] = {}
+        self.connections = 0
+        self.reconnects = 0
+        self.messages = 0
+        self.backfills = 0
+
+    # --- wire format ---
+
+    def _stream_name(self, symbol: str) -> str:
+        return f"{symbol.lower()}@kline_{self.timeframe}"
+
+    def _subscribe_message(self, symbols: List[str], request_id: int) -> Dict[str, Any]:
+        return {
+            'method': 'SUBSCRIBE',
+            'params': [self._stream_name(s) for s in symbols],
+            'id': request_id
+        }
+
+    def _parse_message(self, message: Dict[str, Any], symbols: Dict[str, str]) -> Optional[KlineEvent]:
+        data = message.get('data', message)
+        kline = data.get('k') if isinstance(data, dict) else None
+        if not kline:
+            return None
+        symbol = symbols.get(str(data.get('s', kline.get('s', ''))).lower())
+        if symbol is None:
+            return None
+        return KlineEvent(
+            symbol=symbol,
+            timeframe=self.timeframe,
+            timestamp=int(kline['t']),
+            open=float(kline['o']),
+            high=float(kline['h']),
+            low=float(kline['l']),
+            close=float(kline['c']),
+            volume=float(kline['v']),
+            closed=bool(kline['x']),
+            received=time.monotonic()
+        )
+
+    # --- lifecycle ---
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._session = aiohttp.ClientSession()
+        n = self.streams_per_connection
+        groups = [self.symbols[i:i + n] for i in range(0, len(self.symbols), n)]
+        self._tasks = [asyncio.create_task(self._connection(i, g)) for i, g in enumerate(groups)]
+
+    async def close(self):
+        tasks = self._tasks + list(self._backfilling.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._backfilling.clear()
+        self._held.clear()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def next_event(self) -> KlineEvent:
+        event = await self.events.get()
+        self._queued_updates.discard(event.symbol)
+        return event
+
+    # --- connections ---
+
+    async def _connection(self, index: int, symbols: List[str]):
+        lookup = {s.lower().replace('/', '').replace('-', '').replace('_', ''): s for s in symbols}
+        lookup.update({s.lower(): s for s in symbols})
+        attempt = 0
+        first = True
+        while True:
+            try:
+                async with self._session.ws_connect(self.url, heartbeat=settings.ELBANK_WS_HEARTBEAT) as ws:
+                    self.connections += 1
+                    await ws.send_json(self._subscribe_message(symbols, index + 1))
+                    if not first:
+                        self.reconnects += 1
+                        # candles may have closed while we were disconnected
+                        for symbol in symbols:
+                            self._start_backfill(symbol)
+                    first = False
+                    attempt = 0
+                    async for msg in ws:
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            self._on_message(msg.data, lookup)
+                        elif msg.type in (aiohttp.WSMsgType.ERROR, aiohttp.WSMsgType.CLOSED):
+                            break
+                logger.warning(f"Websocket connection {index} closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Websocket connection {index} failed: {str(e)}")
+            attempt += 1
+            first = False
+            await asyncio.sleep(min(60.0, 2 ** attempt) * random.uniform(0.5, 1.0))
+
+    def _on_message(self, raw: str, lookup: Dict[str, str]):
+        try:
+            event = self._parse_message(json.loads(raw), lookup)
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Bad websocket message: {str(e)}")
+            return
+        if event is None:
+            return
+        self.messages += 1
+
+        if event.symbol not in self._backfilling:
+            last = self.candles.buffer(event.symbol, event.timeframe).last_timestamp
+            if last is not None and event.timestamp - last > TIMEFRAME_MS[event.timeframe]:
+                # missed candles between the stored history and this one
+                self._start_backfill(event.symbol)
+        if event.symbol in self._backfilling:
+            self._held.setdefault(event.symbol, []).append(event)
+            return
+        self._apply(event)
+
+    def _apply(self, event: KlineEvent):
+        self.candles.merge(
+            event.symbol, event.timeframe,
+            np.array([event.timestamp], dtype=np.int64),
+            np.array([[event.open], [event.high], [event.low], [event.close], [event.volume]])
+        )
+
+        # Closed candles are always published; updates only if none is queued
+        if event.closed or event.symbol not in self._queued_updates:
+            if not event.closed:
+                self._queued_updates.add(event.symbol)
+            self.events.put_nowait(event)
+
+    def _start_backfill(self, symbol: str):
+        if symbol in self._backfilling:
+            return
+        # from the last candle stored before the gap; held klines are merged after it
+        since = self.candles.buffer(symbol, self.timeframe).last_timestamp
+        self._backfilling[symbol] = asyncio.create_task(self._backfill(symbol, since))
+
+    async def _backfill(self, symbol: str, since: Optional[int]):
+        try:
+            await self.candles.sync(symbol, self.timeframe, since=since)
+            self.backfills += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Backfill failed for {symbol}: {str(e)}")
+        finally:
+            self._backfilling.pop(symbol, None)
+        for event in self._held.pop(symbol, []):
+            self._apply(event)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'connections': self.connections,
+            'reconnects': self.reconnects,
+            'messages': self.messages,
+            'backfills': self.backfills,
+            'queued_events': self.events.qsize()
+        }
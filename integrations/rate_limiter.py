@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket limiter.
+
+    `rate` tokens are added per second up to `capacity`. Callers acquire a
+    weight (the cost of the request) and wait until enough tokens are
+    available; waiters are served in FIFO order.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = asyncio.Lock()
+        self.total_wait = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self._updated = now
+
+    async def acquire(self, weight: float = 1.0):
+        weight = min(weight, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                delay = max(0.0, self._blocked_until - now)
+                if not delay:
+                    if self.tokens >= weight:
+                        self.tokens -= weight
+                        return
+                    delay = (weight - self.tokens) / self.rate
+                self.total_wait += delay
+                await asyncio.sleep(delay)
+
+    def penalize(self, seconds: float):
+        """Block every caller for `seconds` (e.g. after a 429 with Retry-After)."""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0.0
+        self._blocked_until = max(self._blocked_until, now + seconds)
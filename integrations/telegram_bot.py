@@ -1,19 +1,289 @@
-import requests
-from typing import Dict, Any
+import asyncio
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+
+import aiohttp
+
+from config import settings
+from core.metrics import metrics
+from integrations.rate_limiter import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+
 
 class TelegramNotifier:
-    def __init__(self, bot_token: str):
-        self.base_url = f"https://api.telegram.org/bot{bot_token}"
-        
+    """Non-blocking Telegram sender.
+
+    `send_signal` only enqueues. A background worker delivers messages over
+    one pooled aiohttp session, respecting Telegram's per-chat limits, and
+    merges bursts of signals for the same chat into a digest message.
+    Undelivered messages are kept in a JSON file and re-queued on start, so
+    nothing is lost across restarts. The file is written in a thread, and
+    changes made while a write is running go into a single follow-up write.
+    Only rate limits, server errors and network failures are retried;
+    messages Telegram rejects (unknown chat, bot blocked, ...) are dropped.
+    """
+
+    def __init__(
+        self,
+        bot_token: str,
+        chat_id: Optional[str] = None,
+        base_url: Optional[str] = None,
+        retry_path: Optional[str] = None,
+        digest_threshold: Optional[int] = None,
+        digest_window: Optional[float] = None
+    ):
+        base_url = (base_url or settings.TELEGRAM_BASE_URL).rstrip('/')
+        self.base_url = f"{base_url}/bot{bot_token}"
+        self.chat_id = chat_id or '@trading_signals'
+        self.retry_path = retry_path if retry_path is not None else settings.TELEGRAM_RETRY_PATH
+        self.digest_threshold = digest_threshold or settings.TELEGRAM_DIGEST_THRESHOLD
+        self.digest_window = settings.TELEGRAM_DIGEST_WINDOW if digest_window is None else digest_window
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._saver: Optional[asyncio.Task] = None
+        self._dirty = False
+        # Telegram allows ~30 msg/s overall, 1 msg/s per chat and 20 msg/min per group
+        self._global_limit = TokenBucket(rate=30, capacity=30)
+        self._chat_limits: Dict[str, List[TokenBucket]] = {}
+        self.sent_messages = 0
+        self.sent_signals = 0
+        self.failures = 0
+        self.rejected = 0
+
+    # --- public API ---
+
+    async def start(self):
+        if self._worker is not None and not self._worker.done():
+            return
+        self._queue = asyncio.Queue()
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=8),
+                timeout=aiohttp.ClientTimeout(total=15)
+            )
+        for item_id in self._load_pending():
+            self._queue.put_nowait(item_id)
+        self._worker = asyncio.create_task(self._run())
+
     async def send_signal(self, signal: Dict[str, Any]):
-        message = self._format_signal(signal)
-        url = f"{self.base_url}/sendMessage"
-        params = {
-            'chat_id': signal.get('chat_id', '@trading_signals'),
-            'text': message,
-            'parse_mode': 'Markdown'
+        """Queue a signal for delivery and return immediately."""
+        await self.start()
+        item_id = uuid.uuid4().hex
+        self._pending[item_id] = {
+            'chat_id': signal.get('chat_id', self.chat_id),
+            'signal': signal,
+            'attempts': 0
+        }
+        self._save_soon()
+        self._queue.put_nowait(item_id)
+
+    async def flush(self, timeout: Optional[float] = None):
+        """Wait until every queued message, including scheduled retries, is delivered."""
+        async def drained():
+            while True:
+                await self._queue.join()
+                if not self._pending:
+                    return
+                await asyncio.sleep(0.1)
+
+        if self._queue is not None:
+            await asyncio.wait_for(drained(), timeout)
+
+    async def close(self, timeout: float = 10.0):
+        try:
+            await self.flush(timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{len(self._pending)} Telegram messages left in the retry buffer")
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        # the worker may have been stopped between a delivery and its save
+        self._save_soon()
+        if self._saver is not None:
+            await self._saver
+            self._saver = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            'queued': self._queue.qsize() if self._queue else 0,
+            'pending': len(self._pending),
+            'sent_messages': self.sent_messages,
+            'sent_signals': self.sent_signals,
+            'failures': self.failures,
+            'rejected': self.rejected
         }
-        requests.post(url, params=params)
+
+    # --- retry buffer ---
+
+    def _load_pending(self) -> List[str]:
+        if not self.retry_path or not os.path.exists(self.retry_path):
+            return []
+        try:
+            with open(self.retry_path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read Telegram retry buffer: {str(e)}")
+            return []
+        new = [k for k in stored if k not in self._pending]
+        self._pending.update(stored)
+        if new:
+            logger.info(f"Re-queued {len(new)} undelivered Telegram messages")
+        return new
+
+    def _save_soon(self):
+        if not self.retry_path:
+            return
+        self._dirty = True
+        if self._saver is None or self._saver.done():
+            self._saver = asyncio.create_task(self._save_pending())
+
+    async def _save_pending(self):
+        while self._dirty:
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self._write_pending, dict(self._pending))
+            except (OSError, TypeError, ValueError) as e:
+                logger.error(f"Could not write Telegram retry buffer: {str(e)}")
+
+    def _write_pending(self, pending: Dict[str, Dict[str, Any]]):
+        tmp = f"{self.retry_path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(pending, f, default=str)
+        os.replace(tmp, self.retry_path)
+
+    # --- worker ---
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Collect everything that arrives within the digest window
+            deadline = time.monotonic() + self.digest_window
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                by_chat = defaultdict(list)
+                for item_id in batch:
+                    if item_id in self._pending:
+                        by_chat[self._pending[item_id]['chat_id']].append(item_id)
+                for chat_id, ids in by_chat.items():
+                    await self._deliver(chat_id, ids)
+            except Exception as e:
+                logger.error(f"Telegram worker error: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _deliver(self, chat_id: str, ids: List[str]):
+        if len(ids) >= self.digest_threshold:
+            messages = self._format_digest([(i, self._pending[i]['signal']) for i in ids])
+        else:
+            messages = [(self._format_signal(self._pending[i]['signal']), [i]) for i in ids]
+
+        for text, group in messages:
+            sent = await self._send(chat_id, text)
+            if sent:
+                self.sent_messages += 1
+                self.sent_signals += len(group)
+            elif sent is None:
+                self.rejected += len(group)
+                metrics.inc('telegram_rejected_total', len(group))
+            else:
+                self.failures += 1
+                self._schedule_retry(group)
+                continue
+            for i in group:
+                self._pending.pop(i, None)
+        self._save_soon()
+
+    def _schedule_retry(self, ids: List[str]):
+        # One delay per failed message so a digest is retried as a digest
+        attempts = 0
+        for i in ids:
+            self._pending[i]['attempts'] += 1
+            attempts = max(attempts, self._pending[i]['attempts'])
+        delay = min(300.0, 2 ** attempts) * random.uniform(0.5, 1.0)
+        asyncio.get_running_loop().call_later(delay, self._requeue, ids)
+
+    def _requeue(self, ids: List[str]):
+        if self._queue is None:
+            return
+        for i in ids:
+            if i in self._pending:
+                self._queue.put_nowait(i)
+
+    def _limits(self, chat_id: str) -> List[TokenBucket]:
+        if chat_id not in self._chat_limits:
+            limits = [TokenBucket(rate=1, capacity=1)]
+            if str(chat_id).startswith(('@', '-')):
+                limits.append(TokenBucket(rate=20 / 60, capacity=20))
+            self._chat_limits[chat_id] = limits
+        return self._chat_limits[chat_id]
+
+    async def _send(self, chat_id: str, text: str, parse_mode: Optional[str] = 'Markdown') -> Optional[bool]:
+        """True when delivered, False when worth retrying, None when Telegram refused it for good."""
+        for limiter in self._limits(chat_id):
+            await limiter.acquire()
+        await self._global_limit.acquire()
+
+        payload = {'chat_id': chat_id, 'text': text}
+        if parse_mode:
+            payload['parse_mode'] = parse_mode
+        started = time.perf_counter()
+        try:
+            async with self._session.post(f"{self.base_url}/sendMessage", json=payload) as response:
+                metrics.observe('telegram_send_seconds', time.perf_counter() - started)
+                if response.status == 200:
+                    return True
+                try:
+                    body = await response.json(content_type=None)
+                except ValueError:
+                    body = {}
+                if response.status == 429:
+                    retry_after = body.get('parameters', {}).get('retry_after', 1)
+                    for limiter in self._limits(chat_id):
+                        limiter.penalize(retry_after)
+                    logger.warning(f"Telegram rate limit for {chat_id}, retry after {retry_after}s")
+                    return False
+                description = body.get('description')
+                if response.status == 400 and parse_mode and "can't parse entities" in str(description):
+                    # Markdown entity error: fall back to plain text
+                    return await self._send(chat_id, text, parse_mode=None)
+                logger.error(f"Telegram error {response.status}: {description}")
+                if response.status >= 500:
+                    return False
+                # any other 4xx (chat not found, bot blocked, ...) fails the same way every time
+                return None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Telegram request failed: {str(e)}")
+            return False
+
+    # --- formatting ---
         
     def _format_signal(self, signal: Dict[str, Any]) -> str:
         return (
@@ -24,5 +294,24 @@ class TelegramNotifier:
             f"• Leverage: {signal['leverage']}x\n"
             f"• Pattern: {signal['pattern']}\n"
             f"• Strength: {signal['strength']}/5\n"
-            f"• R/R: 1:{self.rr_ratio}"
+            f"• R/R: 1:{signal.get('rr_ratio', settings.RR_RATIO)}"
         )
+
+    def _format_digest(self, items: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, List[str]]]:
+        """Digest message(s) for many signals, split at Telegram's length limit."""
+        header = f"📣 *{len(items)} new signals*\n\n"
+        items = sorted(items, key=lambda item: item[1].get('strength', 0), reverse=True)
+        messages, text, group = [], header, []
+        for item_id, s in items:
+            line = (
+                f"• *{s['symbol']}* {s['position_type']} @ `{s['entry']}` | "
+                f"TP `{s['target1']} | {s['target2']}` | SL `{s['stop_loss']}` | "
+                f"{s['leverage']}x | {s['strength']}/5\n"
+            )
+            if group and len(text) + len(line) > MAX_MESSAGE_LENGTH:
+                messages.append((text, group))
+                text, group = '', []
+            text += line
+            group.append(item_id)
+        messages.append((text, group))
+        return messages
@@ -1,16 +1,33 @@
+import time
+
+# زمان بارگذاری ماژول‌ها برای گزارش راه‌اندازی
+IMPORT_STARTED = time.perf_counter()
+
 import asyncio
 import logging
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 from config import settings
+from core.candle_store import CandleStore
+from core.executor import AnalysisExecutor
+from core.metrics import MetricsServer, SamplingProfiler, metrics, monitor_loop_lag
+from core.news import NewsService
 from core.pattern_detector import PatternDetector
-from core.risk_manager import RiskManager
+from core.pipeline import PipelineReport, SignalPipeline
+from core.records import Analysis, AnalysisBatch, Signal
+from core.risk_engine import RiskEngine
+from core.scanner import SymbolScanner
+from core.signal_engine import SignalEngine
+from core.state import StateStore
+from core.timeframes import TimeframeConfluence
+from core.universe import UniverseManager
 from integrations.elbank_api import ElbankClient
 from integrations.telegram_bot import TelegramNotifier
-from strategies.harmonic import HarmonicPatterns
-from strategies.price_action import PriceActionAnalyzer
-from strategies.smart_money import SmartMoneyConcepts
+# آرشیو کندل، معاملات کاغذی و وب‌سوکت فقط در صورت فعال بودن و هنگام استفاده بارگذاری می‌شوند
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
 
 # تنظیمات لاگ‌گیری
 logging.basicConfig(
@@ -25,6 +42,7 @@ logger = logging.getLogger(__name__)
 
 class TradingBot:
     def __init__(self):
+        started = time.perf_counter()
         # Initialize components
         self.exchange = ElbankClient(
             api_key=settings.ELBANK_API_KEY,
@@ -34,20 +52,108 @@ class TradingBot:
             bot_token=settings.TELEGRAM_TOKEN,
             chat_id=settings.TELEGRAM_CHAT_ID
         )
-        self.risk_manager = RiskManager(
+        self.risk_engine = RiskEngine(
             risk_per_trade=settings.RISK_PER_TRADE,
             rr_ratio=settings.RR_RATIO
         )
         self.pattern_detector = PatternDetector()
+        self.signals = SignalEngine(self.pattern_detector, self.risk_engine)
+        self.timeframes = TimeframeConfluence(self.signals)
+        self.executor = AnalysisExecutor(self.signals, self.timeframes)
+        archive = None
+        if settings.CANDLE_ARCHIVE:
+            from core.candle_archive import CandleArchive
+            archive = CandleArchive()
+        self.candles = CandleStore(self.exchange, archive=archive)
+        self.scanner = SymbolScanner(
+            concurrency=settings.SCAN_CONCURRENCY,
+            timeout=settings.SYMBOL_TIMEOUT
+        )
+        # اخبار یک بار در هر بازه برای همه نمادها دریافت و امتیازدهی می‌شوند
+        self.news = NewsService([self.exchange.get_news])
+        # لیست نمادها با کش و سطح‌بندی بر اساس نقدشوندگی و نوسان
+        self.universe = UniverseManager(self.exchange, self.candles, timeframe=self.timeframes.base)
+        self.pipeline = SignalPipeline(self.candles, self.scanner, timeframe=self.timeframes.base)
+        # اجرای شبیه‌سازی شده سیگنال‌ها روی کندل‌های دریافتی
+        self.paper = None
+        if settings.PAPER_TRADING:
+            from core.paper_trader import PaperTrader
+            self.paper = PaperTrader()
+            self.paper.attach(self.candles, timeframe=self.timeframes.base)
         
         # آخرین سیگنال‌های ارسال شده
         self.last_signals: Dict[str, datetime] = {}
+        # سیگنال‌های این چرخه که هنوز اندازه‌گذاری و ارسال نشده‌اند
+        self.candidates: List[Signal] = []
+        # نتایج آخرین چرخه اسکن (به شکل ستونی در وضعیت ذخیره می‌شود)
+        self.last_results: Dict[str, Any] = {}
+        # وضعیت ذخیره شده برای راه‌اندازی مجدد و لاگ سیگنال‌های ارسال شده
+        self.state = StateStore() if settings.STATE_PATH else None
+        self.signal_log: deque = deque(maxlen=settings.STATE_SIGNAL_LOG)
+
+        # مانیتورینگ
+        self.metrics_server = MetricsServer() if settings.METRICS_PORT else None
+        self._background = set()
+        metrics.add_collector(self._collect_metrics)
 
-    async def get_market_data(self, symbol: str) -> Optional[Dict[str, Any]]:
+        # مدت هر مرحله راه‌اندازی تا پایان اولین چرخه (ثانیه)
+        self.startup: Dict[str, float] = {
+            'imports': IMPORT_SECONDS,
+            'init': time.perf_counter() - started
+        }
+
+    def _collect_metrics(self) -> Dict[str, float]:
+        exchange = self.exchange.metrics()
+        notifier = self.notifier.metrics()
+        gauges = {f'tier_{name}_symbols': tier['symbols'] for name, tier in self.universe.report().items()}
+        if self.paper:
+            gauges.update({f'paper_{k}': float(v) for k, v in self.paper.metrics().items()})
+        return {
+            **gauges,
+            'elbank_in_flight': exchange['in_flight'],
+            'elbank_connections_created': exchange['connections_created'],
+            'elbank_connections_reused': exchange['connections_reused'],
+            'elbank_rate_limit_wait_seconds': exchange['rate_limit_wait'],
+            'telegram_queued': notifier['queued'],
+            'telegram_pending': notifier['pending'],
+            'telegram_sent_messages': notifier['sent_messages'],
+            'telegram_failures': notifier['failures'],
+            'candles_fetched': self.candles.candles_fetched,
+            'analysis_chunks': self.executor.chunks_sent,
+            'news_articles': self.news.metrics()['articles'],
+            **{f'startup_{phase}_seconds': seconds for phase, seconds in self.startup.items()}
+        }
+
+    async def _log_metrics(self):
+        while True:
+            await asyncio.sleep(settings.METRICS_LOG_INTERVAL)
+            logger.info(f"Metrics: {metrics.summary()}")
+
+    async def start_monitoring(self):
+        """راه‌اندازی endpoint متریک‌ها، پایش تاخیر حلقه و لاگ دوره‌ای"""
+        if self.metrics_server:
+            try:
+                await self.metrics_server.start()
+            except OSError as e:
+                logger.error(f"Metrics endpoint disabled: {str(e)}")
+                self.metrics_server = None
+        for job in (monitor_loop_lag(), self._log_metrics()):
+            task = asyncio.create_task(job)
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+
+    async def get_market_data(self, symbol: str, refresh: bool = True) -> Optional[Dict[str, Any]]:
         """دریافت داده‌های بازار برای یک نماد خاص"""
         try:
-            ohlc = await self.exchange.get_ohlc(symbol, timeframe='1h')
-            news = await self.exchange.get_news(symbol)
+            if refresh:
+                ohlc = await self.candles.sync(symbol, timeframe=self.timeframes.base)
+            else:
+                # کندل‌ها از وب‌سوکت به‌روز شده‌اند
+                ohlc = self.candles.get(symbol, timeframe=self.timeframes.base)
+                if ohlc is None:
+                    return None
+            # احساسات خبری از کش سرویس اخبار
+            news = self.news.sentiment(symbol) if settings.MODULES['news'] else None
             return {
                 'ohlc': ohlc,
                 'news': news,
@@ -58,42 +164,19 @@ class TradingBot:
             logger.error(f"Error getting data for {symbol}: {str(e)}")
             return None
 
-    async def analyze_symbol(self, symbol: str) -> Optional[Dict[str, Any]]:
+    async def analyze_symbol(self, symbol: str, refresh: bool = True) -> Optional[Analysis]:
         """آنالیز کامل یک نماد"""
-        market_data = await self.get_market_data(symbol)
+        market_data = await self.get_market_data(symbol, refresh=refresh)
         if not market_data:
             return None
 
-        analysis = {
-            'symbol': symbol,
-            'timestamp': market_data['timestamp'],
-            'harmonic': {},
-            'price_action': {},
-            'smart_money': {},
-            'indicators': {},
-            'news_sentiment': None
-        }
-
-        # تحلیل هارمونیک
-        if settings.MODULES['harmonic']:
-            analysis['harmonic'] = HarmonicPatterns.detect_all(market_data['ohlc'])
-
-        # تحلیل پرایس اکشن
-        if settings.MODULES['price_action']:
-            analysis['price_action'] = PriceActionAnalyzer.analyze_candles(market_data['ohlc'])
-
-        # تحلیل اسمارت مانی
-        if settings.MODULES['smart_money']:
-            analysis['smart_money'] = SmartMoneyConcepts.analyze(market_data['ohlc'])
-
-        # محاسبه اندیکاتورها
-        analysis['indicators'] = self.pattern_detector.calculate_indicators(market_data['ohlc'])
-
-        # تحلیل اخبار
-        if settings.MODULES['news']:
-            analysis['news_sentiment'] = self.pattern_detector.analyze_news_sentiment(market_data['news'])
-
-        return analysis
+        # آنالیز کامل و هم‌جهتی تایم‌فریم‌های بالاتر در پروسس جداگانه
+        return await self.executor.analyze(
+            symbol,
+            market_data['ohlc'],
+            timestamp=market_data['timestamp'],
+            news=market_data['news']
+        )
 
     def should_send_signal(self, symbol: str) -> bool:
         """بررسی آیا باید برای این نماد سیگنال ارسال کرد یا نه"""
@@ -104,178 +187,256 @@ class TradingBot:
         # حداقل 4 ساعت از آخرین سیگنال گذشته باشد
         return datetime.utcnow() - last_signal_time > timedelta(hours=4)
 
-    async def generate_signal(self, analysis: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    async def generate_signal(self, analysis: Analysis) -> Optional[Signal]:
         """تولید سیگنال معاملاتی بر اساس تحلیل"""
-        if not self.should_send_signal(analysis['symbol']):
+        if not self.should_send_signal(analysis.symbol):
             return None
 
-        # محاسبه نقاط ورود و خروج
-        risk_data = self.risk_manager.calculate_position(
-            atr=analysis['indicators']['atr'],
-            current_price=analysis['ohlc']['close'][-1],
-            key_levels=analysis['price_action'].get('key_levels', {})
-        )
+        with metrics.timer('signal_build_seconds'):
+            return self.signals.build_signal(analysis)
 
-        # تعیین جهت معامله
-        is_bullish = self._determine_trend_direction(analysis)
-        
-        signal = {
-            'symbol': analysis['symbol'],
-            'position_type': 'BUY' if is_bullish else 'SELL',
-            'entry': risk_data['entry'],
-            'target1': risk_data['target1'],
-            'target2': risk_data['target2'],
-            'stop_loss': risk_data['stop_loss'],
-            'leverage': risk_data['leverage'],
-            'pattern': self._get_strongest_pattern(analysis),
-            'rr_ratio': settings.RR_RATIO,
-            'strength': self._calculate_signal_strength(analysis),
-            'timestamp': datetime.utcnow().isoformat(),
-            'analysis_summary': self._generate_analysis_summary(analysis)
+    async def process_symbol(self, symbol: str, refresh: bool = True) -> Optional[Analysis]:
+        """آنالیز یک نماد و ارسال سیگنال در صورت نیاز"""
+        analysis = await self.analyze_symbol(symbol, refresh=refresh)
+        if not analysis:
+            return None
+            
+        signal = await self.generate_signal(analysis)
+        if signal:
+            self.candidates.append(signal)
+            
+        return analysis
+
+    async def dispatch_signals(self) -> int:
+        """اندازه‌گذاری همه سیگنال‌های کاندید با هم و ارسال به ترتیب امتیاز"""
+        signals, self.candidates = self.candidates, []
+        if not signals:
+            return 0
+
+        # سرمایه و ریسک پوزیشن‌های باز از معاملات کاغذی
+        equity = self.paper.equity if self.paper else settings.ACCOUNT_EQUITY
+        book_risk = self.paper.risk_by_symbol() if self.paper else {}
+        book_notional = self.paper.gross_notional if self.paper else 0.0
+        symbols = list(dict.fromkeys([s.symbol for s in signals] + list(book_risk)))
+        present, matrix = self.candles.matrix(symbols, self.timeframes.base, settings.RISK_CORRELATION_WINDOW + 1)
+        orders = self.risk_engine.size(signals, equity, book_risk=book_risk, book_notional=book_notional,
+                                       symbols=present, closes=matrix['close'])
+
+        sent = 0
+        for order in orders:
+            signal = order.signal
+            if order.reason:
+                logger.info(f"Signal for {signal.symbol} skipped: {order.reason}")
+                continue
+            await self.notifier.send_signal(order.to_dict())
+            self.last_signals[signal.symbol] = datetime.utcnow()
+            self.signal_log.append(dict(order.to_dict(), sent_at=self.last_signals[signal.symbol].isoformat()))
+            logger.info(f"Signal sent for {signal.symbol} (score {order.score:.2f}, size x{order.scale:.2f})")
+            if self.paper:
+                candles = self.candles.get(signal.symbol, timeframe=self.timeframes.base)
+                self.paper.open(signal, candle_time=int(candles['timestamp'][-1]), quantity=order.quantity)
+            sent += 1
+        return sent
+
+    async def _analyze_candidate(self, symbol: str) -> Optional[Analysis]:
+        # کندل‌ها در مرحله fetch خط لوله همگام شده‌اند
+        return await self.process_symbol(symbol, refresh=False)
+
+    async def _sync_candles(self, symbol: str):
+        return await self.candles.sync(symbol, timeframe=self.timeframes.base)
+
+    async def save_state(self):
+        """ذخیره اتمیک وضعیت ربات (سرد شدن سیگنال‌ها، کندل‌ها، وضعیت اندیکاتورها و لاگ سیگنال‌ها)"""
+        if not self.state:
+            return
+        started = time.perf_counter()
+        snapshot = {
+            'last_signals': dict(self.last_signals),
+            'signal_log': list(self.signal_log),
+            'candles': self.candles.snapshot(),
+            'engines': await self.executor.export_state(),
+            'paper': self.paper.snapshot() if self.paper else None,
+            'last_cycle': self._last_cycle()
         }
+        # سریال‌سازی در حلقه رویداد، نوشتن روی دیسک در thread جداگانه
+        data = self.state.dumps(snapshot)
+        await asyncio.to_thread(self.state.write, data)
+        metrics.observe('state_snapshot_seconds', time.perf_counter() - started)
 
-        return signal
+    def _last_cycle(self) -> Dict[str, Any]:
+        """نتایج آخرین چرخه به شکل ستونی: یک آرایه برای هر فیلد"""
+        batch = AnalysisBatch.from_records(self.last_results.values())
+        return {'symbols': batch.symbols, 'columns': batch.columns}
+
+    async def restore_state(self):
+        """بازیابی آخرین وضعیت ذخیره شده هنگام راه‌اندازی"""
+        snapshot = self.state.load() if self.state else None
+        if not snapshot:
+            return
+        started = time.perf_counter()
+        self.last_signals.update(snapshot['last_signals'])
+        self.signal_log.extend(snapshot['signal_log'])
+        self.candles.restore(snapshot['candles'])
+        await self.executor.import_state(snapshot['engines'])
+        if self.paper and snapshot.get('paper'):
+            self.paper.restore(snapshot['paper'])
+        logger.info(f"Restored state saved {time.time() - snapshot['saved_at']:.0f}s ago: "
+                    f"{len(snapshot['candles'])} candle buffers, {len(self.last_signals)} cooldowns "
+                    f"in {time.perf_counter() - started:.2f}s")
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(settings.STATE_SNAPSHOT_INTERVAL)
+            try:
+                await self.save_state()
+            except Exception as e:
+                logger.error(f"State snapshot failed: {str(e)}")
+
+    async def close(self):
+        """بستن اتصال‌های باز"""
+        for task in list(self._background):
+            task.cancel()
+        try:
+            await self.save_state()
+        except Exception as e:
+            logger.error(f"State snapshot failed: {str(e)}")
+        if self.metrics_server:
+            await self.metrics_server.close()
+        await self.executor.close()
+        await self.notifier.close()
+        await self.candles.close()
+        await self.exchange.close()
+
+    def startup_report(self) -> str:
+        phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self.startup.items())
+        return f"{phases} (total {sum(self.startup.values()):.2f}s)"
 
     async def run(self):
         """حلقه اصلی اجرای ربات"""
         logger.info("Starting Advanced Trading Bot...")
+        started = time.perf_counter()
+        await self.start_monitoring()
+        try:
+            await self.restore_state()
+        except Exception as e:
+            logger.error(f"State restore failed, starting cold: {str(e)}")
+        self.startup['restore'] = time.perf_counter() - started
+        if self.state:
+            task = asyncio.create_task(self._snapshot_loop())
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        if settings.STREAMING:
+            await self.run_streaming()
+            return
         
+        profile_path = settings.PROFILE_CYCLE_PATH
         while True:
             try:
-                symbols = await self.exchange.get_all_symbols()
-                logger.info(f"Analyzing {len(symbols)} symbols...")
+                started = time.perf_counter()
+                report = await self.run_cycle(profile_path)
+                profile_path = ''
+                if 'first_cycle' not in self.startup:
+                    self.startup['first_cycle'] = time.perf_counter() - started
+                    logger.info(f"Startup: {self.startup_report()}")
                 
-                for symbol in symbols:
-                    try:
-                        analysis = await self.analyze_symbol(symbol)
-                        if not analysis:
-                            continue
-                            
-                        signal = await self.generate_signal(analysis)
-                        if signal:
-                            await self.notifier.send_signal(signal)
-                            self.last_signals[signal['symbol']] = datetime.utcnow()
-                            logger.info(f"Signal sent for {signal['symbol']}")
-                            
-                    except Exception as e:
-                        logger.error(f"Error processing {symbol}: {str(e)}")
-                        continue
-                        
-                await asyncio.sleep(60)  # استراحت 1 دقیقه‌ای بین هر چرخه
+                # استراحت تا شروع چرخه بعدی
+                await asyncio.sleep(max(0, settings.SCAN_INTERVAL - report.wall_time))
                 
             except Exception as e:
                 logger.error(f"Main loop error: {str(e)}")
                 await asyncio.sleep(300)  # در صورت خطا 5 دقیقه صبر کنید
 
-    # --- متدهای کمکی ---
-    def _determine_trend_direction(self, analysis: Dict[str, Any]) -> bool:
-        """تعیین جهت کلی بازار بر اساس تحلیل‌ها"""
-        # 1. بررسی اندیکاتورها
-        indicators_bullish = (
-            analysis['indicators']['rsi'] > 50 and
-            analysis['indicators']['macd'] > 0 and
-            analysis['indicators']['ema50'] > analysis['indicators']['ema200']
-        )
-        
-        # 2. بررسی پرایس اکشن
-        price_action_bullish = (
-            analysis['price_action'].get('pinbar', False) or
-            analysis['price_action'].get('engulfing', False)
-        )
-        
-        # 3. بررسی هارمونیک
-        harmonic_bullish = any(
-            p['detected'] and p['pattern_type'] == 'bullish'
-            for p in analysis['harmonic'].values()
-        )
-        
-        # 4. بررسی اسمارت مانی
-        smart_money_bullish = (
-            analysis['smart_money'].get('order_blocks', {}).get('bullish_ob', False)
-        )
+    async def run_cycle(self, profile_path: str = ''):
+        """یک چرخه کامل اسکن: نمادها، اخبار، آنالیز و ارسال سیگنال‌ها"""
+        # لیست نمادها از کش و فقط نمادهای سررسید شده در این چرخه
+        symbols = await self.universe.symbols()
+        if settings.MODULES['news']:
+            self.news.set_symbols(symbols)
+            await self.news.refresh()
+        due = self.universe.due(symbols)
+        logger.info(f"Analyzing {len(due)} of {len(symbols)} symbols...")
         
-        return (indicators_bullish + price_action_bullish + 
-                harmonic_bullish + smart_money_bullish) >= 2
+        # پروفایل نمونه‌برداری فقط برای یک چرخه
+        profiler = SamplingProfiler() if profile_path else None
+        if profiler:
+            profiler.start()
+        try:
+            if settings.PREFILTER:
+                # فیلتر سریع برداری و سپس آنالیز کامل فقط برای کاندیدها
+                report = await self.pipeline.run(due, self.last_signals,
+                                                 self.universe.timed(self._analyze_candidate))
+                if self.paper:
+                    # نمادهای در حال استراحت هم برای به‌روزرسانی پوزیشن‌های کاغذی همگام می‌شوند
+                    await self.scanner.scan(self.paper.open_symbols(), self._sync_candles)
+            else:
+                report = await self.scanner.scan(due, self.universe.timed(self.process_symbol))
+        finally:
+            if profiler:
+                profiler.stop()
+                profiler.write(profile_path)
+        sent = await self.dispatch_signals()
+        if isinstance(report, PipelineReport):
+            report.signals = sent
+        metrics.observe('cycle_seconds', report.wall_time)
+        logger.info(f"Cycle finished: {report.summary()}")
+        logger.info(f"Tiers: {self.universe.summary()}")
+        self.last_results = report.results
+        return report
 
-    def _get_strongest_pattern(self, analysis: Dict[str, Any]) -> str:
-        """شناسایی قوی‌ترین الگوی تشخیص داده شده"""
-        patterns = []
-        
-        # الگوهای هارمونیک
-        for name, pattern in analysis['harmonic'].items():
-            if pattern['detected']:
-                patterns.append((f"Harmonic {name}", pattern['confidence']))
-        
-        # الگوهای پرایس اکشن
-        if analysis['price_action'].get('pinbar'):
-            patterns.append(("Pin Bar", 0.8))
-        if analysis['price_action'].get('engulfing'):
-            patterns.append(("Engulfing", 0.7))
-            
-        # اوردر بلاک‌ها
-        if analysis['smart_money'].get('order_blocks', {}).get('bullish_ob'):
-            patterns.append(("Bullish OB", 0.9))
-        elif analysis['smart_money'].get('order_blocks', {}).get('bearish_ob'):
-            patterns.append(("Bearish OB", 0.9))
-            
-        if not patterns:
-            return "Multiple Indicators"
-            
-        return max(patterns, key=lambda x: x[1])[0]
+    async def run_streaming(self):
+        """اجرای ربات با کندل‌های زنده وب‌سوکت به جای چرخه‌های دوره‌ای"""
+        started = time.perf_counter()
+        symbols = await self.universe.symbols()
+        logger.info(f"Warming up {len(symbols)} symbols...")
+        if settings.MODULES['news']:
+            self.news.set_symbols(symbols)
+            await self.news.refresh()
+            task = asyncio.create_task(self.news.run())
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        report = await self.scanner.scan(symbols, self.process_symbol)
+        await self.dispatch_signals()
+        logger.info(f"Warm-up finished: {report.summary()}")
+        self.startup['first_cycle'] = time.perf_counter() - started
+        logger.info(f"Startup: {self.startup_report()}")
 
-    def _calculate_signal_strength(self, analysis: Dict[str, Any]) -> int:
-        """محاسبه قدرت سیگنال از 1 تا 5"""
-        strength = 0
-        
-        # امتیاز اندیکاتورها
-        if analysis['indicators']['rsi'] > 60 or analysis['indicators']['rsi'] < 40:
-            strength += 1
-        if analysis['indicators']['macd'] > 0:
-            strength += 1
-        if analysis['indicators']['adx'] > 25:
-            strength += 1
-            
-        # امتیاز الگوها
-        if analysis['harmonic']:
-            strength += 2
-        if analysis['price_action'].get('pinbar') or analysis['price_action'].get('engulfing'):
-            strength += 1
-        if analysis['smart_money'].get('order_blocks'):
-            strength += 1
-            
-        return min(5, max(1, strength))
+        from integrations.elbank_ws import ElbankStream
+        stream = ElbankStream(self.exchange, self.candles, symbols, timeframe=self.timeframes.base)
+        await stream.start()
+        limit = asyncio.Semaphore(settings.SCAN_CONCURRENCY)
+        last_update: Dict[str, float] = {}
+        tasks = set()
+        try:
+            while True:
+                event = await stream.next_event()
+                # کندل بسته شده فوراً، کندل در حال تشکیل حداکثر یک بار در هر STREAM_UPDATE_INTERVAL
+                now = time.monotonic()
+                if not event.closed and now - last_update.get(event.symbol, 0) < settings.STREAM_UPDATE_INTERVAL:
+                    continue
+                last_update[event.symbol] = now
+                task = asyncio.create_task(self._process_event(event.symbol, limit))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        finally:
+            await stream.close()
 
-    def _generate_analysis_summary(self, analysis: Dict[str, Any]) -> str:
-        """تولید خلاصه تحلیل برای گزارش"""
-        summary = []
-        
-        if analysis['harmonic']:
-            summary.append(f"📊 Harmonic Patterns: {', '.join(analysis['harmonic'].keys())}")
-        
-        if analysis['price_action']:
-            pa = analysis['price_action']
-            pa_items = []
-            if pa.get('pinbar'): pa_items.append("Pin Bar")
-            if pa.get('engulfing'): pa_items.append("Engulfing")
-            if pa_items:
-                summary.append(f"🕯️ Price Action: {', '.join(pa_items)}")
-        
-        if analysis['smart_money'].get('order_blocks'):
-            sm = analysis['smart_money']
-            if sm['order_blocks'].get('bullish_ob'):
-                summary.append("💰 Smart Money: Bullish OB")
-            elif sm['order_blocks'].get('bearish_ob'):
-                summary.append("💰 Smart Money: Bearish OB")
-        
-        if analysis['news_sentiment']:
-            sentiment = analysis['news_sentiment']['sentiment']
-            summary.append(f"📰 News Sentiment: {sentiment.capitalize()}")
-        
-        return "\n".join(summary) if summary else "No strong patterns detected"
+    async def _process_event(self, symbol: str, limit: asyncio.Semaphore):
+        async with limit:
+            try:
+                await asyncio.wait_for(
+                    self.process_symbol(symbol, refresh=False), settings.SYMBOL_TIMEOUT)
+                await self.dispatch_signals()
+            except Exception as e:
+                metrics.inc('symbol_errors_total', symbol=symbol,
+                            kind='timeout' if isinstance(e, asyncio.TimeoutError) else 'error')
+                logger.error(f"Error processing {symbol}: {str(e)}")
 
 async def main():
     bot = TradingBot()
-    await bot.run()
+    try:
+        await bot.run()
+    finally:
+        await bot.close()
 
 if __name__ == "__main__":
     try:
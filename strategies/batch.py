@@ -0,0 +1,119 @@
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from config import settings
+
+# Mask helpers work on arrays of any shape along the last (time) axis, so the
+# same code flags the last candle of 500 symbols or every candle of one
+# symbol's history. Comparisons against NaN padding evaluate to False.
+
+
+def _shift(x: np.ndarray, n: int = 1) -> np.ndarray:
+    out = np.full_like(x, np.nan, dtype=np.float64)
+    out[..., n:] = x[..., :-n]
+    return out
+
+
+def pinbar_mask(open_, high, low, close) -> Tuple[np.ndarray, np.ndarray]:
+    body = np.abs(open_ - close)
+    upper_wick = high - np.maximum(open_, close)
+    lower_wick = np.minimum(open_, close) - low
+    bullish = (lower_wick > 2 * body) & (upper_wick < body)
+    bearish = (upper_wick > 2 * body) & (lower_wick < body)
+    return bullish, bearish
+
+
+def engulfing_mask(open_, close) -> Tuple[np.ndarray, np.ndarray]:
+    prev_open, prev_close = _shift(open_), _shift(close)
+    bullish = (prev_close < prev_open) & (close > open_) & (open_ <= prev_close) & (close >= prev_open)
+    bearish = (prev_close > prev_open) & (close < open_) & (open_ >= prev_close) & (close <= prev_open)
+    return bullish, bearish
+
+
+def inside_bar_mask(high, low) -> np.ndarray:
+    return (high < _shift(high)) & (low > _shift(low))
+
+
+def order_block_mask(close, volume, volume_factor: float = 1.5) -> Tuple[np.ndarray, np.ndarray]:
+    prev_close = _shift(close)
+    spike = volume > _shift(volume) * volume_factor
+    return (close > prev_close) & spike, (close < prev_close) & spike
+
+
+def fvg_mask(high, low) -> Tuple[np.ndarray, np.ndarray]:
+    # Gap between the candle two bars back and the current one
+    return low > _shift(high, 2), high < _shift(low, 2)
+
+
+class BatchResult:
+    """Columnar per-symbol results of one batch pass.
+
+    `columns` maps a field name to an array whose first axis is the symbol.
+    This is the prefilter's input only: it screens the last candle of every
+    symbol, and the candidates it passes are analyzed again in full by
+    `SignalEngine.analyze`, which builds its own price action and smart
+    money results.
+    """
+
+    def __init__(self, symbols: List[str], columns: Dict[str, np.ndarray]):
+        self.symbols = list(symbols)
+        self.columns = columns
+        self.index = {s: i for i, s in enumerate(self.symbols)}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+
+class BatchAnalyzer:
+    @staticmethod
+    def analyze(symbols: List[str], matrix: Dict[str, np.ndarray], lookback: Optional[int] = None,
+                volume_factor: Optional[float] = None, zones: int = 3) -> BatchResult:
+        """Price action and smart money checks for all symbols at once.
+
+        `matrix` holds (symbols x candles) arrays for open/high/low/close/volume,
+        aligned on the right (latest candle last) and NaN-padded on the left.
+        """
+        lookback = lookback or settings.KEY_LEVEL_LOOKBACK
+        volume_factor = volume_factor or settings.OB_VOLUME_FACTOR
+        open_, high, low = matrix['open'], matrix['high'], matrix['low']
+        close, volume = matrix['close'], matrix['volume']
+        tail = slice(-3, None)  # the newest three candles cover every pattern
+
+        resistance = np.nanmax(high[:, -lookback:], axis=1)
+        support = np.nanmin(low[:, -lookback:], axis=1)
+
+        bull_pin, bear_pin = pinbar_mask(open_[:, -1], high[:, -1], low[:, -1], close[:, -1])
+        bull_eng, bear_eng = engulfing_mask(open_[:, tail], close[:, tail])
+        bull_ob, bear_ob = order_block_mask(close[:, tail], volume[:, tail], volume_factor)
+        bull_fvg, bear_fvg = fvg_mask(high[:, tail], low[:, tail])
+
+        # Highest-volume candles per symbol, largest first
+        vol = np.where(np.isnan(volume), -np.inf, volume)
+        k = min(zones, vol.shape[1])
+        top = np.argpartition(vol, -k, axis=1)[:, -k:]
+        order = np.argsort(-np.take_along_axis(vol, top, axis=1), axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+
+        columns = {
+            'close': close[:, -1],
+            'resistance': resistance,
+            'support': support,
+            'pivot': (resistance + support) / 2,
+            'bullish_pinbar': bull_pin,
+            'bearish_pinbar': bear_pin,
+            'pinbar': bull_pin | bear_pin,
+            'bullish_engulfing': bull_eng[:, -1],
+            'bearish_engulfing': bear_eng[:, -1],
+            'engulfing': bull_eng[:, -1] | bear_eng[:, -1],
+            'inside_bar': inside_bar_mask(high[:, tail], low[:, tail])[:, -1],
+            'bullish_ob': bull_ob[:, -1],
+            'bearish_ob': bear_ob[:, -1],
+            'bullish_fvg': bull_fvg[:, -1],
+            'bearish_fvg': bear_fvg[:, -1],
+            'liquidity_highs': np.take_along_axis(high, top, axis=1),
+            'liquidity_lows': np.take_along_axis(low, top, axis=1)
+        }
+        return BatchResult(symbols, columns)
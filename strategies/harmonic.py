@@ -1,48 +1,252 @@
+import itertools
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Any, Hashable, List, Optional, Tuple
+
 import numpy as np
-from typing import Dict, Any
 from config import settings
+from core.context import CandleContext
+
+RATIO_NAMES = ('ab_retrace', 'bc_retrace', 'cd_extension', 'xa_retrace')
+
+
+class ZigZag:
+    """Incremental swing pivot extractor.
+
+    A swing high (low) is confirmed once price reverses `threshold` (as a
+    fraction) from it. The extreme of the leg still in progress is kept as
+    the candidate D point.
+    """
+
+    def __init__(self, threshold: float = 0.02, depth: int = 8):
+        self.threshold = threshold
+        self.pivots = deque(maxlen=depth)  # (index, price, kind) with kind 1 = high, -1 = low
+        self.direction = 0  # 1 while tracking a high, -1 while tracking a low
+        self.count = 0
+        self.high = self.low = None
+        self.high_idx = self.low_idx = 0
+
+    def update(self, high: float, low: float):
+        i = self.count
+        self.count += 1
+        th = self.threshold
+        if self.high is None:
+            self.high, self.low, self.high_idx, self.low_idx = high, low, i, i
+            return
+
+        if self.direction == 0:
+            # no swing yet: wait for the first move of `threshold` in either direction
+            if high > self.high:
+                self.high, self.high_idx = high, i
+            if low < self.low:
+                self.low, self.low_idx = low, i
+            if self.high_idx > self.low_idx and self.high >= self.low * (1 + th):
+                self.pivots.append((self.low_idx, self.low, -1))
+                self.direction = 1
+            elif self.low_idx > self.high_idx and self.low <= self.high * (1 - th):
+                self.pivots.append((self.high_idx, self.high, 1))
+                self.direction = -1
+        elif self.direction > 0:
+            if high > self.high:
+                self.high, self.high_idx = high, i
+            elif low <= self.high * (1 - th):
+                self.pivots.append((self.high_idx, self.high, 1))
+                self.direction = -1
+                self.low, self.low_idx = low, i
+        else:
+            if low < self.low:
+                self.low, self.low_idx = low, i
+            elif high >= self.low * (1 + th):
+                self.pivots.append((self.low_idx, self.low, -1))
+                self.direction = 1
+                self.high, self.high_idx = high, i
+
+    def candidate(self, high: Optional[float] = None, low: Optional[float] = None) -> Optional[Tuple[int, float, int]]:
+        """Current leg extreme (index, price, kind), optionally including a live candle."""
+        if self.direction > 0:
+            if high is not None and high > self.high:
+                return self.count, high, 1
+            return self.high_idx, self.high, 1
+        if self.direction < 0:
+            if low is not None and low < self.low:
+                return self.count, low, -1
+            return self.low_idx, self.low, -1
+        return None
+
+
+@lru_cache(maxsize=None)
+def _combos(depth: int) -> np.ndarray:
+    """Positions (X, A, B, C) among the last `depth` pivots, C being the newest.
+
+    Zigzag pivots alternate high/low, so consecutive points must be an odd
+    number of pivots apart.
+    """
+    c = depth - 1
+    rows = [(x, a, b, c) for x, a, b in itertools.combinations(range(c), 3)
+            if (a - x) % 2 and (b - a) % 2 and (c - b) % 2]
+    return np.array(rows, dtype=np.intp).reshape(-1, 4)
+
+
+def _window(value: Any) -> Tuple[float, float]:
+    # a single number is an exact ratio, widened only by the tolerance
+    if isinstance(value, (int, float)):
+        return float(value), float(value)
+    return float(value[0]), float(value[1])
+
+
+def _pattern_table() -> Tuple[List[str], np.ndarray, np.ndarray]:
+    tol = settings.HARMONIC_TOLERANCE
+    names = list(settings.HARMONIC_PATTERNS)
+    windows = np.array([[_window(settings.HARMONIC_PATTERNS[n][r]) for r in RATIO_NAMES] for n in names])
+    return names, windows[:, :, 0] * (1 - tol), windows[:, :, 1] * (1 + tol)
+
+
+def match_patterns(pivots: List[Tuple[int, float, int]], d: Tuple[int, float, int]) -> Dict[str, Dict[str, Any]]:
+    """Check every XABCD candidate ending at `d` against all pattern windows at once."""
+    if len(pivots) < 4 or pivots[-1][2] == d[2]:
+        return {}
+    combos = _combos(len(pivots))
+    if not len(combos):
+        return {}
+    index = np.array([p[0] for p in pivots])
+    price = np.array([p[1] for p in pivots])
+    pts = price[combos]  # (M, 4): X, A, B, C
+    X, A, B, C = pts.T
+    D = d[1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        xa = np.abs(A - X)
+        ratios = np.stack([
+            np.abs(A - B) / xa,
+            np.abs(C - B) / np.abs(A - B),
+            np.abs(C - D) / np.abs(C - B),
+            np.abs(A - D) / xa
+        ], axis=1)  # (M, 4)
+
+    names, lo, hi = _pattern_table()
+    r = ratios[None, :, :]
+    inside = (r >= lo[:, None, :]) & (r <= hi[:, None, :])
+    valid = inside.all(axis=2) & np.isfinite(ratios).all(axis=1)[None, :]  # (P, M)
+    if not valid.any():
+        return {}
+
+    center = (lo + hi) / 2
+    half = np.maximum((hi - lo) / 2, 1e-9)
+    deviation = np.abs(r - center[:, None, :]) / half[:, None, :]
+    confidence = np.clip(1 - deviation.mean(axis=2) / 2, 0, 1)
+    confidence[~valid] = -1
+
+    # D low completes a bullish pattern, D high a bearish one
+    direction = 1 if d[2] == -1 else -1
+    found = {}
+    for p, name in enumerate(names):
+        if not valid[p].any():
+            continue
+        m = int(confidence[p].argmax())
+        x, a, b, c = combos[m]
+        ad = abs(price[a] - D)
+        found[name] = {
+            'detected': True,
+            'pattern': name,
+            'pattern_type': 'bullish' if direction == 1 else 'bearish',
+            'confidence': float(confidence[p, m]),
+            'points': {'X': int(index[x]), 'A': int(index[a]), 'B': int(index[b]),
+                       'C': int(index[c]), 'D': int(d[0])},
+            'ratios': dict(zip(RATIO_NAMES, ratios[m].round(4).tolist())),
+            'entry': float(D),
+            'target': float(D + direction * 0.382 * ad),
+            'target2': float(D + direction * 0.618 * ad),
+            'stop_loss': float(D - direction * 0.13 * xa[m])
+        }
+    return found
+
+
+class HarmonicScanner:
+    """Pivot state of one symbol; only new candles are fed to the zigzag."""
+
+    def __init__(self):
+        self.zigzag = ZigZag(settings.HARMONIC_ZIGZAG_THRESHOLD, settings.HARMONIC_PIVOT_DEPTH)
+        self.last_timestamp: Optional[int] = None
+        self.offset = 0  # absolute index of ohlc[0] in the zigzag's candle count
+
+    def update(self, ohlc: Dict[str, Any], live: bool = True) -> Dict[str, Dict[str, Any]]:
+        high, low = ohlc['high'], ohlc['low']
+        times = ohlc.get('timestamp')
+        n = len(high)
+        if not n:
+            return {}
+        closed_end = n - 1 if live else n
+
+        start = 0
+        if times is not None and self.last_timestamp is not None:
+            start = int(np.searchsorted(times, self.last_timestamp, side='right'))
+            if start == 0 and times[0] != self.last_timestamp:
+                self.__init__()
+        elif self.last_timestamp is not None or self.zigzag.count:
+            self.__init__()
+
+        for i in range(start, closed_end):
+            self.zigzag.update(float(high[i]), float(low[i]))
+        if times is not None and closed_end > start:
+            self.last_timestamp = int(times[closed_end - 1])
+        self.offset = self.zigzag.count - closed_end
+
+        if live:
+            d = self.zigzag.candidate(float(high[-1]), float(low[-1]))
+        else:
+            d = self.zigzag.candidate()
+        if d is None:
+            return {}
+        if isinstance(ohlc, CandleContext):
+            # share the pivots with other modules reading the same context
+            ohlc.memo['swing_pivots'] = [(i - self.offset, p, k) for i, p, k in self.zigzag.pivots]
+        found = match_patterns(list(self.zigzag.pivots), d)
+        # report candle positions relative to the given arrays
+        for result in found.values():
+            result['points'] = {k: v - self.offset for k, v in result['points'].items()}
+        return found
+
+
+class HarmonicEngine:
+    """Keeps a HarmonicScanner per symbol/timeframe."""
+
+    def __init__(self):
+        self.scanners: Dict[Hashable, HarmonicScanner] = {}
+
+    def detect_all(self, key: Hashable, ohlc: Dict[str, Any], live: bool = True) -> Dict[str, Any]:
+        scanner = self.scanners.get(key)
+        if scanner is None:
+            scanner = self.scanners[key] = HarmonicScanner()
+        return scanner.update(ohlc, live)
+
 
 class HarmonicPatterns:
+    @staticmethod
+    def detect(ohlc: Dict[str, Any], name: str) -> Dict[str, Any]:
+        found = HarmonicScanner().update(ohlc, live=False)
+        return found.get(name, {'detected': False, 'pattern': name})
+
     @staticmethod
     def detect_gartley(ohlc: Dict[str, Any]) -> Dict[str, Any]:
-        high, low = np.array(ohlc['high']), np.array(ohlc['low'])
-        
-        # یافتن نقاط XABCD
-        x = high.argmax() if len(high) > 0 else -1
-        a = low.argmin() if len(low) > 0 else -1
-        
-        if x == -1 or a == -1:
-            return {'detected': False}
-        
-        # محاسبه فیبوناچی
-        xa = high[x] - low[a]
-        ab = high[x] - (xa * settings.HARMONIC_PATTERNS['gartley']['ab_retrace'])
-        
-        # شرایط الگو
-        is_valid = (
-            (ab > low[a]) and 
-            (abs(ab - (high[x] - xa * 0.618)) / high[x] < 0.02
-        )
-        
-        return {
-            'detected': is_valid,
-            'pattern': 'gartley',
-            'points': {'X': x, 'A': a},
-            'entry': ab,
-            'target': high[x],
-            'stop_loss': low[a] * 0.99
-        }
+        return HarmonicPatterns.detect(ohlc, 'gartley')
 
     @staticmethod
     def detect_bat(ohlc: Dict[str, Any]) -> Dict[str, Any]:
-        # پیاده‌سازی مشابه برای الگوی Bat
-        pass
+        return HarmonicPatterns.detect(ohlc, 'bat')
+
+    @staticmethod
+    def detect_butterfly(ohlc: Dict[str, Any]) -> Dict[str, Any]:
+        return HarmonicPatterns.detect(ohlc, 'butterfly')
+
+    @staticmethod
+    def detect_crab(ohlc: Dict[str, Any]) -> Dict[str, Any]:
+        return HarmonicPatterns.detect(ohlc, 'crab')
+
+    @staticmethod
+    def detect_shark(ohlc: Dict[str, Any]) -> Dict[str, Any]:
+        return HarmonicPatterns.detect(ohlc, 'shark')
     
     @staticmethod
     def detect_all(ohlc: Dict[str, Any]) -> Dict[str, Any]:
-        patterns = {
-            'gartley': HarmonicPatterns.detect_gartley(ohlc),
-            'bat': HarmonicPatterns.detect_bat(ohlc),
-            # اضافه کردن سایر الگوها
-        }
-        return {k: v for k, v in patterns.items() if v['detected']}
+        # Only detected patterns are returned
+        return HarmonicScanner().update(ohlc, live=False)
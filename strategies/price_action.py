@@ -1,14 +1,16 @@
 import numpy as np
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from config import settings
+from core.context import as_context
 
 class PriceActionAnalyzer:
     @staticmethod
-    def identify_key_levels(ohlc: Dict[str, Any], lookback: int = 20) -> Dict[str, float]:
-        highs = np.array(ohlc['high'][-lookback:])
-        lows = np.array(ohlc['low'][-lookback:])
+    def identify_key_levels(ohlc: Dict[str, Any], lookback: Optional[int] = None) -> Dict[str, float]:
+        lookback = lookback or settings.KEY_LEVEL_LOOKBACK
+        ctx = as_context(ohlc)
         
-        resistance = highs.max()
-        support = lows.min()
+        resistance = ctx.highest('high', lookback)
+        support = ctx.lowest('low', lookback)
         pivot = (resistance + support) / 2
         
         return {
@@ -29,8 +31,29 @@ class PriceActionAnalyzer:
         )
         return is_pinbar
     
+    @staticmethod
+    def detect_inside_bar(ohlc: Dict[str, Any]) -> bool:
+        if len(ohlc['high']) < 2:
+            return False
+        return bool(
+            ohlc['high'][-1] < ohlc['high'][-2] and
+            ohlc['low'][-1] > ohlc['low'][-2]
+        )
+    
+    @staticmethod
+    def detect_engulfing(ohlc: Dict[str, Any]) -> bool:
+        if len(ohlc['close']) < 2:
+            return False
+        o1, c1 = ohlc['open'][-2], ohlc['close'][-2]
+        o2, c2 = ohlc['open'][-1], ohlc['close'][-1]
+        
+        is_bullish = c1 < o1 and c2 > o2 and o2 <= c1 and c2 >= o1
+        is_bearish = c1 > o1 and c2 < o2 and o2 >= c1 and c2 <= o1
+        return bool(is_bullish or is_bearish)
+    
     @staticmethod
     def analyze_candles(ohlc: Dict[str, Any]) -> Dict[str, Any]:
+        ohlc = as_context(ohlc)
         return {
             'key_levels': PriceActionAnalyzer.identify_key_levels(ohlc),
             'pinbar': PriceActionAnalyzer.detect_pinbar(ohlc),
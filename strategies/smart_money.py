@@ -1,15 +1,17 @@
 import numpy as np
 from typing import Dict, Any
+from config import settings
+from core.context import as_context
 
 class SmartMoneyConcepts:
     @staticmethod
     def detect_liquidity_zones(ohlc: Dict[str, Any]) -> Dict[str, Any]:
-        highs = np.array(ohlc['high'])
-        lows = np.array(ohlc['low'])
-        volumes = np.array(ohlc['volume'])
+        ctx = as_context(ohlc)
+        highs = ctx['high']
+        lows = ctx['low']
         
         # یافتن نقدینگی بالا
-        high_vol_idx = volumes.argsort()[-3:][::-1]
+        high_vol_idx = ctx.top_volume(3)
         liquidity_zones = {
             'highs': [float(highs[i]) for i in high_vol_idx],
             'lows': [float(lows[i]) for i in high_vol_idx]
@@ -20,17 +22,19 @@ class SmartMoneyConcepts:
     @staticmethod
     def detect_ob(ohlc: Dict[str, Any]) -> bool:
         # تشخیص اوردر بلاک
-        close = np.array(ohlc['close'])
-        volume = np.array(ohlc['volume'])
+        ctx = as_context(ohlc)
+        close = ctx['close']
+        volume = ctx['volume']
+        factor = settings.OB_VOLUME_FACTOR
         
         is_bullish_ob = (
             (close[-1] > close[-2]) and 
-            (volume[-1] > volume[-2] * 1.5)
+            (volume[-1] > volume[-2] * factor)
         )
         
         is_bearish_ob = (
             (close[-1] < close[-2]) and 
-            (volume[-1] > volume[-2] * 1.5)
+            (volume[-1] > volume[-2] * factor)
         )
         
         return {
@@ -38,8 +42,19 @@ class SmartMoneyConcepts:
             'bearish_ob': is_bearish_ob
         }
     
+    @staticmethod
+    def detect_fvg(ohlc: Dict[str, Any]) -> Dict[str, bool]:
+        # شکاف ارزش منصفانه بین کندل فعلی و دو کندل قبل
+        if len(ohlc['high']) < 3:
+            return {'bullish': False, 'bearish': False}
+        return {
+            'bullish': bool(ohlc['low'][-1] > ohlc['high'][-3]),
+            'bearish': bool(ohlc['high'][-1] < ohlc['low'][-3])
+        }
+    
     @staticmethod
     def analyze(ohlc: Dict[str, Any]) -> Dict[str, Any]:
+        ohlc = as_context(ohlc)
         return {
             'liquidity_zones': SmartMoneyConcepts.detect_liquidity_zones(ohlc),
             'order_blocks': SmartMoneyConcepts.detect_ob(ohlc),